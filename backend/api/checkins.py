@@ -1,49 +1,195 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import List
+from typing import AsyncIterator, Optional, Tuple
 from datetime import datetime, timedelta
 from twilio.twiml.voice_response import VoiceResponse
+import base64
+import csv
+import io
+import json
 import os
 
-from models.models import CheckIn, Recipient, User
-from schemas.schemas import CheckIn as CheckInSchema
+from models.base import SessionLocal
+from models.models import CheckIn, Recipient, User, Call
+from models.enums import CallStatus
+from schemas.schemas import CheckIn as CheckInSchema, CheckInPage
+from services.webhooks import ingest_recording_event
+from services.tracing import with_traceparent
 from .email_auth import get_current_user, get_db
 
 router = APIRouter()
 
-@router.get("/checkins", response_model=List[CheckInSchema])
+# Check-in history paging
+CHECKIN_PAGE_SIZE = int(os.getenv("CHECKIN_PAGE_SIZE", "50"))
+CHECKIN_PAGE_SIZE_MAX = int(os.getenv("CHECKIN_PAGE_SIZE_MAX", "200"))
+CHECKIN_HISTORY_MAX_DAYS = int(os.getenv("CHECKIN_HISTORY_MAX_DAYS", "365"))
+
+# Everything a list item needs except the transcript, which can be many kilobytes per call
+CHECKIN_LIST_COLUMNS = (
+    CheckIn.id,
+    CheckIn.recipient_id,
+    CheckIn.status,
+    CheckIn.summary,
+    CheckIn.audio_url,
+    CheckIn.created_at,
+    CheckIn.completed_at,
+    CheckIn.call_metadata,
+)
+
+def encode_cursor(created_at: datetime, checkin_id: int) -> str:
+    """Opaque cursor pointing just past the given check-in in newest-first order"""
+    raw = f"{created_at.isoformat()}|{checkin_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, checkin_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(checkin_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+@router.get("/checkins", response_model=CheckInPage)
 async def get_checkins(
     recipient_id: int,
-    days: int = 7,
+    days: int = Query(7, ge=1, le=CHECKIN_HISTORY_MAX_DAYS),
+    limit: int = Query(CHECKIN_PAGE_SIZE, ge=1, le=CHECKIN_PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    include_transcript: bool = True,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get check-ins for a recipient within the specified number of days"""
+    """Get one page of a recipient's check-ins within the specified number of days, newest first"""
     # Verify recipient belongs to current user
-    query = select(Recipient).where(
+    query = select(Recipient.id).where(
         Recipient.id == recipient_id,
         Recipient.user_id == current_user.id
     )
     result = await db.execute(query)
-    recipient = result.scalar_one_or_none()
     
-    if not recipient:
+    if result.scalar_one_or_none() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Recipient not found"
         )
     
-    # Get check-ins
+    # Walk the (recipient_id, created_at DESC) index from the cursor; id breaks ties
+    columns = CHECKIN_LIST_COLUMNS + ((CheckIn.transcript,) if include_transcript else ())
     cutoff_date = datetime.utcnow() - timedelta(days=days)
-    query = select(CheckIn).where(
+    query = select(*columns).where(
         CheckIn.recipient_id == recipient_id,
         CheckIn.created_at >= cutoff_date
-    ).order_by(CheckIn.created_at.desc())
+    )
+    if cursor:
+        after_created_at, after_id = decode_cursor(cursor)
+        query = query.where(or_(
+            CheckIn.created_at < after_created_at,
+            and_(CheckIn.created_at == after_created_at, CheckIn.id < after_id)
+        ))
+    # Fetch one extra row to learn whether another page exists
+    query = query.order_by(CheckIn.created_at.desc(), CheckIn.id.desc()).limit(limit + 1)
     
     result = await db.execute(query)
-    check_ins = result.scalars().all()
-    return check_ins
+    rows = result.all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return CheckInPage(items=[CheckInSchema.model_validate(row) for row in rows], next_cursor=next_cursor)
+
+# Bulk export
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "1000"))
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+EXPORT_COLUMNS = (
+    CheckIn.id,
+    CheckIn.recipient_id,
+    Recipient.name.label("recipient_name"),
+    CheckIn.status,
+    CheckIn.created_at,
+    CheckIn.completed_at,
+    CheckIn.summary,
+    CheckIn.transcript,
+    CheckIn.audio_url,
+)
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, "value"):  # Enums
+        return value.value
+    return value
+
+async def export_rows(user_id: int, recipient_id: Optional[int], fmt: str) -> AsyncIterator[str]:
+    """Yield the export in ~64 KB chunks while reading rows through a server-side cursor"""
+    names = [column.key for column in EXPORT_COLUMNS]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(names)
+
+    query = (
+        select(*EXPORT_COLUMNS)
+        .join(Recipient, CheckIn.recipient_id == Recipient.id)
+        .where(Recipient.user_id == user_id)
+        .order_by(CheckIn.id)
+        .execution_options(yield_per=EXPORT_BATCH_ROWS)
+    )
+    if recipient_id is not None:
+        query = query.where(CheckIn.recipient_id == recipient_id)
+
+    # The request's session is closed before a streamed body is sent, so use our own
+    async with SessionLocal() as db:
+        result = await db.stream(query)
+        async for row in result:
+            values = [_export_value(value) for value in row]
+            if fmt == "csv":
+                writer.writerow(values)
+            else:
+                buffer.write(json.dumps(dict(zip(names, values))) + "\n")
+            if buffer.tell() >= EXPORT_CHUNK_BYTES:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@router.get("/checkins/export")
+async def export_checkins(
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    recipient_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Stream every check-in of the current user's recipients, transcripts included"""
+    if recipient_id is not None:
+        query = select(Recipient.id).where(
+            Recipient.id == recipient_id,
+            Recipient.user_id == current_user.id
+        )
+        result = await db.execute(query)
+        if result.scalar_one_or_none() is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Recipient not found"
+            )
+    
+    filename = f"checkins-{datetime.utcnow():%Y%m%d%H%M%S}.{export_format}"
+    return StreamingResponse(
+        export_rows(current_user.id, recipient_id, export_format),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @router.get("/checkins/{checkin_id}", response_model=CheckInSchema)
 async def get_checkin(
@@ -68,22 +214,31 @@ async def get_checkin(
     return check_in
 
 @router.post("/twilio/voice-webhook")
-async def handle_voice_webhook(request: Request):
+async def handle_voice_webhook(request: Request, db: AsyncSession = Depends(get_db)):
     """Handle incoming Twilio voice call"""
     # Get call data from request
     form_data = await request.form()
     call_sid = form_data.get("CallSid")
     
+    # Find the check-in through the indexed call SID and mark the call answered
+    result = await db.execute(select(Call).where(Call.call_sid == call_sid))
+    call = result.scalar_one_or_none()
+    if call is not None:
+        call.status = CallStatus.IN_PROGRESS
+        call.answered_at = datetime.utcnow()
+        await db.commit()
+    
     # Create TwiML response
     response = VoiceResponse()
     
     # Play the generated audio file
     # The audio file will be available at this URL because we'll serve the media directory
-    response.play(f"{os.getenv('BASE_URL')}/media/script_{call_sid}.mp3")
+    if call is not None:
+        response.play(f"{os.getenv('BASE_URL')}/media/script_{call.check_in_id}.mp3")
     
     # After playing the message, record the response
     response.record(
-        action=f"{os.getenv('BASE_URL')}/api/twilio/recording-complete",
+        action=with_traceparent(f"{os.getenv('BASE_URL')}/api/twilio/recording-complete"),
         maxLength="120",  # 2 minutes max
         playBeep=True,
         trim="trim-silence"
@@ -92,16 +247,9 @@ async def handle_voice_webhook(request: Request):
     return str(response)
 
 @router.post("/twilio/recording-complete")
-async def handle_recording_complete(request: Request):
-    """Handle completed recording webhook"""
-    # Import here to avoid circular imports
-    from services.call_pipeline import handle_recording_webhook
-    
+async def handle_recording_complete(request: Request, db: AsyncSession = Depends(get_db)):
+    """Record the completed-recording webhook; processing happens in the job workers"""
     form_data = await request.form()
-    recording_url = form_data.get("RecordingUrl")
-    call_sid = form_data.get("CallSid")
-    
-    if recording_url and call_sid:
-        await handle_recording_webhook(recording_url, call_sid)
+    event, created = await ingest_recording_event(db, dict(form_data))
     
-    return {"status": "success"} 
\ No newline at end of file
+    return {"status": "success", "duplicate": event is not None and not created}
@@ -7,13 +7,15 @@ from datetime import datetime, timedelta
 import os
 from typing import Optional
 import secrets
-import resend
 import logging
 from dotenv import load_dotenv
 
-from models.base import SessionLocal
+from models.base import get_session
 from models.models import User
 from schemas.schemas import UserCreate, EmailLoginRequest, VerifyCodeRequest
+from services.auth_cache import get_auth_cache
+from services.kv_store import get_kv_store
+from services.email_dispatcher import EmailQueueFull, get_email_dispatcher, render_login_code
 
 # Load environment variables
 load_dotenv(verbose=True)
@@ -22,31 +24,31 @@ router = APIRouter()
 security = HTTPBearer()
 logger = logging.getLogger("carecall")
 
-# Initialize Resend
+# Login codes are sent through Resend (see services.email_dispatcher)
 api_key = os.getenv("RESEND_API_KEY")
 if not api_key:
     logger.error("RESEND_API_KEY environment variable is not set")
     raise ValueError("RESEND_API_KEY environment variable is required")
 
-resend.api_key = api_key
-
 # JWT settings
 JWT_SECRET = os.getenv("JWT_SECRET", "your-secret-key")  # Change in production
 JWT_ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 
-# Store verification codes (in production, use Redis or similar)
-verification_codes = {}
+# Verification codes and login rate limits live in the shared store (KV_STORE_BACKEND)
+VERIFICATION_CODE_TTL = timedelta(minutes=15)
+LOGIN_RATE_LIMIT = 5  # Code requests per email
+LOGIN_RATE_WINDOW = timedelta(minutes=15)
 
-# Rate limiting (in production, use Redis or similar)
-rate_limits = {}
+def _code_key(email: str) -> str:
+    return f"verification_code:{email.lower()}"
 
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        await db.close()
+def _rate_key(email: str) -> str:
+    return f"login_rate:{email.lower()}"
+
+# One session per request: FastAPI caches the dependency, so routes and
+# get_current_user share it
+get_db = get_session
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -59,10 +61,11 @@ async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db)
 ) -> User:
+    cache = get_auth_cache()
     try:
         token = credentials.credentials
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        email = payload.get("sub")
+        # Verified subjects are cached per token until the token itself expires
+        email = cache.verify_token(token)
         if not email:
             logger.warning(f"Invalid token: missing email in payload")
             raise HTTPException(
@@ -70,6 +73,12 @@ async def get_current_user(
                 detail="Could not validate credentials"
             )
         
+        user = await cache.get_user(email)
+        if user is not None:
+            # Attach the cached row to this request's session without a query, so routes
+            # can lazy-load, add or refresh it like a user they loaded themselves
+            return await db.merge(user, load=False)
+        
         result = await db.execute(select(User).where(User.email == email))
         user = result.scalar_one_or_none()
         
@@ -79,6 +88,7 @@ async def get_current_user(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User not found"
             )
+        await cache.set_user(user)
         return user
     except jwt.ExpiredSignatureError:
         logger.warning("Token expired")
@@ -86,7 +96,7 @@ async def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token has expired"
         )
-    except jwt.JWTError as e:
+    except jwt.PyJWTError as e:
         logger.error(f"JWT error: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -99,100 +109,35 @@ async def login_email(email: EmailLoginRequest, db: AsyncSession = Depends(get_d
     logger.info(f"Login attempt for email: {email.email}")
     logger.debug(f"Using Resend API key: {api_key[:5]}...")  # Only log first 5 chars for security
     
-    # Check rate limit (max 5 attempts per 15 minutes)
+    # Check rate limit (max 5 attempts per 15 minutes, sliding window)
+    store = get_kv_store()
     now = datetime.utcnow()
-    if email.email in rate_limits:
-        attempts = rate_limits[email.email]
-        # Clean up old attempts
-        attempts = [t for t in attempts if now - t < timedelta(minutes=15)]
-        if len(attempts) >= 5:
-            logger.warning(f"Rate limit exceeded for email: {email.email}")
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Too many verification code requests. Please wait 15 minutes."
-            )
-        rate_limits[email.email] = attempts + [now]
-    else:
-        rate_limits[email.email] = [now]
+    allowed, _ = await store.hit(_rate_key(email.email), LOGIN_RATE_WINDOW.total_seconds(), LOGIN_RATE_LIMIT)
+    if not allowed:
+        logger.warning(f"Rate limit exceeded for email: {email.email}")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many verification code requests. Please wait 15 minutes."
+        )
 
     # Generate verification code (4 digits for better readability)
     code = ''.join([str(secrets.randbelow(10)) for _ in range(4)])
-    verification_codes[email.email] = {
+    await store.set(_code_key(email.email), {
         "code": code,
-        "expires": now + timedelta(minutes=15)
-    }
+        "expires": (now + VERIFICATION_CODE_TTL).isoformat()
+    }, VERIFICATION_CODE_TTL.total_seconds())
     
-    # Send email
+    # Queue the email; delivery and retries happen off the request path
     try:
-        logger.debug("Attempting to send email via Resend...")
-        params = {
-            "from": "noreply@carecall.club",  # Using verified domain
-            "to": [email.email],
-            "subject": "Your CareCall Login Code",
-            "html": f"""
-                <!DOCTYPE html>
-                <html>
-                <head>
-                    <style>
-                        body {{
-                            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
-                            line-height: 1.6;
-                            color: #333;
-                            max-width: 600px;
-                            margin: 0 auto;
-                            padding: 20px;
-                        }}
-                        .container {{
-                            background: #ffffff;
-                            border-radius: 8px;
-                            padding: 30px;
-                            box-shadow: 0 2px 4px rgba(0, 0, 0, 0.1);
-                        }}
-                        .logo {{
-                            font-size: 24px;
-                            font-weight: bold;
-                            color: #1a1a1a;
-                            margin-bottom: 20px;
-                        }}
-                        .code {{
-                            font-size: 32px;
-                            font-weight: bold;
-                            color: #2563eb;
-                            letter-spacing: 4px;
-                            padding: 16px;
-                            background: #f3f4f6;
-                            border-radius: 4px;
-                            margin: 20px 0;
-                            text-align: center;
-                        }}
-                        .footer {{
-                            font-size: 14px;
-                            color: #666;
-                            margin-top: 30px;
-                            text-align: center;
-                        }}
-                    </style>
-                </head>
-                <body>
-                    <div class="container">
-                        <div class="logo">CareCall</div>
-                        <h1>Welcome to CareCall!</h1>
-                        <p>Here's your verification code to complete your login:</p>
-                        <div class="code">{code}</div>
-                        <p>This code will expire in 15 minutes for security reasons.</p>
-                        <p>If you didn't request this code, please ignore this email.</p>
-                        <div class="footer">
-                            <p>CareCall - Automated Care Check-ins</p>
-                            <p>This is an automated message, please do not reply.</p>
-                        </div>
-                    </div>
-                </body>
-                </html>
-            """
-        }
-        resend.Emails.send(params)
-        logger.info(f"Verification code sent to: {email.email}")
+        await get_email_dispatcher().send(render_login_code(email.email, code))
+        logger.info(f"Verification code queued for: {email.email}")
         return {"message": "Verification code sent"}
+    except EmailQueueFull as e:
+        logger.error(f"Failed to send verification code to {email.email}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many emails are being sent right now. Please try again shortly."
+        )
     except Exception as e:
         logger.error(f"Failed to send verification code to {email.email}: {str(e)}")
         raise HTTPException(
@@ -209,19 +154,20 @@ async def _verify_code(verify_data: VerifyCodeRequest, db: AsyncSession) -> dict
     logger.info(f"Verifying code for email: {email}")
     logger.debug(f"Received code: {code}")
     
-    if email not in verification_codes:
+    store = get_kv_store()
+    stored = await store.get(_code_key(email))
+    if stored is None:
         logger.warning(f"No verification code found for email: {email}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No verification code found for this email"
         )
     
-    stored = verification_codes[email]
     logger.debug(f"Stored verification data: {stored}")
     
-    if datetime.utcnow() > stored["expires"]:
+    if datetime.utcnow() > datetime.fromisoformat(stored["expires"]):
         logger.warning(f"Verification code expired for email: {email}")
-        del verification_codes[email]
+        await store.delete(_code_key(email))
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Verification code has expired"
@@ -249,7 +195,7 @@ async def _verify_code(verify_data: VerifyCodeRequest, db: AsyncSession) -> dict
     logger.info(f"Generated access token for user: {email}")
     
     # Clean up used code
-    del verification_codes[email]
+    await store.delete(_code_key(email))
     
     return {
         "access_token": access_token,
@@ -1,35 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm.attributes import set_committed_value
 from typing import List
+import os
 
-from models.models import Recipient, User
-from schemas.schemas import RecipientCreate, RecipientUpdate, Recipient as RecipientSchema, RecipientWithCheckIns
+from models.models import CheckIn, Recipient, User
+from schemas.schemas import (
+    RecipientCreate, RecipientUpdate, Recipient as RecipientSchema, RecipientWithCheckIns,
+    RecipientDashboardEntry, RecipientStatus
+)
+from services.scheduler import bucket_index
+from services.job_queue import enqueue_checkin
+from services.status_summary import get_summaries
 from .email_auth import get_current_user, get_db
 
 router = APIRouter()
 
+# Check-ins embedded in a recipient response; the full history is paged through /checkins
+RECIPIENT_CHECKINS_LIMIT = int(os.getenv("RECIPIENT_CHECKINS_LIMIT", "20"))
+RECIPIENT_CHECKINS_LIMIT_MAX = 100
+
 @router.get("/recipients", response_model=List[RecipientSchema])
 async def get_recipients(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get all recipients for the current user"""
-    query = select(Recipient).where(Recipient.caregiver_id == current_user.id)
+    query = select(Recipient).where(Recipient.user_id == current_user.id)
     result = await db.execute(query)
     recipients = result.scalars().all()
     return recipients
 
+@router.get("/recipients/dashboard", response_model=List[RecipientDashboardEntry])
+async def get_dashboard(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get all recipients for the current user with their latest status and recent concerns"""
+    # Reads the maintained per-recipient summaries instead of aggregating check-in history
+    entries = []
+    for recipient, summary in await get_summaries(db, current_user.id):
+        entry = RecipientSchema.model_validate(recipient).model_dump()
+        entries.append(RecipientDashboardEntry(**entry, status=RecipientStatus.model_validate(summary)))
+    return entries
+
 @router.get("/recipients/{recipient_id}", response_model=RecipientWithCheckIns)
 async def get_recipient(
     recipient_id: int,
+    checkins_limit: int = Query(RECIPIENT_CHECKINS_LIMIT, ge=0, le=RECIPIENT_CHECKINS_LIMIT_MAX),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get a specific recipient with their check-ins"""
+    """Get a specific recipient with their latest check-ins"""
     query = select(Recipient).where(
         Recipient.id == recipient_id,
-        Recipient.caregiver_id == current_user.id
+        Recipient.user_id == current_user.id
     )
     result = await db.execute(query)
     recipient = result.scalar_one_or_none()
@@ -39,6 +65,17 @@ async def get_recipient(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Recipient not found"
         )
+    
+    # Load only the newest check-ins (one range scan of the recipient/created_at index)
+    # and attach them, so serialization never triggers the unbounded lazy relationship
+    query = (
+        select(CheckIn)
+        .where(CheckIn.recipient_id == recipient_id)
+        .order_by(CheckIn.created_at.desc(), CheckIn.id.desc())
+        .limit(checkins_limit)
+    )
+    result = await db.execute(query)
+    set_committed_value(recipient, "check_ins", list(result.scalars().all()))
     return recipient
 
 @router.post("/recipients", response_model=RecipientSchema, status_code=status.HTTP_201_CREATED)
@@ -48,10 +85,11 @@ async def create_recipient(
     current_user: User = Depends(get_current_user)
 ):
     """Create a new recipient"""
-    db_recipient = Recipient(**recipient.dict(), caregiver_id=current_user.id)
+    db_recipient = Recipient(**recipient.dict(), user_id=current_user.id)
     db.add(db_recipient)
     await db.commit()
     await db.refresh(db_recipient)
+    bucket_index.upsert(db_recipient.id, db_recipient.preferred_time)
     return db_recipient
 
 @router.put("/recipients/{recipient_id}", response_model=RecipientSchema)
@@ -64,7 +102,7 @@ async def update_recipient(
     """Update a recipient"""
     query = select(Recipient).where(
         Recipient.id == recipient_id,
-        Recipient.caregiver_id == current_user.id
+        Recipient.user_id == current_user.id
     )
     result = await db.execute(query)
     db_recipient = result.scalar_one_or_none()
@@ -81,6 +119,7 @@ async def update_recipient(
     
     await db.commit()
     await db.refresh(db_recipient)
+    bucket_index.upsert(db_recipient.id, db_recipient.preferred_time)
     return db_recipient
 
 @router.delete("/recipients/{recipient_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -92,7 +131,7 @@ async def delete_recipient(
     """Delete a recipient"""
     query = select(Recipient).where(
         Recipient.id == recipient_id,
-        Recipient.caregiver_id == current_user.id
+        Recipient.user_id == current_user.id
     )
     result = await db.execute(query)
     recipient = result.scalar_one_or_none()
@@ -105,20 +144,18 @@ async def delete_recipient(
     
     await db.delete(recipient)
     await db.commit()
+    bucket_index.remove(recipient_id)
 
-@router.post("/recipients/{recipient_id}/call-now")
+@router.post("/recipients/{recipient_id}/call-now", status_code=status.HTTP_202_ACCEPTED)
 async def trigger_call(
     recipient_id: int,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Trigger an immediate check-in call for a recipient"""
-    # Import here to avoid circular imports
-    from services.call_pipeline import trigger_checkin
-    
+    """Queue an immediate check-in call for a recipient"""
     query = select(Recipient).where(
         Recipient.id == recipient_id,
-        Recipient.caregiver_id == current_user.id
+        Recipient.user_id == current_user.id
     )
     result = await db.execute(query)
     recipient = result.scalar_one_or_none()
@@ -130,10 +167,10 @@ async def trigger_call(
         )
     
     try:
-        check_in = await trigger_checkin(recipient_id)
-        return {"status": "success", "check_in_id": check_in.id}
+        check_in_id = await enqueue_checkin(recipient_id, db)
+        return {"status": "queued", "check_in_id": check_in_id}
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
-        ) 
\ No newline at end of file
+        )
@@ -0,0 +1,472 @@
+"""
+End-to-end load test of the API and call pipeline against fake vendors.
+
+Run from the backend directory: python -m benchmarks.load_benchmark
+Point --database-url at Postgres (postgresql+asyncpg://...) to benchmark it; the
+default is a throwaway SQLite file.
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+
+VENDORS = ("text_model", "gemini_model", "tts_client", "twilio_client", "resend")
+
+# Answers the fake transcription returns; the triage fast path decides the plain
+# ones and the rest go to the (fake) LLM in batches
+TRANSCRIPTS = (
+    "I'm fine, thank you. Feeling good today.",
+    "Doing well, I took my medication this morning.",
+    "My knee has been aching a bit more than usual since yesterday.",
+    "I haven't been sleeping well and I feel a little dizzy sometimes.",
+)
+
+@dataclass
+class VendorProfile:
+    latency_ms: float = 0.0
+    error_rate: float = 0.0
+
+def parse_vendor_profiles(specs: List[str], latency_ms: float, error_rate: float) -> Dict[str, VendorProfile]:
+    """Defaults for every vendor, overridden by specs like "tts_client=250" or "twilio_client=400:0.05\""""
+    profiles = {name: VendorProfile(latency_ms, error_rate) for name in VENDORS}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if name not in profiles:
+            raise ValueError(f"Unknown vendor {name!r}; expected one of {', '.join(VENDORS)}")
+        latency, _, errors = values.partition(":")
+        profiles[name] = VendorProfile(float(latency), float(errors) if errors else 0.0)
+    return profiles
+
+class FakeVendor:
+    """Blocking stand-in for a vendor SDK client with configurable latency and failures"""
+
+    def __init__(self, name: str, profile: VendorProfile, rng: random.Random):
+        self.name = name
+        self.profile = profile
+        self.rng = rng
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _respond(self):
+        with self._lock:
+            self.requests += 1
+            failed = self.rng.random() < self.profile.error_rate
+        if self.profile.latency_ms:
+            time.sleep(self.profile.latency_ms / 1000)
+        if failed:
+            raise RuntimeError(f"Fake {self.name} error")
+
+class FakeTextModel(FakeVendor):
+    def predict(self, prompt: str):
+        self._respond()
+        if "Items:" in prompt:
+            items = json.loads(prompt.rsplit("Items:", 1)[1])
+            results = [{"id": item["id"], "status": "CONCERN", "notes": "Mentions a new symptom"} for item in items]
+            return SimpleNamespace(text=json.dumps(results))
+        return SimpleNamespace(text="Hello {name}, this is your care assistant. How are you feeling today?")
+
+class FakeGemini(FakeVendor):
+    def generate_content(self, contents, **kwargs):
+        self._respond()
+        return SimpleNamespace(text=self.rng.choice(TRANSCRIPTS))
+
+class FakeTTS(FakeVendor):
+    def synthesize_speech(self, input, voice, audio_config):
+        self._respond()
+        return SimpleNamespace(audio_content=b"ID3" + os.urandom(1024))
+
+class FakeTwilio(FakeVendor):
+    def __init__(self, name: str, profile: VendorProfile, rng: random.Random):
+        super().__init__(name, profile, rng)
+        self.calls = SimpleNamespace(create=self._create_call)
+        self.messages = SimpleNamespace(create=self._create_message)
+
+    def _create_call(self, **kwargs):
+        self._respond()
+        return SimpleNamespace(sid=f"CA{uuid.uuid4().hex}")
+
+    def _create_message(self, **kwargs):
+        self._respond()
+        return SimpleNamespace(sid=f"SM{uuid.uuid4().hex}")
+
+class FakeResend:
+    """In-process Resend API served through an httpx transport; keeps each address's latest code"""
+
+    CODE_PATTERN = re.compile(r'<div class="code">(\d+)</div>')
+
+    def __init__(self, profile: VendorProfile, rng: random.Random):
+        self.profile = profile
+        self.rng = rng
+        self.requests = 0
+        self.codes: Dict[str, str] = {}
+        self.transport = httpx.MockTransport(self.handle)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if self.profile.latency_ms:
+            await asyncio.sleep(self.profile.latency_ms / 1000)
+        if self.rng.random() < self.profile.error_rate:
+            return httpx.Response(500, json={"message": "Fake Resend error"})
+        params = json.loads(request.content)
+        match = self.CODE_PATTERN.search(params.get("html", ""))
+        if match:
+            for address in params["to"]:
+                self.codes[address] = match.group(1)
+        return httpx.Response(200, json={"id": uuid.uuid4().hex})
+
+@asynccontextmanager
+async def fake_vendors(profiles: Dict[str, VendorProfile], seed: int = 0) -> AsyncIterator[SimpleNamespace]:
+    """Install fake vendor clients and a fake Resend API for the duration of the block"""
+    from services import email_dispatcher
+    from services.registry import registry
+
+    rng = random.Random(seed)
+    fakes = SimpleNamespace(
+        text_model=FakeTextModel("text_model", profiles["text_model"], rng),
+        gemini_model=FakeGemini("gemini_model", profiles["gemini_model"], rng),
+        tts_client=FakeTTS("tts_client", profiles["tts_client"], rng),
+        twilio_client=FakeTwilio("twilio_client", profiles["twilio_client"], rng),
+        resend=FakeResend(profiles["resend"], rng),
+    )
+    for name in ("text_model", "gemini_model", "tts_client", "twilio_client"):
+        registry.override(name, getattr(fakes, name))
+    previous_dispatcher = email_dispatcher._dispatcher
+    dispatcher = email_dispatcher._dispatcher = email_dispatcher.EmailDispatcher(
+        api_key="bench-key",
+        backoff=0.01,
+        client=httpx.AsyncClient(base_url="https://resend.test", transport=fakes.resend.transport),
+    )
+    try:
+        yield fakes
+    finally:
+        await dispatcher.close()
+        for name in ("text_model", "gemini_model", "tts_client", "twilio_client"):
+            registry.reset(name)
+        email_dispatcher._dispatcher = previous_dispatcher
+
+def percentile(samples: List[float], p: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 2)
+
+@dataclass
+class EndpointStats:
+    latencies_ms: List[float] = field(default_factory=list)
+    errors: int = 0
+    first_started: Optional[float] = None
+    last_finished: Optional[float] = None
+
+    def summary(self) -> dict:
+        requests = len(self.latencies_ms)
+        elapsed = (self.last_finished - self.first_started) if requests else 0
+        return {
+            "requests": requests,
+            "errors": self.errors,
+            "error_rate": round(self.errors / requests, 4) if requests else 0.0,
+            "p50_ms": percentile(self.latencies_ms, 0.5),
+            "p95_ms": percentile(self.latencies_ms, 0.95),
+            "p99_ms": percentile(self.latencies_ms, 0.99),
+            "mean_ms": round(sum(self.latencies_ms) / requests, 2) if requests else None,
+            "throughput_rps": round(requests / elapsed, 1) if elapsed > 0 else None,
+        }
+
+class LoadClient:
+    """HTTP client for the in-process app that records latency per endpoint template"""
+
+    def __init__(self, app, concurrency: int):
+        self.http = httpx.AsyncClient(app=app, base_url="http://carecall.test", timeout=60)
+        self.limit = asyncio.Semaphore(concurrency)
+        self.endpoints: Dict[str, EndpointStats] = {}
+
+    async def request(self, endpoint: str, method: str, url: str, expect=(200,), **kwargs) -> httpx.Response:
+        stats = self.endpoints.setdefault(endpoint, EndpointStats())
+        async with self.limit:
+            started = time.perf_counter()
+            try:
+                response = await self.http.request(method, url, **kwargs)
+            except Exception:
+                response = None
+            finished = time.perf_counter()
+        stats.latencies_ms.append((finished - started) * 1000)
+        stats.first_started = started if stats.first_started is None else min(stats.first_started, started)
+        stats.last_finished = finished if stats.last_finished is None else max(stats.last_finished, finished)
+        if response is None or response.status_code not in expect:
+            stats.errors += 1
+        return response
+
+    async def close(self):
+        await self.http.aclose()
+
+async def login(client: LoadClient, resend: FakeResend, email: str, timeout: float = 10) -> Optional[str]:
+    """Request a code, wait for the fake inbox to receive it, and exchange it for a token"""
+    response = await client.request("POST /api/auth/login/email", "POST", "/api/auth/login/email", json={"email": email})
+    if response is None or response.status_code != 200:
+        return None
+    deadline = time.monotonic() + timeout
+    while email not in resend.codes:
+        if time.monotonic() > deadline:
+            return None
+        await asyncio.sleep(0.005)
+    response = await client.request(
+        "POST /api/auth/verify", "POST", "/api/auth/verify", json={"email": email, "code": resend.codes.pop(email)}
+    )
+    if response is None or response.status_code != 200:
+        return None
+    return response.json()["access_token"]
+
+async def create_recipient(client: LoadClient, headers: dict, index: int) -> Optional[int]:
+    response = await client.request(
+        "POST /api/recipients/recipients", "POST", "/api/recipients/recipients", expect=(201,), headers=headers,
+        json={
+            "name": f"Recipient {index}",
+            "phone_number": f"+1555{index:07d}",
+            "condition": random.choice(("diabetes", "hypertension", "asthma")),
+            "preferred_time": "09:00",
+            "emergency_contact_name": "Contact",
+            "emergency_contact_phone": "+15559990000",
+            "emergency_contact_email": "contact@carecall.club",
+        },
+    )
+    return response.json()["id"] if response is not None and response.status_code == 201 else None
+
+async def read_dashboard(client: LoadClient, headers: dict, recipient_ids: List[int], reads: int):
+    for _ in range(reads):
+        await client.request("GET /api/recipients/recipients/dashboard", "GET", "/api/recipients/recipients/dashboard", headers=headers)
+        if recipient_ids:
+            recipient_id = random.choice(recipient_ids)
+            await client.request(
+                "GET /api/recipients/recipients/{recipient_id}", "GET", f"/api/recipients/recipients/{recipient_id}", headers=headers
+            )
+            await client.request(
+                "GET /api/checkins/checkins", "GET", "/api/checkins/checkins", headers=headers,
+                params={"recipient_id": recipient_id, "include_transcript": "false"},
+            )
+
+async def answer_and_record(client: LoadClient, call_sid: str, index: int, deliveries: int):
+    form = {"CallSid": call_sid}
+    await client.request("POST /api/checkins/twilio/voice-webhook", "POST", "/api/checkins/twilio/voice-webhook", data=form)
+    form = {**form, "RecordingUrl": f"https://api.twilio.test/recordings/RE{index}.mp3", "RecordingSid": f"RE{index}"}
+    await asyncio.gather(*(
+        client.request("POST /api/checkins/twilio/recording-complete", "POST", "/api/checkins/twilio/recording-complete", data=form)
+        for _ in range(deliveries)
+    ))
+
+async def wait_for(condition, timeout: float, interval: float = 0.05) -> bool:
+    deadline = time.monotonic() + timeout
+    while not await condition():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(interval)
+    return True
+
+async def call_sids(check_in_ids: List[int], status=None) -> List[str]:
+    """SIDs of the calls placed for these check-ins, optionally only those in one status"""
+    from sqlalchemy import select
+
+    from models.base import SessionLocal
+    from models.models import Call
+
+    if not check_in_ids:
+        return []
+    query = select(Call.call_sid).where(Call.check_in_id.in_(check_in_ids), Call.call_sid.is_not(None))
+    if status is not None:
+        query = query.where(Call.status == status)
+    async with SessionLocal() as db:
+        return list((await db.execute(query)).scalars())
+
+async def run(
+    users: int = 10,
+    recipients_per_user: int = 3,
+    reads_per_user: int = 10,
+    duplicate_webhooks: float = 0.3,
+    concurrency: int = 50,
+    profiles: Optional[Dict[str, VendorProfile]] = None,
+    drain_timeout: float = 60,
+    seed: int = 0,
+) -> dict:
+    """Drive logins, dashboard reads, a call-now burst and a webhook storm; return the report"""
+    import main
+    from models.base import Base, engine
+    from models.enums import CallStatus
+    from services.call_pipeline import dialer
+    from services.worker import JobWorker
+
+    random.seed(seed)
+    profiles = profiles or parse_vendor_profiles([], 0, 0)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    os.makedirs("media", exist_ok=True)
+
+    report = {"database": engine.dialect.name, "users": users, "phases": {}}
+    async with fake_vendors(profiles, seed) as fakes:
+        client = LoadClient(main.app, concurrency)
+        worker = JobWorker()
+        worker_task = asyncio.create_task(worker.run())
+        try:
+            run_id = uuid.uuid4().hex[:8]
+
+            started = time.perf_counter()
+            tokens = await asyncio.gather(*(
+                login(client, fakes.resend, f"bench-{run_id}-{i}@carecall.club") for i in range(users)
+            ))
+            sessions = [{"Authorization": f"Bearer {token}"} for token in tokens if token]
+            report["phases"]["logins"] = round(time.perf_counter() - started, 3)
+
+            owned = await asyncio.gather(*(
+                asyncio.gather(*(create_recipient(client, headers, u * recipients_per_user + r) for r in range(recipients_per_user)))
+                for u, headers in enumerate(sessions)
+            ))
+            owned = [[recipient_id for recipient_id in ids if recipient_id] for ids in owned]
+
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                read_dashboard(client, headers, ids, reads_per_user) for headers, ids in zip(sessions, owned)
+            ))
+            report["phases"]["dashboard_reads"] = round(time.perf_counter() - started, 3)
+
+            # Every caregiver presses "call now" for every recipient at once
+            started = time.perf_counter()
+            responses = await asyncio.gather(*(
+                client.request(
+                    "POST /api/recipients/recipients/{recipient_id}/call-now", "POST",
+                    f"/api/recipients/recipients/{recipient_id}/call-now", expect=(202,), headers=headers,
+                )
+                for headers, ids in zip(sessions, owned) for recipient_id in ids
+            ))
+            report["phases"]["call_now_burst"] = round(time.perf_counter() - started, 3)
+            check_in_ids = [r.json()["check_in_id"] for r in responses if r is not None and r.status_code == 202]
+
+            async def dialed():
+                return len(await call_sids(check_in_ids)) >= len(check_in_ids)
+
+            started = time.perf_counter()
+            await wait_for(dialed, drain_timeout, interval=0.2)
+            report["phases"]["dialing"] = round(time.perf_counter() - started, 3)
+            dialed_sids = await call_sids(check_in_ids)
+
+            # Every call is answered at once; Twilio then delivers each recording
+            # callback, some of them more than once
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                answer_and_record(client, call_sid, index, 2 if random.random() < duplicate_webhooks else 1)
+                for index, call_sid in enumerate(dialed_sids)
+            ))
+            report["phases"]["webhook_storm"] = round(time.perf_counter() - started, 3)
+
+            async def processed():
+                return len(await call_sids(check_in_ids, CallStatus.COMPLETED)) >= len(dialed_sids)
+
+            started = time.perf_counter()
+            await wait_for(processed, drain_timeout, interval=0.2)
+            report["phases"]["recording_processing"] = round(time.perf_counter() - started, 3)
+
+            report["pipeline"] = {
+                "calls_requested": len(check_in_ids),
+                "calls_dialed": len(dialed_sids),
+                "recordings_processed": len(await call_sids(check_in_ids, CallStatus.COMPLETED)),
+                "vendor_requests": {name: getattr(fakes, name).requests for name in VENDORS},
+                "dial_lanes": dialer.stats()["lanes"],
+            }
+        finally:
+            worker.stop()
+            await worker_task
+            await client.close()
+    report["endpoints"] = {name: stats.summary() for name, stats in sorted(client.endpoints.items())}
+    return report
+
+def check_regressions(report: dict, max_p95_ms: Optional[float] = None, max_error_rate: Optional[float] = None,
+                      baseline: Optional[dict] = None, tolerance: float = 1.5) -> List[str]:
+    """Failures against absolute limits and, when given, a previous report's p95 per endpoint"""
+    failures = []
+    for name, stats in report["endpoints"].items():
+        if max_p95_ms is not None and stats["p95_ms"] is not None and stats["p95_ms"] > max_p95_ms:
+            failures.append(f"{name}: p95 {stats['p95_ms']}ms exceeds {max_p95_ms}ms")
+        if max_error_rate is not None and stats["error_rate"] > max_error_rate:
+            failures.append(f"{name}: error rate {stats['error_rate']} exceeds {max_error_rate}")
+        previous = (baseline or {}).get("endpoints", {}).get(name)
+        if previous and previous.get("p95_ms") and stats["p95_ms"] is not None:
+            limit = previous["p95_ms"] * tolerance
+            if stats["p95_ms"] > limit:
+                failures.append(f"{name}: p95 {stats['p95_ms']}ms is over {tolerance}x the baseline {previous['p95_ms']}ms")
+    pipeline = report.get("pipeline", {})
+    if pipeline.get("recordings_processed", 0) < pipeline.get("calls_requested", 0):
+        failures.append(
+            f"Only {pipeline.get('recordings_processed')} of {pipeline.get('calls_requested')} calls completed the pipeline"
+        )
+    return failures
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", help="Defaults to a SQLite file in a temporary directory")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--recipients", type=int, default=3, help="Recipients per user")
+    parser.add_argument("--reads", type=int, default=10, help="Dashboard page loads per user")
+    parser.add_argument("--concurrency", type=int, default=50, help="Requests in flight at once")
+    parser.add_argument("--duplicate-webhooks", type=float, default=0.3,
+                        help="Fraction of recording callbacks delivered twice")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Latency of every fake vendor")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Failure rate of every fake vendor")
+    parser.add_argument("--vendor", action="append", default=[], metavar="NAME=MS[:ERRORS]",
+                        help=f"Per-vendor override; vendors: {', '.join(VENDORS)}")
+    parser.add_argument("--dial-cps", type=float, default=0,
+                        help="Dialer calls per second; 0 dials unpaced to measure the rest of the pipeline")
+    parser.add_argument("--drain-timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the JSON report here")
+    parser.add_argument("--baseline", help="Previous report to compare p95 latency against")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="Allowed p95 growth over the baseline")
+    parser.add_argument("--max-p95-ms", type=float, help="Exit non-zero if any endpoint's p95 exceeds this")
+    parser.add_argument("--max-error-rate", type=float, help="Exit non-zero if any endpoint's error rate exceeds this")
+    args = parser.parse_args(argv)
+
+    output = Path(args.output).resolve() if args.output else None
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+    workdir = tempfile.mkdtemp(prefix="carecall-bench-")
+    # Settings are read at import time, so they must be in place before the app loads
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir}/bench.db"
+    os.environ.setdefault("JWT_SECRET", "bench-secret")
+    os.environ.setdefault("RESEND_API_KEY", "bench-key")
+    os.environ.setdefault("BASE_URL", "http://carecall.test")
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    os.environ["DIAL_CPS"] = str(args.dial_cps)
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    # Generated audio lands under the temporary directory, not the checkout
+    os.chdir(workdir)
+
+    profiles = parse_vendor_profiles(args.vendor, args.latency_ms, args.error_rate)
+    report = asyncio.run(run(
+        users=args.users,
+        recipients_per_user=args.recipients,
+        reads_per_user=args.reads,
+        duplicate_webhooks=args.duplicate_webhooks,
+        concurrency=args.concurrency,
+        profiles=profiles,
+        drain_timeout=args.drain_timeout,
+        seed=args.seed,
+    ))
+    print(json.dumps(report, indent=2))
+    if output:
+        output.write_text(json.dumps(report, indent=2))
+
+    failures = check_regressions(report, args.max_p95_ms, args.max_error_rate, baseline, args.tolerance)
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
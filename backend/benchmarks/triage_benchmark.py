@@ -0,0 +1,77 @@
+"""
+Precision and speed of the rule-based triage fast path.
+
+Run from the backend directory: python -m benchmarks.triage_benchmark
+"""
+import sys
+import json
+import time
+import argparse
+from collections import Counter
+from pathlib import Path
+
+from services.triage import TriageClassifier
+
+DEFAULT_FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "triage_transcripts.json"
+
+def evaluate(classifier: TriageClassifier, cases: list) -> dict:
+    decided = Counter()
+    correct = Counter()
+    truth = Counter(case["label"] for case in cases)
+    for case in cases:
+        result = classifier.classify(case["transcript"])
+        if result.status is None:
+            continue
+        decided[result.status.value] += 1
+        if result.status.value == case["label"]:
+            correct[result.status.value] += 1
+
+    report = {"cases": len(cases), "decided": sum(decided.values()), "per_status": {}}
+    for status in sorted(decided.keys() | {"OK", "EMERGENCY"}):
+        report["per_status"][status] = {
+            "decided": decided[status],
+            "precision": round(correct[status] / decided[status], 4) if decided[status] else None,
+            "recall": round(correct[status] / truth[status], 4) if truth[status] else None,
+        }
+    report["coverage"] = round(report["decided"] / len(cases), 4) if cases else 0.0
+    report["precision"] = round(sum(correct.values()) / report["decided"], 4) if report["decided"] else None
+    return report
+
+def measure_speed(classifier: TriageClassifier, cases: list, iterations: int) -> dict:
+    transcripts = [case["transcript"] for case in cases]
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for transcript in transcripts:
+            classifier.classify(transcript)
+    elapsed = time.perf_counter() - started
+    total = iterations * len(transcripts)
+    return {
+        "classifications": total,
+        "mean_microseconds": round(elapsed / total * 1e6, 2),
+        "per_second": round(total / elapsed),
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fixtures", default=str(DEFAULT_FIXTURES))
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--min-precision", type=float, default=1.0,
+                        help="Exit non-zero if precision on decided cases falls below this")
+    args = parser.parse_args(argv)
+
+    cases = json.loads(Path(args.fixtures).read_text())
+    started = time.perf_counter()
+    classifier = TriageClassifier()
+    build_ms = (time.perf_counter() - started) * 1000
+
+    report = evaluate(classifier, cases)
+    report["build_milliseconds"] = round(build_ms, 2)
+    report["speed"] = measure_speed(classifier, cases, args.iterations)
+    print(json.dumps(report, indent=2))
+
+    if report["precision"] is not None and report["precision"] < args.min_precision:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,30 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
 from dotenv import load_dotenv
 import logging
-from models.base import engine, Base, wait_for_db
+from models.base import engine, Base, wait_for_db, pool_stats, verify_pool_budget
 from api import email_auth, recipients, checkins
-import sys
+from services.scheduler import scheduler
+from services.status_summary import summary_refresher
+from services.worker import JobWorker
+from services.vendors import vendor_pool_stats, shutdown_pools
+from services.tts_cache import tts_cache_stats
+from services.registry import registry
+from services.email_dispatcher import get_email_dispatcher, close_email_dispatcher
+from services.metrics import metrics, REQUEST_LATENCY, CONTENT_TYPE, collect_job_queue_depth
+from services.logging_config import configure_logging, shutdown_logging, AccessLog
+from services.tracing import TRACEPARENT, instrument_engine, span, tracer
+import time
+import asyncio
 from sqlalchemy import text
 
 # Load environment variables
 load_dotenv(verbose=True)
 
-# Configure logging
-logging.basicConfig(
-    level=os.getenv("LOG_LEVEL", "DEBUG").upper(),  # Set default to DEBUG for more info
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s - %(pathname)s:%(lineno)d',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+# Configure logging: JSON lines written by a background thread (LOG_LEVEL, LOG_FORMAT)
+configure_logging()
 logger = logging.getLogger("carecall")
 
 # Debug: Print environment variables and configuration
@@ -48,13 +55,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+access_log = AccessLog()
+
 @app.middleware("http")
-async def log_requests(request: Request, call_next):
-    logger.debug(f"Incoming request: {request.method} {request.url}")
-    logger.debug(f"Request headers: {request.headers}")
-    response = await call_next(request)
-    logger.debug(f"Response status: {response.status_code}")
-    return response
+async def observe_request(request: Request, call_next):
+    started = time.perf_counter()
+    status_code = 500
+    # Continue a caller's trace; Twilio callbacks carry it in the query string
+    traceparent = request.headers.get(TRACEPARENT) or request.query_params.get(TRACEPARENT)
+    with span(f"{request.method} {request.url.path}", traceparent=traceparent, kind="server") as request_span:
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            duration = time.perf_counter() - started
+            # Label by route template, not raw path, so ids do not create new series
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            REQUEST_LATENCY.observe(duration, method=request.method, route=route, status=str(status_code))
+            trace_fields = {}
+            if request_span is not None:
+                request_span.name = f"{request.method} {route}"
+                request_span.set("http.status_code", status_code)
+                trace_fields["trace_id"] = request_span.trace_id
+            access_log.log(request.method, request.url.path, route, status_code, duration * 1000, request.headers, **trace_fields)
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    await collect_job_queue_depth()
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
 
 # Health check endpoint
 @app.get("/health")
@@ -69,6 +99,30 @@ async def health_check():
         logger.error(f"Health check failed: {str(e)}")
         raise HTTPException(status_code=503, detail="Database connection failed")
 
+# Vendor thread pool and TTS cache metrics
+@app.get("/health/vendors")
+async def vendor_health():
+    return {"pools": vendor_pool_stats(), "tts_cache": tts_cache_stats(), "email": get_email_dispatcher().stats()}
+
+# Database connection pool metrics
+@app.get("/health/db")
+async def database_health():
+    return pool_stats()
+
+# Batched transcript analysis metrics
+@app.get("/health/analysis")
+async def analysis_health():
+    # Import here to avoid loading the pipeline at startup
+    from services.call_pipeline import analysis_batcher
+    return analysis_batcher.stats()
+
+# Dial pacing and per-lane queue latency
+@app.get("/health/dialer")
+async def dialer_health():
+    # Import here to avoid loading the pipeline at startup
+    from services.call_pipeline import dialer
+    return dialer.stats()
+
 # Include routers
 app.include_router(email_auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(recipients.router, prefix="/api/recipients", tags=["recipients"])
@@ -94,13 +148,31 @@ async def startup():
             except Exception as e:
                 logger.warning(f"Could not create directory {dir_path}: {str(e)}")
         
+        # A span per SQL statement whenever the caller is inside a traced request or job
+        instrument_engine(engine)
+
         # Wait for database to be ready
         await wait_for_db(engine)
+        await verify_pool_budget(engine)
             
         # Create database tables
         async with engine.begin() as conn:
             logger.info("Creating database tables...")
             await conn.run_sync(Base.metadata.create_all)
+
+        # Start the preferred-time scheduler when enabled
+        if os.getenv("SCHEDULER_ENABLED", "false").lower() == "true":
+            await scheduler.start()
+
+        # Optionally run a job worker inside the API process (single-container deployments)
+        if os.getenv("JOB_WORKER_IN_PROCESS", "false").lower() == "true":
+            app.state.job_worker = JobWorker()
+            app.state.job_worker_task = asyncio.create_task(app.state.job_worker.run())
+            await summary_refresher.start()
+
+        # Build vendor models and clients in the background instead of on the first call
+        if os.getenv("WARM_CLIENTS", os.getenv("JOB_WORKER_IN_PROCESS", "false")).lower() == "true":
+            asyncio.create_task(registry.warm())
             
         logger.info("Application startup complete")
     except Exception as e:
@@ -111,11 +183,21 @@ async def startup():
 async def shutdown():
     try:
         logger.info("Shutting down application...")
+        await scheduler.stop()
+        await summary_refresher.stop()
+        if getattr(app.state, "job_worker", None) is not None:
+            app.state.job_worker.stop()
+            await app.state.job_worker_task
+        await close_email_dispatcher()
+        shutdown_pools()
         await engine.dispose()
         logger.info("Application shutdown complete")
     except Exception as e:
         logger.error(f"Shutdown error: {str(e)}")
         raise
+    finally:
+        tracer.shutdown()
+        shutdown_logging()
 
 @app.get("/")
 async def root():
@@ -0,0 +1,84 @@
+"""Create the users, recipients and check-ins tables
+
+Revision ID: 0000_baseline
+Revises:
+Create Date: 2026-10-17 08:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0000_baseline'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+check_in_status = sa.Enum('OK', 'CONCERN', 'EMERGENCY', 'NO_ANSWER', name='checkinstatus')
+
+
+def upgrade() -> None:
+    # Databases created by create_all before migrations existed already have these tables
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'users' not in existing:
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('email', sa.String(), nullable=True),
+            sa.Column('name', sa.String(), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+        op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+
+    if 'recipients' not in existing:
+        op.create_table(
+            'recipients',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('name', sa.String(), nullable=True),
+            sa.Column('phone_number', sa.String(), nullable=True),
+            sa.Column('condition', sa.String(), nullable=True),
+            sa.Column('preferred_time', sa.String(), nullable=True),
+            sa.Column('emergency_contact_name', sa.String(), nullable=True),
+            sa.Column('emergency_contact_phone', sa.String(), nullable=True),
+            sa.Column('emergency_contact_email', sa.String(), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index(op.f('ix_recipients_id'), 'recipients', ['id'], unique=False)
+
+    if 'check_ins' not in existing:
+        op.create_table(
+            'check_ins',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('recipient_id', sa.Integer(), nullable=True),
+            sa.Column('status', check_in_status, nullable=False),
+            sa.Column('transcript', sa.Text(), nullable=True),
+            sa.Column('summary', sa.Text(), nullable=True),
+            sa.Column('audio_url', sa.String(), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column('call_metadata', sa.JSON(), nullable=True),
+            sa.ForeignKeyConstraint(['recipient_id'], ['recipients.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index(op.f('ix_check_ins_id'), 'check_ins', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_check_ins_id'), table_name='check_ins')
+    op.drop_table('check_ins')
+    check_in_status.drop(op.get_bind(), checkfirst=True)
+    op.drop_index(op.f('ix_recipients_id'), table_name='recipients')
+    op.drop_table('recipients')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_table('users')
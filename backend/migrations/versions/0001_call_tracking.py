@@ -0,0 +1,61 @@
+"""Add call tracking table and check-in completion time
+
+Revision ID: 0001_call_tracking
+Revises: 0000_baseline
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001_call_tracking'
+down_revision: Union[str, None] = '0000_baseline'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+call_status = sa.Enum('QUEUED', 'INITIATED', 'IN_PROGRESS', 'COMPLETED', 'FAILED', name='callstatus')
+
+
+def upgrade() -> None:
+    # The app also runs create_all at startup, so only add what is missing
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+
+    if 'completed_at' not in {c['name'] for c in inspector.get_columns('check_ins')}:
+        op.add_column('check_ins', sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True))
+
+    if 'calls' not in tables:
+        op.create_table(
+            'calls',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('check_in_id', sa.Integer(), nullable=False),
+            sa.Column('call_sid', sa.String(), nullable=True),
+            sa.Column('status', call_status, nullable=False),
+            sa.Column('error', sa.Text(), nullable=True),
+            sa.Column('queued_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column('dialed_at', sa.DateTime(), nullable=True),
+            sa.Column('answered_at', sa.DateTime(), nullable=True),
+            sa.Column('completed_at', sa.DateTime(), nullable=True),
+            sa.Column('recording_sid', sa.String(), nullable=True),
+            sa.Column('recording_url', sa.String(), nullable=True),
+            sa.ForeignKeyConstraint(['check_in_id'], ['check_ins.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index(op.f('ix_calls_id'), 'calls', ['id'], unique=False)
+        op.create_index(op.f('ix_calls_check_in_id'), 'calls', ['check_in_id'], unique=False)
+        op.create_index(op.f('ix_calls_call_sid'), 'calls', ['call_sid'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_calls_call_sid'), table_name='calls')
+    op.drop_index(op.f('ix_calls_check_in_id'), table_name='calls')
+    op.drop_index(op.f('ix_calls_id'), table_name='calls')
+    op.drop_table('calls')
+    call_status.drop(op.get_bind(), checkfirst=True)
+    # SQLite cannot drop a column in place; batch mode recreates the table there
+    with op.batch_alter_table('check_ins') as batch_op:
+        batch_op.drop_column('completed_at')
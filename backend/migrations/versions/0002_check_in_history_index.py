@@ -0,0 +1,34 @@
+"""Add composite index for check-in history pages
+
+Revision ID: 0002_check_in_history_index
+Revises: 0001_call_tracking
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002_check_in_history_index'
+down_revision: Union[str, None] = '0001_call_tracking'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The app also runs create_all at startup, so the index may already exist
+    inspector = sa.inspect(op.get_bind())
+    if 'ix_check_ins_recipient_id_created_at' not in {i['name'] for i in inspector.get_indexes('check_ins')}:
+        op.create_index(
+            'ix_check_ins_recipient_id_created_at',
+            'check_ins',
+            ['recipient_id', sa.text('created_at DESC')],
+            unique=False,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_check_ins_recipient_id_created_at', table_name='check_ins')
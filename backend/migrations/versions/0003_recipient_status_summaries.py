@@ -0,0 +1,46 @@
+"""Add maintained per-recipient status summaries
+
+Revision ID: 0003_recipient_status_summaries
+Revises: 0002_check_in_history_index
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003_recipient_status_summaries'
+down_revision: Union[str, None] = '0002_check_in_history_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+check_in_status = sa.Enum('OK', 'CONCERN', 'EMERGENCY', 'NO_ANSWER', name='checkinstatus', create_type=False)
+
+
+def upgrade() -> None:
+    # The app also runs create_all at startup, so the table may already exist.
+    # Rows are filled lazily: the dashboard computes any missing summary on first read.
+    if 'recipient_status_summaries' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'recipient_status_summaries',
+        sa.Column('recipient_id', sa.Integer(), nullable=False),
+        sa.Column('last_check_in_id', sa.Integer(), nullable=True),
+        sa.Column('last_status', check_in_status, nullable=True),
+        sa.Column('last_summary', sa.Text(), nullable=True),
+        sa.Column('last_call_at', sa.DateTime(), nullable=True),
+        sa.Column('concerns_7d', sa.Integer(), nullable=False),
+        sa.Column('concerns_30d', sa.Integer(), nullable=False),
+        sa.Column('stale_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['recipient_id'], ['recipients.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['last_check_in_id'], ['check_ins.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('recipient_id'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('recipient_status_summaries')
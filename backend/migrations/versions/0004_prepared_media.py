@@ -0,0 +1,53 @@
+"""Add media pre-rendered ahead of scheduled calls
+
+Revision ID: 0004_prepared_media
+Revises: 0003_recipient_status_summaries
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004_prepared_media'
+down_revision: Union[str, None] = '0003_recipient_status_summaries'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+prepared_media_status = sa.Enum('PENDING', 'READY', 'USED', name='preparedmediastatus')
+
+
+def upgrade() -> None:
+    # The app also runs create_all at startup, so the table may already exist
+    if 'prepared_media' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'prepared_media',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('recipient_id', sa.Integer(), nullable=False),
+        sa.Column('scheduled_for', sa.DateTime(), nullable=False),
+        sa.Column('status', prepared_media_status, nullable=False),
+        sa.Column('fingerprint', sa.String(), nullable=True),
+        sa.Column('script', sa.Text(), nullable=True),
+        sa.Column('audio_path', sa.String(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('check_in_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('prepared_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['recipient_id'], ['recipients.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['check_in_id'], ['check_ins.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('recipient_id', 'scheduled_for', name='uq_prepared_media_recipient_slot'),
+    )
+    op.create_index(op.f('ix_prepared_media_id'), 'prepared_media', ['id'], unique=False)
+    op.create_index(op.f('ix_prepared_media_scheduled_for'), 'prepared_media', ['scheduled_for'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_prepared_media_scheduled_for'), table_name='prepared_media')
+    op.drop_index(op.f('ix_prepared_media_id'), table_name='prepared_media')
+    op.drop_table('prepared_media')
+    prepared_media_status.drop(op.get_bind(), checkfirst=True)
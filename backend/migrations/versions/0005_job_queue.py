@@ -0,0 +1,52 @@
+"""Add the job queue table
+
+Revision ID: 0005_job_queue
+Revises: 0004_prepared_media
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005_job_queue'
+down_revision: Union[str, None] = '0004_prepared_media'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+job_status = sa.Enum('QUEUED', 'RUNNING', 'DONE', 'FAILED', name='jobstatus')
+
+
+def upgrade() -> None:
+    # The app also runs create_all at startup, so the table may already exist
+    if 'jobs' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            'jobs',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('kind', sa.String(), nullable=False),
+            sa.Column('payload', sa.JSON(), nullable=False),
+            sa.Column('status', job_status, nullable=False),
+            sa.Column('attempts', sa.Integer(), nullable=False),
+            sa.Column('max_attempts', sa.Integer(), nullable=False),
+            sa.Column('run_at', sa.DateTime(), nullable=False),
+            sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+            sa.Column('locked_by', sa.String(), nullable=True),
+            sa.Column('last_error', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index(op.f('ix_jobs_id'), 'jobs', ['id'], unique=False)
+        op.create_index(op.f('ix_jobs_status'), 'jobs', ['status'], unique=False)
+        op.create_index(op.f('ix_jobs_run_at'), 'jobs', ['run_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_jobs_run_at'), table_name='jobs')
+    op.drop_index(op.f('ix_jobs_status'), table_name='jobs')
+    op.drop_index(op.f('ix_jobs_id'), table_name='jobs')
+    op.drop_table('jobs')
+    job_status.drop(op.get_bind(), checkfirst=True)
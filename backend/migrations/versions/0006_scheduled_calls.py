@@ -0,0 +1,44 @@
+"""Add scheduled call claims
+
+Revision ID: 0006_scheduled_calls
+Revises: 0005_job_queue
+Create Date: 2026-10-17 16:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006_scheduled_calls'
+down_revision: Union[str, None] = '0005_job_queue'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The app also runs create_all at startup, so the table may already exist
+    if 'scheduled_calls' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'scheduled_calls',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('recipient_id', sa.Integer(), nullable=False),
+        sa.Column('scheduled_for', sa.DateTime(), nullable=False),
+        sa.Column('check_in_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['recipient_id'], ['recipients.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['check_in_id'], ['check_ins.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('recipient_id', 'scheduled_for', name='uq_scheduled_calls_recipient_slot'),
+    )
+    op.create_index(op.f('ix_scheduled_calls_id'), 'scheduled_calls', ['id'], unique=False)
+    op.create_index(op.f('ix_scheduled_calls_scheduled_for'), 'scheduled_calls', ['scheduled_for'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_scheduled_calls_scheduled_for'), table_name='scheduled_calls')
+    op.drop_index(op.f('ix_scheduled_calls_id'), table_name='scheduled_calls')
+    op.drop_table('scheduled_calls')
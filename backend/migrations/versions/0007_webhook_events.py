@@ -0,0 +1,43 @@
+"""Add webhook event records
+
+Revision ID: 0007_webhook_events
+Revises: 0006_scheduled_calls
+Create Date: 2026-10-17 16:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007_webhook_events'
+down_revision: Union[str, None] = '0006_scheduled_calls'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The app also runs create_all at startup, so the table may already exist
+    if 'webhook_events' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'webhook_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('call_sid', sa.String(), nullable=False),
+        sa.Column('recording_sid', sa.String(), nullable=False),
+        sa.Column('recording_url', sa.String(), nullable=True),
+        sa.Column('payload', sa.JSON(), nullable=True),
+        sa.Column('job_id', sa.String(), nullable=True),
+        sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('call_sid', 'recording_sid', name='uq_webhook_events_call_recording'),
+    )
+    op.create_index(op.f('ix_webhook_events_id'), 'webhook_events', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_webhook_events_id'), table_name='webhook_events')
+    op.drop_table('webhook_events')
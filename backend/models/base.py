@@ -1,12 +1,15 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
-from typing import AsyncGenerator
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from typing import AsyncGenerator, Optional, Tuple
+from collections import deque
 import os
+import time
 import logging
 from pathlib import Path
 from dotenv import load_dotenv
 import asyncio
-from sqlalchemy import text
+from sqlalchemy import exc, text
 
 # Load environment variables
 load_dotenv(verbose=True)
@@ -48,6 +51,10 @@ def get_database_url() -> str:
         logger.debug(f"Using fallback SQLite URL: {fallback_url}")
         return fallback_url
     
+    # The async engine needs an async driver for SQLite URLs
+    if database_url.startswith("sqlite://"):
+        database_url = database_url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    
     try:
         # For Cloud SQL with Unix socket
         if "/cloudsql/" in database_url:
@@ -64,6 +71,104 @@ def get_database_url() -> str:
         logger.error(f"Error parsing database URL: {str(e)}")
         raise
 
+# Checkouts that wait longer than this are logged as pool saturation
+DB_POOL_SLOW_CHECKOUT_MS = float(os.getenv("DB_POOL_SLOW_CHECKOUT_MS", "100"))
+
+class CheckoutStats:
+    """Wait times for connection checkouts from the pool"""
+
+    def __init__(self, window: int = 1000):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._recent = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.checkouts += 1
+        self.total_wait += seconds
+        self.max_wait = max(self.max_wait, seconds)
+        self._recent.append(seconds)
+        if seconds * 1000 >= DB_POOL_SLOW_CHECKOUT_MS:
+            logger.warning(f"Database connection checkout waited {seconds * 1000:.0f}ms")
+
+    def snapshot(self) -> dict:
+        recent = sorted(self._recent)
+
+        def percentile(p: float) -> Optional[float]:
+            if not recent:
+                return None
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))] * 1000, 2)
+
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_mean_ms": round(self.total_wait / self.checkouts * 1000, 2) if self.checkouts else None,
+            "wait_max_ms": round(self.max_wait * 1000, 2),
+            "wait_p50_ms": percentile(0.5),
+            "wait_p95_ms": percentile(0.95),
+            "wait_p99_ms": percentile(0.99),
+        }
+
+checkout_stats = CheckoutStats()
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Async queue pool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            checkout_stats.timeouts += 1
+            raise
+        checkout_stats.record(time.perf_counter() - started)
+        return connection
+
+    def resized(self, pool_size: int, max_overflow: int) -> "InstrumentedPool":
+        """A copy of this pool with new limits, like recreate()"""
+        return self.__class__(
+            self._creator,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pre_ping=self._pre_ping,
+            use_lifo=self._pool.use_lifo,
+            timeout=self._timeout,
+            recycle=self._recycle,
+            echo=self.echo,
+            logging_name=self._orig_logging_name,
+            reset_on_return=self._reset_on_return,
+            _dispatch=self.dispatch,
+            dialect=self._dialect,
+        )
+
+# Pool sizing. With DB_POOL_AUTOTUNE=true the pool is derived from the database's
+# connection limit shared across every process, instead of DB_POOL_SIZE/DB_MAX_OVERFLOW.
+# The limit is read from the server at startup (SHOW max_connections); DB_MAX_CONNECTIONS
+# only sizes the pool until then, or overrides a lower limit set by a proxy such as PgBouncer.
+DB_POOL_AUTOTUNE = os.getenv("DB_POOL_AUTOTUNE", "false").lower() == "true"
+DB_MAX_CONNECTIONS_SET = "DB_MAX_CONNECTIONS" in os.environ
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "20"))
+DB_RESERVED_CONNECTIONS = int(os.getenv("DB_RESERVED_CONNECTIONS", "5"))  # Admin, migrations, workers
+DB_MAX_INSTANCES = int(os.getenv("DB_MAX_INSTANCES", "1"))  # e.g. Cloud Run max instances
+WORKERS = int(os.getenv("WORKERS", "1"))  # Processes per instance
+
+# The pool settings the engine was created with, for the metrics endpoint
+pool_config = {}
+
+def autotune_pool(
+    max_connections: int,
+    instances: int,
+    workers: int,
+    reserved: int = DB_RESERVED_CONNECTIONS,
+) -> Tuple[int, int]:
+    """Split the connection budget across processes: (pool_size, max_overflow) per process"""
+    processes = max(1, instances) * max(1, workers)
+    per_process = max(1, (max_connections - reserved) // processes)
+    # Keep a quarter of each share as overflow so idle processes hold fewer connections
+    pool_size = max(1, per_process - per_process // 4)
+    return pool_size, per_process - pool_size
+
 def get_engine_args():
     """Get engine arguments based on database type"""
     url = get_database_url()
@@ -77,12 +182,28 @@ def get_engine_args():
     # Add pooling settings only for PostgreSQL
     if "postgresql" in url:
         logger.debug("Using PostgreSQL engine args")
+        if DB_POOL_AUTOTUNE:
+            pool_size, max_overflow = autotune_pool(DB_MAX_CONNECTIONS, DB_MAX_INSTANCES, WORKERS)
+            logger.info(
+                f"Autotuned database pool: size {pool_size}, overflow {max_overflow} "
+                f"({DB_MAX_CONNECTIONS} connections across {DB_MAX_INSTANCES}x{WORKERS} processes)"
+            )
+        else:
+            pool_size = int(os.getenv("DB_POOL_SIZE", "5"))
+            max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "10"))
         args.update({
-            "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
-            "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            "poolclass": InstrumentedPool,
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
             "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
             "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
         })
+        pool_config.update(
+            autotune=DB_POOL_AUTOTUNE,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=args["pool_timeout"],
+        )
     elif "sqlite" in url:
         # SQLite-specific settings
         logger.debug("Using SQLite engine args")
@@ -98,6 +219,61 @@ engine = create_async_engine(
     **get_engine_args()
 )
 
+def pool_stats(pool=None) -> dict:
+    """Current pool occupancy plus checkout wait times"""
+    pool = pool or engine.pool
+    stats = {"pool_class": type(pool).__name__, **pool_config}
+    if hasattr(pool, "checkedout"):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(0, pool.overflow()),  # Negative while the base pool is still filling
+        )
+    stats.update(checkout_stats.snapshot())
+    return stats
+
+async def verify_pool_budget(engine) -> Optional[int]:
+    """Check the pools against the server's max_connections at startup.
+
+    With DB_POOL_AUTOTUNE the pool is resized to this process's share of the real limit
+    (capped by DB_MAX_CONNECTIONS when set); otherwise an oversized pool is only reported.
+    """
+    if engine.dialect.name != "postgresql" or not pool_config:
+        return None
+    try:
+        async with engine.connect() as conn:
+            max_connections = int((await conn.execute(text("SHOW max_connections"))).scalar_one())
+    except Exception as e:
+        if DB_POOL_AUTOTUNE and not DB_MAX_CONNECTIONS_SET:
+            raise RuntimeError(
+                f"Could not read max_connections to autotune the pool ({str(e)}); set DB_MAX_CONNECTIONS"
+            ) from e
+        logger.warning(f"Could not read max_connections: {str(e)}")
+        return None
+
+    if DB_POOL_AUTOTUNE:
+        budget = min(max_connections, DB_MAX_CONNECTIONS) if DB_MAX_CONNECTIONS_SET else max_connections
+        pool_size, max_overflow = autotune_pool(budget, DB_MAX_INSTANCES, WORKERS)
+        if (pool_size, max_overflow) != (pool_config["pool_size"], pool_config["max_overflow"]):
+            old_pool = engine.sync_engine.pool
+            engine.sync_engine.pool = old_pool.resized(pool_size, max_overflow)
+            old_pool.dispose()
+            pool_config.update(pool_size=pool_size, max_overflow=max_overflow)
+            logger.info(
+                f"Resized database pool to size {pool_size}, overflow {max_overflow} "
+                f"({budget} connections across {DB_MAX_INSTANCES}x{WORKERS} processes)"
+            )
+        return max_connections
+
+    demand = (pool_config["pool_size"] + pool_config["max_overflow"]) * max(1, DB_MAX_INSTANCES) * max(1, WORKERS)
+    if demand > max_connections - DB_RESERVED_CONNECTIONS:
+        logger.warning(
+            f"Database pools can open {demand} connections but the server allows {max_connections} "
+            f"({DB_RESERVED_CONNECTIONS} reserved); set DB_POOL_AUTOTUNE=true or lower DB_POOL_SIZE"
+        )
+    return max_connections
+
 # Create async session factory
 SessionLocal = sessionmaker(
     engine,
@@ -110,15 +286,12 @@ SessionLocal = sessionmaker(
 # Create declarative base
 Base = declarative_base()
 
-# Async session dependency
+# Request-scoped session dependency. It checks out a connection only when the
+# first statement runs; pool_pre_ping replaces the old SELECT 1 probe.
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
-    try:
-        async with SessionLocal() as session:
-            # Test the connection
-            async with session.begin():
-                await session.execute(text("SELECT 1"))
-            logger.debug("Database session created successfully")
+    async with SessionLocal() as session:
+        try:
             yield session
-    except Exception as e:
-        logger.error(f"Error in database session: {str(e)}")
-        raise 
\ No newline at end of file
+        except Exception:
+            await session.rollback()
+            raise
@@ -4,4 +4,22 @@ class CheckInStatus(str, enum.Enum):
     OK = "OK"
     CONCERN = "CONCERN"
     EMERGENCY = "EMERGENCY"
-    NO_ANSWER = "NO_ANSWER" 
\ No newline at end of file
+    NO_ANSWER = "NO_ANSWER" 
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+
+class CallStatus(str, enum.Enum):
+    QUEUED = "QUEUED"
+    INITIATED = "INITIATED"
+    IN_PROGRESS = "IN_PROGRESS"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
+class PreparedMediaStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    READY = "READY"
+    USED = "USED"
@@ -1,9 +1,9 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Text, Enum, JSON
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Text, Enum, JSON, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from .base import Base
-from .enums import CheckInStatus
+from .enums import CheckInStatus, JobStatus, CallStatus, PreparedMediaStatus
 
 class User(Base):
     __tablename__ = "users"
@@ -46,7 +46,112 @@ class CheckIn(Base):
     summary = Column(Text, nullable=True)
     audio_url = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    completed_at = Column(DateTime(timezone=True), nullable=True)
     call_metadata = Column(JSON, nullable=True)
 
     # Relationships
-    recipient = relationship("Recipient", back_populates="check_ins") 
\ No newline at end of file
+    recipient = relationship("Recipient", back_populates="check_ins")
+    calls = relationship("Call", back_populates="check_in")
+
+    # History pages read one recipient's newest check-ins first
+    __table_args__ = (
+        Index("ix_check_ins_recipient_id_created_at", recipient_id, created_at.desc()),
+    )
+
+class Call(Base):
+    """Outbound phone call placed for a check-in, looked up by Twilio CallSid"""
+    __tablename__ = "calls"
+
+    id = Column(Integer, primary_key=True, index=True)
+    check_in_id = Column(Integer, ForeignKey("check_ins.id", ondelete="CASCADE"), nullable=False, index=True)
+    call_sid = Column(String, unique=True, index=True, nullable=True)  # Set once Twilio accepts the call
+    status = Column(Enum(CallStatus), nullable=False, default=CallStatus.QUEUED)
+    error = Column(Text, nullable=True)
+    queued_at = Column(DateTime(timezone=True), server_default=func.now())
+    dialed_at = Column(DateTime, nullable=True)  # UTC
+    answered_at = Column(DateTime, nullable=True)  # UTC
+    completed_at = Column(DateTime, nullable=True)  # UTC
+    recording_sid = Column(String, nullable=True)
+    recording_url = Column(String, nullable=True)
+
+    # Relationships
+    check_in = relationship("CheckIn", back_populates="calls")
+
+class ScheduledCall(Base):
+    """Claim on a recipient's scheduled slot, so a slot is dialed at most once"""
+    __tablename__ = "scheduled_calls"
+    __table_args__ = (
+        UniqueConstraint("recipient_id", "scheduled_for", name="uq_scheduled_calls_recipient_slot"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipient_id = Column(Integer, ForeignKey("recipients.id", ondelete="CASCADE"), nullable=False)
+    scheduled_for = Column(DateTime, nullable=False, index=True)  # Minute slot in UTC
+    check_in_id = Column(Integer, ForeignKey("check_ins.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class PreparedMedia(Base):
+    """Script and audio rendered ahead of a recipient's scheduled slot"""
+    __tablename__ = "prepared_media"
+    __table_args__ = (
+        UniqueConstraint("recipient_id", "scheduled_for", name="uq_prepared_media_recipient_slot"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipient_id = Column(Integer, ForeignKey("recipients.id", ondelete="CASCADE"), nullable=False)
+    scheduled_for = Column(DateTime, nullable=False, index=True)  # Minute slot in UTC
+    status = Column(Enum(PreparedMediaStatus), nullable=False, default=PreparedMediaStatus.PENDING)
+    fingerprint = Column(String, nullable=True)  # Recipient details the script was written for
+    script = Column(Text, nullable=True)
+    audio_path = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+    check_in_id = Column(Integer, ForeignKey("check_ins.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    prepared_at = Column(DateTime, nullable=True)  # UTC
+
+class Job(Base):
+    """Background job persisted in the database-backed job queue"""
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.QUEUED, index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_at = Column(DateTime, nullable=False, index=True)  # UTC
+    lease_expires_at = Column(DateTime, nullable=True)  # UTC
+    locked_by = Column(String, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class WebhookEvent(Base):
+    """Inbound Twilio callback, recorded once per (call_sid, recording_sid) before processing"""
+    __tablename__ = "webhook_events"
+    __table_args__ = (
+        UniqueConstraint("call_sid", "recording_sid", name="uq_webhook_events_call_recording"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    call_sid = Column(String, nullable=False)
+    recording_sid = Column(String, nullable=False, default="")  # Empty when Twilio sends none
+    recording_url = Column(String, nullable=True)
+    payload = Column(JSON, nullable=True)
+    job_id = Column(String, nullable=True)
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed_at = Column(DateTime, nullable=True)  # UTC
+
+class RecipientStatusSummary(Base):
+    """Per-recipient dashboard figures, kept current as check-ins are finalized"""
+    __tablename__ = "recipient_status_summaries"
+
+    recipient_id = Column(Integer, ForeignKey("recipients.id", ondelete="CASCADE"), primary_key=True)
+    last_check_in_id = Column(Integer, ForeignKey("check_ins.id", ondelete="SET NULL"), nullable=True)
+    last_status = Column(Enum(CheckInStatus), nullable=True)
+    last_summary = Column(Text, nullable=True)
+    last_call_at = Column(DateTime, nullable=True)  # UTC, completion time of the last check-in
+    concerns_7d = Column(Integer, nullable=False, default=0)
+    concerns_30d = Column(Integer, nullable=False, default=0)
+    stale_at = Column(DateTime, nullable=True)  # UTC, when a counted concern leaves a window
+    updated_at = Column(DateTime, nullable=False)  # UTC
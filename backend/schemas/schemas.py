@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Optional, List, Annotated
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import AliasChoices, BaseModel, EmailStr, Field
 
 from models.enums import CheckInStatus
 
@@ -64,7 +64,8 @@ class CheckInBase(BaseModel):
     transcript: Optional[str] = None
     summary: Optional[str] = None
     audio_url: Optional[str] = None
-    metadata: Optional[dict] = None
+    # Stored as call_metadata; the ORM's own `metadata` attribute is the table registry
+    metadata: Optional[dict] = Field(default=None, validation_alias=AliasChoices("call_metadata", "metadata"))
 
 class CheckInCreate(CheckInBase):
     recipient_id: int
@@ -73,10 +74,30 @@ class CheckIn(CheckInBase):
     id: int
     recipient_id: int
     created_at: datetime
+    completed_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+class CheckInPage(BaseModel):
+    items: List[CheckIn]
+    next_cursor: Optional[str] = None  # Pass back as `cursor` for the next page; None on the last page
+
+class RecipientStatus(BaseModel):
+    last_check_in_id: Optional[int] = None
+    last_status: Optional[CheckInStatus] = None
+    last_summary: Optional[str] = None
+    last_call_at: Optional[datetime] = None
+    concerns_7d: int = 0  # CONCERN or EMERGENCY check-ins
+    concerns_30d: int = 0
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class RecipientDashboardEntry(Recipient):
+    status: RecipientStatus
+
 class Token(BaseModel):
     access_token: str
     token_type: str
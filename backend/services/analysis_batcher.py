@@ -0,0 +1,208 @@
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import update
+
+from models.base import SessionLocal
+from models.models import CheckIn
+from models.enums import CheckInStatus
+
+logger = logging.getLogger("carecall")
+
+ANALYSIS_BATCH_WINDOW_SECONDS = float(os.getenv("ANALYSIS_BATCH_WINDOW_SECONDS", "2.0"))
+ANALYSIS_BATCH_MAX_SIZE = int(os.getenv("ANALYSIS_BATCH_MAX_SIZE", "25"))
+
+class AnalysisError(Exception):
+    """The batch did not produce a usable result for an item"""
+
+@dataclass
+class AnalysisItem:
+    check_in_id: int
+    transcript: str
+    recipient_name: str
+    condition: str
+
+@dataclass
+class AnalysisResult:
+    check_in_id: int
+    status: CheckInStatus
+    notes: str
+
+def build_batch_prompt(items: List[AnalysisItem]) -> str:
+    entries = json.dumps([
+        {
+            "id": item.check_in_id,
+            "name": item.recipient_name,
+            "condition": item.condition,
+            "transcript": item.transcript,
+        }
+        for item in items
+    ], indent=2)
+    return f"""Analyze these wellness check-in responses. Each item has an id, the recipient's name
+    and condition, and the transcript of their answer.
+
+    Classify each response into one of these categories:
+    - OK: Person seems well
+    - CONCERN: Some issues that need attention
+    - EMERGENCY: Immediate help needed
+
+    Also generate a brief note about each interaction.
+
+    Return only a JSON array with exactly one object per item:
+    [
+        {{"id": <item id>, "status": "OK|CONCERN|EMERGENCY", "notes": "Brief analysis"}}
+    ]
+
+    Items:
+    {entries}"""
+
+def parse_batch_response(text: str) -> Dict[int, Tuple[CheckInStatus, str]]:
+    """Map check-in id to (status, notes); entries that fail validation are left out"""
+    # Models sometimes wrap JSON in a markdown code fence
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text.strip())
+    parsed = json.loads(text)
+    if isinstance(parsed, dict):
+        parsed = parsed.get("results", [])
+
+    results = {}
+    for entry in parsed:
+        try:
+            status = CheckInStatus[str(entry["status"]).upper()]
+            results[int(entry["id"])] = (status, str(entry.get("notes", "")))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return results
+
+class AnalysisBatcher:
+    """Collects transcripts for a short window and classifies them in one LLM request"""
+
+    def __init__(
+        self,
+        classify: Callable[[str], Awaitable[str]],
+        window: float = ANALYSIS_BATCH_WINDOW_SECONDS,
+        max_size: int = ANALYSIS_BATCH_MAX_SIZE,
+        write_back: bool = True,
+    ):
+        self.classify = classify
+        self.window = window
+        self.max_size = max(1, max_size)
+        self.write_back = write_back
+        self._pending: List[Tuple[AnalysisItem, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes = set()
+        self.batches = 0
+        self.items = 0
+        self.failures = 0
+        self._recent: deque = deque(maxlen=200)  # (batch size, seconds) of recent batches
+
+    async def submit(self, item: AnalysisItem) -> AnalysisResult:
+        """Queue a transcript and wait for its classification"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._start_flush)
+        return await future
+
+    def _start_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def flush(self):
+        """Classify whatever is pending right now and wait for all running batches"""
+        self._start_flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    async def _flush(self, batch: List[Tuple[AnalysisItem, asyncio.Future]]):
+        started = time.perf_counter()
+        items = [item for item, _ in batch]
+        try:
+            parsed = parse_batch_response(await self.classify(build_batch_prompt(items)))
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Batched analysis of {len(items)} transcripts failed: {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(AnalysisError(str(e)))
+            return
+
+        results = {
+            item.check_in_id: AnalysisResult(item.check_in_id, *parsed[item.check_in_id])
+            for item in items
+            if item.check_in_id in parsed
+        }
+
+        if self.write_back and results:
+            try:
+                await self._write_back(items, results)
+            except Exception as e:
+                logger.error(f"Bulk update of analysed check-ins failed: {str(e)}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(AnalysisError(str(e)))
+                return
+
+        for item, future in batch:
+            if future.done():
+                continue
+            result = results.get(item.check_in_id)
+            if result is None:
+                future.set_exception(AnalysisError(f"No result for check-in {item.check_in_id}"))
+            else:
+                future.set_result(result)
+
+        elapsed = time.perf_counter() - started
+        self.batches += 1
+        self.items += len(items)
+        self._recent.append((len(items), elapsed))
+        logger.info(f"Analysed {len(items)} transcripts in one batch ({elapsed:.2f}s)")
+
+    async def _write_back(self, items: List[AnalysisItem], results: Dict[int, AnalysisResult]):
+        transcripts = {item.check_in_id: item.transcript for item in items}
+        async with SessionLocal() as db:
+            # ORM bulk UPDATE by primary key: one statement for the whole batch
+            await db.execute(update(CheckIn), [
+                {
+                    "id": result.check_in_id,
+                    "status": result.status,
+                    "summary": result.notes,
+                    "transcript": transcripts[result.check_in_id],
+                }
+                for result in results.values()
+            ])
+            await db.commit()
+
+    def stats(self) -> dict:
+        sizes = [size for size, _ in self._recent]
+        latencies = sorted(seconds for _, seconds in self._recent)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 4)
+
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "failures": self.failures,
+            "pending": len(self._pending),
+            "mean_batch_size": round(sum(sizes) / len(sizes), 2) if sizes else None,
+            "max_batch_size": max(sizes) if sizes else None,
+            "latency_p50_seconds": percentile(0.5),
+            "latency_p95_seconds": percentile(0.95),
+        }
@@ -0,0 +1,221 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+import jwt
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from models.models import User
+
+logger = logging.getLogger("carecall")
+
+# Auth cache settings
+AUTH_CACHE_BACKEND = os.getenv("AUTH_CACHE_BACKEND", "memory").lower()  # memory|redis
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+AUTH_TOKEN_CACHE_TTL = float(os.getenv("AUTH_TOKEN_CACHE_TTL", "300"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+# Columns kept in a cached user; enough for the routes that read current_user
+USER_FIELDS = ("id", "email", "name", "created_at", "updated_at")
+
+class TTLCache:
+    """Bounded LRU map whose entries also expire after a time-to-live"""
+
+    def __init__(self, max_entries: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires, value)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        self._entries[key] = (self.clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+def _snapshot(user: User) -> dict:
+    data = {field: getattr(user, field) for field in USER_FIELDS}
+    for field in ("created_at", "updated_at"):
+        if data[field] is not None:
+            data[field] = data[field].isoformat()
+    return data
+
+def _restore(data: dict) -> User:
+    """Detached User built from a snapshot, ready for session.merge(load=False)"""
+    values = dict(data)
+    for field in ("created_at", "updated_at"):
+        if values.get(field):
+            values[field] = datetime.fromisoformat(values[field])
+    user = User(**values)
+    make_transient_to_detached(user)
+    return user
+
+class AuthCache:
+    """Caches verified JWT subjects per token and user rows per subject"""
+
+    def __init__(
+        self,
+        secret: str,
+        algorithm: str,
+        user_ttl: float = AUTH_USER_CACHE_TTL,
+        token_ttl: float = AUTH_TOKEN_CACHE_TTL,
+        max_entries: int = AUTH_CACHE_MAX_ENTRIES,
+        redis=None,
+        use_redis: bool = AUTH_CACHE_BACKEND == "redis",
+    ):
+        self.secret = secret
+        self.algorithm = algorithm
+        self.user_ttl = user_ttl
+        self.tokens = TTLCache(max_entries, token_ttl)
+        self.users = TTLCache(max_entries, user_ttl)
+        self.use_redis = use_redis
+        self._redis = redis
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from services.redis_client import get_redis
+
+            self._redis = get_redis()
+        return self._redis
+
+    def _user_key(self, subject: str) -> str:
+        return f"carecall:auth:user:{subject}"
+
+    def verify_token(self, token: str) -> str:
+        """Return the token's subject; raises the jwt errors for bad or expired tokens"""
+        key = hashlib.sha256(token.encode()).hexdigest()
+        cached = self.tokens.get(key)
+        if cached is not None:
+            subject, expires = cached
+            if expires is not None and expires <= time.time():
+                self.tokens.delete(key)
+                raise jwt.ExpiredSignatureError("Signature has expired")
+            return subject
+
+        payload = jwt.decode(token, self.secret, algorithms=[self.algorithm])
+        subject = payload.get("sub")
+        if subject:
+            expires = payload.get("exp")
+            # Never trust a cached verification past the token's own expiry
+            ttl = self.tokens.ttl if expires is None else min(self.tokens.ttl, expires - time.time())
+            self.tokens.set(key, (subject, expires), ttl)
+        return subject
+
+    async def get_user(self, subject: str) -> Optional[User]:
+        data = self.users.get(subject)
+        if data is None and self.use_redis:
+            try:
+                raw = await self.redis.get(self._user_key(subject))
+            except Exception as e:
+                logger.warning(f"Auth cache lookup in Redis failed: {str(e)}")
+                raw = None
+            if raw:
+                data = json.loads(raw)
+                self.users.set(subject, data)
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return _restore(data)
+
+    async def set_user(self, user: User):
+        data = _snapshot(user)
+        self.users.set(user.email, data)
+        if self.use_redis:
+            try:
+                await self.redis.set(self._user_key(user.email), json.dumps(data), ex=max(1, int(self.user_ttl)))
+            except Exception as e:
+                logger.warning(f"Auth cache write to Redis failed: {str(e)}")
+
+    def invalidate_user(self, subject: str):
+        self.users.delete(subject)
+        if not self.use_redis:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.redis.delete(self._user_key(subject)))
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    def clear(self):
+        self.tokens.clear()
+        self.users.clear()
+
+    def stats(self) -> dict:
+        return {
+            "backend": "redis" if self.use_redis else "memory",
+            "users": len(self.users),
+            "tokens": len(self.tokens),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+_auth_cache: Optional[AuthCache] = None
+
+def get_auth_cache() -> AuthCache:
+    global _auth_cache
+    if _auth_cache is None:
+        # Import here so the cache shares the settings the tokens are issued with
+        from api.email_auth import JWT_SECRET, JWT_ALGORITHM
+
+        _auth_cache = AuthCache(JWT_SECRET, JWT_ALGORITHM)
+    return _auth_cache
+
+# Emails of users changed in a transaction, invalidated once it commits. Invalidating at
+# flush would let a concurrent request re-cache the old row before the commit.
+_CHANGED_USERS = "carecall_changed_users"
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _collect_changed_user(mapper, connection, target: User):
+    state = inspect(target)
+    if state.session is None:
+        return
+    # Drop both the old and new email when the address itself changed
+    emails = state.session.info.setdefault(_CHANGED_USERS, set())
+    emails.update(email for email in {target.email, *state.attrs.email.history.deleted} if email)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    emails = session.info.pop(_CHANGED_USERS, None)
+    if emails and _auth_cache is not None:
+        for email in emails:
+            _auth_cache.invalidate_user(email)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session):
+    session.info.pop(_CHANGED_USERS, None)
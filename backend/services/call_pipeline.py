@@ -1,63 +1,81 @@
 import os
-from datetime import datetime
-import vertexai
-from vertexai.preview.language_models import TextGenerationModel
-from vertexai.preview.generative_models import GenerativeModel
-from google.cloud import texttospeech, storage
-from twilio.rest import Client
-import asyncio
+from datetime import datetime, timezone
+from typing import Optional
 import json
 from sqlalchemy.future import select
+from sqlalchemy.orm.attributes import set_committed_value
 
-from models.models import Recipient, CheckIn
-from models.enums import CheckInStatus
+from models.models import Recipient, CheckIn, Call
+from models.enums import CheckInStatus, CallStatus
 from models.base import SessionLocal
+from services.vendors import LLMAdapter, TTSAdapter, TelephonyAdapter, SMSAdapter
+from services.tts_cache import cache_key, get_tts_cache, materialize
+from services.script_engine import ScriptEngine
+from services.analysis_batcher import AnalysisBatcher, AnalysisError, AnalysisItem
+from services.triage import triage_transcript
+from services.status_summary import record_check_in_result
+from services.metrics import stage_timer
+from services.prerender import use_prepared_media
+from services.tracing import with_traceparent
+from services.dialer import Dialer, LANE_MANUAL, LANE_RETRY, default_bucket
 
-# Initialize clients
-vertexai.init(project=os.getenv("GCP_PROJECT_ID"), location=os.getenv("GCP_REGION"))
-tts_client = texttospeech.TextToSpeechClient()
-twilio_client = Client(os.getenv("TWILIO_ACCOUNT_SID"), os.getenv("TWILIO_AUTH_TOKEN"))
+# Async adapters that keep blocking SDK calls off the event loop.
+# Vendor clients are built lazily by services.registry, not at import time.
+llm = LLMAdapter()
+tts = TTSAdapter()
+telephony = TelephonyAdapter()
+sms = SMSAdapter()
+
+async def _place_call(**kwargs):
+    with stage_timer("dial"):
+        return await telephony.create_call(**kwargs)
+
+# Paces outbound calls to the Twilio calls-per-second limit, call-now first
+dialer = Dialer(_place_call, default_bucket())
+
+async def _predict_template(prompt: str) -> str:
+    return await llm.predict(prompt)
+
+# One LLM-generated template per condition; names are filled in locally
+script_engine = ScriptEngine(_predict_template)
 
 async def generate_script(recipient: Recipient) -> str:
-    """Generate conversation script using Vertex AI Gemini"""
-    prompt = f"""Generate a natural, caring conversation script for a wellness check-in call.
-    The recipient is {recipient.name}, who has {recipient.condition}.
-    The script should:
-    1. Introduce the AI as a care assistant
-    2. Ask how they're feeling today
-    3. Ask about their condition
-    4. Ask if they need any help
-    Keep the tone warm and conversational."""
-
-    model = TextGenerationModel.from_pretrained("text-bison@001")
-    response = model.predict(prompt).text
-    return response
+    """Generate conversation script from the cached per-condition template"""
+    return await script_engine.render(recipient.name, recipient.condition)
+
+# Voice and audio settings; both are part of the TTS cache key
+TTS_VOICE = {
+    "language_code": "en-US",
+    "name": "en-US-Wavenet-D",
+    "ssml_gender": "NEUTRAL",
+}
+TTS_AUDIO_CONFIG = {
+    "audio_encoding": "MP3",
+}
 
 async def text_to_speech(text: str, output_path: str):
-    """Convert script to speech using Google Cloud TTS"""
-    synthesis_input = texttospeech.SynthesisInput(text=text)
-    voice = texttospeech.VoiceSelectionParams(
-        language_code="en-US",
-        name="en-US-Wavenet-D",
-        ssml_gender=texttospeech.SsmlVoiceGender.NEUTRAL
-    )
-    audio_config = texttospeech.AudioConfig(
-        audio_encoding=texttospeech.AudioEncoding.MP3
-    )
+    """Convert script to speech using Google Cloud TTS, reusing cached audio when possible"""
+    async def synthesize() -> bytes:
+        from google.cloud import texttospeech
 
-    response = tts_client.synthesize_speech(
-        input=synthesis_input,
-        voice=voice,
-        audio_config=audio_config
-    )
+        synthesis_input = texttospeech.SynthesisInput(text=text)
+        voice = texttospeech.VoiceSelectionParams(
+            language_code=TTS_VOICE["language_code"],
+            name=TTS_VOICE["name"],
+            ssml_gender=texttospeech.SsmlVoiceGender[TTS_VOICE["ssml_gender"]]
+        )
+        audio_config = texttospeech.AudioConfig(
+            audio_encoding=texttospeech.AudioEncoding[TTS_AUDIO_CONFIG["audio_encoding"]]
+        )
+        return await tts.synthesize(synthesis_input, voice, audio_config)
 
-    with open(output_path, "wb") as out:
-        out.write(response.audio_content)
+    cache = get_tts_cache()
+    key = cache_key(text, TTS_VOICE, TTS_AUDIO_CONFIG)
+    cached_path = await cache.get_or_synthesize(key, synthesize)
+    materialize(cached_path, output_path)
 
 async def transcribe_audio(audio_url: str) -> str:
     """Transcribe audio using Vertex AI Gemini"""
-    model = GenerativeModel("gemini-2.0-flash")
-    
     # Configure for audio transcription
     generation_config = {
         "audioTimestamp": True  # Enable timestamp understanding
@@ -67,13 +85,12 @@ async def transcribe_audio(audio_url: str) -> str:
     prompt = "Please transcribe this audio file accurately."
     
     # Generate the transcription
-    response = await asyncio.to_thread(
-        model.generate_content,
+    response = await llm.generate_content(
         [prompt, {"fileUri": audio_url, "mimeType": "audio/mp3"}],
         generation_config=generation_config
     )
     
-    return response.text
+    return response
 
 async def analyze_response(transcript: str, recipient: Recipient) -> tuple[CheckInStatus, str]:
     """Analyze response using Vertex AI Gemini"""
@@ -93,18 +110,23 @@ async def analyze_response(transcript: str, recipient: Recipient) -> tuple[Check
         "notes": "Brief analysis"
     }}"""
 
-    model = TextGenerationModel.from_pretrained("text-bison@001")
-    response = json.loads(model.predict(prompt).text)
+    response = json.loads(await llm.predict(prompt))
     return CheckInStatus[response["status"]], response["notes"]
 
+async def _classify_batch(prompt: str) -> str:
+    return await llm.predict(prompt)
+
+# Coalesces transcripts that arrive close together into one LLM request
+analysis_batcher = AnalysisBatcher(_classify_batch)
+
 async def notify_contacts(recipient: Recipient, status: CheckInStatus, notes: str):
     """Send notifications based on check-in status"""
     if status in [CheckInStatus.CONCERN, CheckInStatus.EMERGENCY]:
         # Send SMS via Twilio
-        message = twilio_client.messages.create(
+        message = await sms.send(
+            to=recipient.emergency_contact_phone,
             body=f"CareCall Alert for {recipient.name}\nStatus: {status.value}\nCondition: {recipient.condition}\nNotes: {notes}\nTime: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}",
-            from_=os.getenv("TWILIO_PHONE_NUMBER"),
-            to=recipient.emergency_contact_phone
+            from_=os.getenv("TWILIO_PHONE_NUMBER")
         )
 
 async def trigger_checkin(recipient_id: int) -> CheckIn:
@@ -127,47 +149,117 @@ async def trigger_checkin(recipient_id: int) -> CheckIn:
         await db.commit()
         await db.refresh(check_in)
 
+    return await run_checkin(check_in.id)
+
+async def run_checkin(check_in_id: int, lane: str = LANE_MANUAL, scheduled_for: Optional[datetime] = None) -> CheckIn:
+    """Run the call pipeline for an existing check-in record, dialing through the given lane.
+
+    scheduled_for is the slot of a scheduled call; only those use media rendered ahead of time.
+    """
+    async with SessionLocal() as db:
+        query = select(CheckIn).where(CheckIn.id == check_in_id)
+        result = await db.execute(query)
+        check_in = result.scalar_one_or_none()
+
+        if not check_in:
+            raise ValueError("Check-in not found")
+
+        query = select(Recipient).where(Recipient.id == check_in.recipient_id)
+        result = await db.execute(query)
+        recipient = result.scalar_one_or_none()
+
+        if not recipient:
+            raise ValueError("Recipient not found")
+
+        # A retried job must not dial again once Twilio has accepted a call
+        query = select(Call.call_sid).where(Call.check_in_id == check_in.id)
+        result = await db.execute(query)
+        previous = result.scalars().all()
+        if any(sid is not None for sid in previous):
+            return check_in
+        if previous:
+            # An earlier attempt failed; wait behind fresh calls
+            lane = LANE_RETRY
+
+        call = Call(check_in_id=check_in.id, status=CallStatus.QUEUED)
+        db.add(call)
+        await db.commit()
+
         try:
-            # Generate and synthesize script
-            script = await generate_script(recipient)
+            # Use the media rendered ahead of the scheduled slot, else generate and synthesize now.
+            # A call-now never takes media meant for an upcoming scheduled call.
             audio_path = f"media/script_{check_in.id}.mp3"
-            await text_to_speech(script, audio_path)
+            if scheduled_for is None or not await use_prepared_media(db, recipient, check_in.id, audio_path, scheduled_for):
+                with stage_timer("script"):
+                    script = await generate_script(recipient)
+                with stage_timer("tts"):
+                    await text_to_speech(script, audio_path)
+
+            # Release the connection while waiting for a dial slot
+            await db.commit()
 
             # Make call with Twilio
-            call = twilio_client.calls.create(
-                url=f"{os.getenv('BASE_URL')}/api/twilio/voice-webhook",
+            twilio_call = await dialer.dial(
+                lane,
+                # Twilio echoes the URLs back, so its webhooks join this trace
+                url=with_traceparent(f"{os.getenv('BASE_URL')}/api/twilio/voice-webhook"),
                 to=recipient.phone_number,
                 from_=os.getenv("TWILIO_PHONE_NUMBER"),
                 record=True,
-                status_callback=f"{os.getenv('BASE_URL')}/api/twilio/recording-complete",
+                status_callback=with_traceparent(f"{os.getenv('BASE_URL')}/api/twilio/recording-complete"),
                 status_callback_event=['completed']
             )
 
-            # Update check-in with call SID
-            check_in.call_sid = call.sid
+            # Track the call by its SID
+            call.call_sid = twilio_call.sid
+            call.status = CallStatus.INITIATED
+            call.dialed_at = datetime.utcnow()
             await db.commit()
 
         except Exception as e:
             # Log error and update status
             print(f"Error in check-in pipeline: {str(e)}")
+            call.status = CallStatus.FAILED
+            call.error = str(e)
             check_in.status = CheckInStatus.NO_ANSWER
-            check_in.ai_notes = f"Error: {str(e)}"
-            check_in.completed_at = datetime.utcnow()
+            check_in.summary = f"Error: {str(e)}"
+            check_in.completed_at = datetime.now(timezone.utc)
+            await record_check_in_result(db, check_in)
             await db.commit()
             raise
 
         return check_in
 
-async def handle_recording_webhook(recording_url: str, call_sid: str):
+async def _analyze_ambiguous(check_in: CheckIn, transcript: str, recipient: Recipient) -> tuple[CheckInStatus, str]:
+    """Classify a transcript the triage could not decide, preferring the batched model call"""
+    try:
+        # Classified together with other recent transcripts; the batch
+        # already wrote status, summary and transcript in one bulk UPDATE
+        analysis = await analysis_batcher.submit(
+            AnalysisItem(check_in.id, transcript, recipient.name, recipient.condition)
+        )
+        status, notes = analysis.status, analysis.notes
+        set_committed_value(check_in, "status", status)
+        set_committed_value(check_in, "summary", notes)
+        set_committed_value(check_in, "transcript", transcript)
+    except AnalysisError:
+        status, notes = await analyze_response(transcript, recipient)
+        check_in.status = status
+        check_in.summary = notes
+        check_in.transcript = transcript
+    return status, notes
+
+async def handle_recording_webhook(recording_url: str, call_sid: str, recording_sid: str = None):
     """Handle the recording webhook from Twilio"""
     async with SessionLocal() as db:
-        # Get check-in by call SID
-        query = select(CheckIn).where(CheckIn.call_sid == call_sid)
+        # Get check-in and call by call SID (unique index on calls.call_sid)
+        query = select(CheckIn, Call).join(Call, Call.check_in_id == CheckIn.id).where(Call.call_sid == call_sid)
         result = await db.execute(query)
-        check_in = result.scalar_one_or_none()
+        row = result.first()
         
-        if not check_in:
+        if not row:
             raise ValueError("Check-in not found")
+        check_in, call = row
 
         try:
             # Get recipient
@@ -176,24 +268,40 @@ async def handle_recording_webhook(recording_url: str, call_sid: str):
             recipient = result.scalar_one_or_none()
 
             # Process recording
-            transcript = await transcribe_audio(recording_url)
-            status, notes = await analyze_response(transcript, recipient)
-
-            # Update check-in
-            check_in.status = status
-            check_in.recording_url = recording_url
-            check_in.transcript = transcript
-            check_in.ai_notes = notes
-            check_in.completed_at = datetime.utcnow()
+            with stage_timer("transcription"):
+                transcript = await transcribe_audio(recording_url)
+            with stage_timer("analysis"):
+                triage = triage_transcript(transcript)
+                if triage.decided:
+                    # Plainly OK or plainly an emergency: no model call needed
+                    status, notes = triage.status, triage.notes
+                    check_in.status = status
+                    check_in.summary = notes
+                    check_in.transcript = transcript
+                else:
+                    status, notes = await _analyze_ambiguous(check_in, transcript, recipient)
+
+            # Update check-in and call
+            now = datetime.utcnow()
+            call.status = CallStatus.COMPLETED
+            call.recording_url = recording_url
+            call.recording_sid = recording_sid
+            call.completed_at = now
+            check_in.completed_at = now.replace(tzinfo=timezone.utc)
+            # Keep the dashboard summary current in the same transaction
+            await record_check_in_result(db, check_in)
             await db.commit()
 
             # Send notifications if needed
-            await notify_contacts(recipient, status, notes)
+            with stage_timer("notification"):
+                await notify_contacts(recipient, status, notes)
 
         except Exception as e:
             print(f"Error processing recording: {str(e)}")
+            call.error = f"Error processing recording: {str(e)}"
             check_in.status = CheckInStatus.NO_ANSWER
-            check_in.ai_notes = f"Error processing recording: {str(e)}"
-            check_in.completed_at = datetime.utcnow()
+            check_in.summary = f"Error processing recording: {str(e)}"
+            check_in.completed_at = datetime.now(timezone.utc)
+            await record_check_in_result(db, check_in)
             await db.commit()
-            raise 
\ No newline at end of file
+            raise
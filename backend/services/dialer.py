@@ -0,0 +1,246 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from services.kv_store import BUCKET_PAUSE, BUCKET_REFUND, KV_STORE_BACKEND, get_kv_store
+from services.metrics import DIAL_QUEUE_LATENCY, DIAL_RATE_LIMITED
+
+logger = logging.getLogger("carecall")
+
+# Dialer settings. DIAL_CPS is the account's Twilio calls-per-second limit. With
+# KV_STORE_BACKEND=redis every process draws from one shared bucket; otherwise each
+# process paces itself to DIAL_CPS / DIAL_PROCESSES, so set that to the worker count.
+DIAL_CPS = float(os.getenv("DIAL_CPS", "1"))
+DIAL_BURST = int(os.getenv("DIAL_BURST", "1"))
+DIAL_PROCESSES = max(1, int(os.getenv("DIAL_PROCESSES", "1")))
+DIAL_SHARED_BUCKET = KV_STORE_BACKEND == "redis"
+DIAL_MAX_ATTEMPTS = int(os.getenv("DIAL_MAX_ATTEMPTS", "4"))
+DIAL_RATE_LIMIT_BACKOFF_SECONDS = float(os.getenv("DIAL_RATE_LIMIT_BACKOFF_SECONDS", "2"))
+# Scheduled calls due in the same minute are spread over at most this many seconds
+DIAL_SMOOTHING_SECONDS = float(os.getenv("DIAL_SMOOTHING_SECONDS", "50"))
+
+# Lanes in priority order: a caregiver waiting on "call now" goes first, and
+# calls retried after a rate limit never hold up fresh ones
+LANE_MANUAL = "manual"
+LANE_SCHEDULED = "scheduled"
+LANE_RETRY = "retry"
+LANES = (LANE_MANUAL, LANE_SCHEDULED, LANE_RETRY)
+
+# Twilio answers 429 with error 20429 ("Too Many Requests") when over the CPS limit
+RATE_LIMIT_CODES = {20429}
+
+def is_rate_limited(error: Exception) -> bool:
+    return getattr(error, "status", None) == 429 or getattr(error, "code", None) in RATE_LIMIT_CODES
+
+def smoothing_delays(count: int, rate: float = DIAL_CPS, window: float = DIAL_SMOOTHING_SECONDS):
+    """Start offsets that release `count` calls at the dial rate, squeezed into the window if needed"""
+    if count <= 1 or rate <= 0:
+        return [0.0] * count
+    spacing = min(1 / rate, window / count)
+    return [round(i * spacing, 3) for i in range(count)]
+
+class TokenBucket:
+    """Allows `rate` events per second on average with bursts of up to `burst`"""
+
+    def __init__(self, rate: float, burst: int = 1, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.clock = clock
+        self.tokens = float(self.capacity)
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self) -> float:
+        """Take a token and return 0, or return the seconds until one is available"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def take(self):
+        while True:
+            wait = self.try_take()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def refund(self):
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    async def pause(self, seconds: float):
+        """Stop handing out tokens for `seconds`, e.g. after the provider pushed back"""
+        self._refill()
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+class SharedTokenBucket:
+    """TokenBucket kept in the key/value store, so every process shares one rate"""
+
+    def __init__(self, rate: float, burst: int = 1, store=None, key: str = "dial:bucket"):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.store = store if store is not None else get_kv_store()
+        self.key = key
+
+    async def take(self):
+        while True:
+            wait = await self.store.token_bucket(self.key, self.rate, self.capacity)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def refund(self):
+        await self.store.token_bucket(self.key, self.rate, self.capacity, BUCKET_REFUND)
+
+    async def pause(self, seconds: float):
+        await self.store.token_bucket(self.key, self.rate, self.capacity, BUCKET_PAUSE, seconds)
+
+def default_bucket(rate: float = DIAL_CPS, burst: int = DIAL_BURST):
+    if rate <= 0:
+        return None
+    if DIAL_SHARED_BUCKET:
+        return SharedTokenBucket(rate, burst)
+    return TokenBucket(rate / DIAL_PROCESSES, burst)
+
+class LaneStats:
+    def __init__(self, window: int = 1000):
+        self.dialed = 0
+        self.total_wait = 0.0
+        self._recent: Deque[float] = deque(maxlen=window)
+
+    def record(self, wait: float):
+        self.dialed += 1
+        self.total_wait += wait
+        self._recent.append(wait)
+
+    def snapshot(self) -> dict:
+        recent = sorted(self._recent)
+
+        def percentile(p: float) -> Optional[float]:
+            if not recent:
+                return None
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))] * 1000, 2)
+
+        return {
+            "dialed": self.dialed,
+            "wait_mean_ms": round(self.total_wait / self.dialed * 1000, 2) if self.dialed else None,
+            "wait_p50_ms": percentile(0.5),
+            "wait_p95_ms": percentile(0.95),
+            "wait_p99_ms": percentile(0.99),
+        }
+
+class Dialer:
+    """Paces outbound calls through a token bucket, serving this process's lanes in priority order"""
+
+    def __init__(
+        self,
+        create_call: Callable[..., Awaitable[Any]],
+        bucket=None,
+        max_attempts: int = DIAL_MAX_ATTEMPTS,
+        backoff: float = DIAL_RATE_LIMIT_BACKOFF_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.create_call = create_call
+        # None dials unpaced (DIAL_CPS=0)
+        self.bucket = bucket
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.clock = clock
+        self.rate_limited = 0
+        self._lanes: Dict[str, Deque[Tuple[asyncio.Future, float]]] = {lane: deque() for lane in LANES}
+        self._lane_stats = {lane: LaneStats() for lane in LANES}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._pacer: Optional[asyncio.Task] = None
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._pacer is not None and not self._pacer.done() and self._pacer.get_loop() is loop:
+            return
+        if self._pacer is not None and self._pacer.get_loop() is not loop:
+            # A new event loop (tests, a restarted worker): callers queued on the old one are gone
+            for queue in self._lanes.values():
+                queue.clear()
+        self._wakeup = asyncio.Event()
+        self._pacer = asyncio.create_task(self._pace())
+
+    async def acquire(self, lane: str):
+        """Wait for this lane's turn and a token"""
+        if lane not in self._lanes:
+            raise ValueError(f"Unknown dial lane {lane!r}")
+        queued_at = self.clock()
+        if self.bucket is not None:
+            self._ensure_started()
+            waiter = asyncio.get_running_loop().create_future()
+            self._lanes[lane].append((waiter, queued_at))
+            self._wakeup.set()
+            await waiter
+        wait = self.clock() - queued_at
+        self._lane_stats[lane].record(wait)
+        DIAL_QUEUE_LATENCY.observe(wait, lane=lane)
+
+    async def dial(self, lane: str, **kwargs) -> Any:
+        """Place a call when paced; rate-limit rejections go back through the retry lane"""
+        for attempt in range(1, self.max_attempts + 1):
+            await self.acquire(lane if attempt == 1 else LANE_RETRY)
+            try:
+                return await self.create_call(**kwargs)
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == self.max_attempts:
+                    raise
+                self.rate_limited += 1
+                DIAL_RATE_LIMITED.inc()
+                delay = self.backoff * (2 ** (attempt - 1))
+                if self.bucket is not None:
+                    await self.bucket.pause(delay)
+                logger.warning(f"Dial rate limited on attempt {attempt}, pausing dialing for {delay:.1f}s")
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        for lane in LANES:
+            queue = self._lanes[lane]
+            while queue:
+                waiter, _ = queue.popleft()
+                if not waiter.done():  # Skip callers that gave up
+                    return waiter
+        return None
+
+    async def _pace(self):
+        while True:
+            if not any(self._lanes.values()):
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            await self.bucket.take()
+            # Pick after the token arrives so a call-now queued meanwhile goes first
+            waiter = self._next_waiter()
+            if waiter is None:
+                await self.bucket.refund()
+                continue
+            waiter.set_result(None)
+
+    async def close(self):
+        if self._pacer is not None:
+            self._pacer.cancel()
+            try:
+                await self._pacer
+            except asyncio.CancelledError:
+                pass
+            self._pacer = None
+
+    def stats(self) -> dict:
+        return {
+            "rate": self.bucket.rate if self.bucket is not None else None,
+            "burst": self.bucket.capacity if self.bucket is not None else None,
+            "shared": isinstance(self.bucket, SharedTokenBucket),
+            "rate_limited": self.rate_limited,
+            "lanes": {
+                lane: {"waiting": sum(1 for waiter, _ in self._lanes[lane] if not waiter.done()), **stats.snapshot()}
+                for lane, stats in self._lane_stats.items()
+            },
+        }
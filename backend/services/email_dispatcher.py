@@ -0,0 +1,221 @@
+import os
+import random
+import asyncio
+import logging
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger("carecall")
+
+# Email delivery settings
+RESEND_API_URL = os.getenv("RESEND_API_URL", "https://api.resend.com")
+EMAIL_CONCURRENCY = int(os.getenv("EMAIL_CONCURRENCY", "8"))
+EMAIL_QUEUE_SIZE = int(os.getenv("EMAIL_QUEUE_SIZE", "1000"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "4"))
+EMAIL_BACKOFF_SECONDS = float(os.getenv("EMAIL_BACKOFF_SECONDS", "0.5"))
+EMAIL_TIMEOUT_SECONDS = float(os.getenv("EMAIL_TIMEOUT_SECONDS", "10"))
+
+LOGIN_CODE_FROM = "noreply@carecall.club"  # Verified domain
+LOGIN_CODE_SUBJECT = "Your CareCall Login Code"
+
+LOGIN_CODE_HTML = """<!DOCTYPE html>
+<html>
+<head>
+    <style>
+        body {
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
+            line-height: 1.6;
+            color: #333;
+            max-width: 600px;
+            margin: 0 auto;
+            padding: 20px;
+        }
+        .container {
+            background: #ffffff;
+            border-radius: 8px;
+            padding: 30px;
+            box-shadow: 0 2px 4px rgba(0, 0, 0, 0.1);
+        }
+        .logo {
+            font-size: 24px;
+            font-weight: bold;
+            color: #1a1a1a;
+            margin-bottom: 20px;
+        }
+        .code {
+            font-size: 32px;
+            font-weight: bold;
+            color: #2563eb;
+            letter-spacing: 4px;
+            padding: 16px;
+            background: #f3f4f6;
+            border-radius: 4px;
+            margin: 20px 0;
+            text-align: center;
+        }
+        .footer {
+            font-size: 14px;
+            color: #666;
+            margin-top: 30px;
+            text-align: center;
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="logo">CareCall</div>
+        <h1>Welcome to CareCall!</h1>
+        <p>Here's your verification code to complete your login:</p>
+        <div class="code">{code}</div>
+        <p>This code will expire in 15 minutes for security reasons.</p>
+        <p>If you didn't request this code, please ignore this email.</p>
+        <div class="footer">
+            <p>CareCall - Automated Care Check-ins</p>
+            <p>This is an automated message, please do not reply.</p>
+        </div>
+    </div>
+</body>
+</html>"""
+
+# Split once at import so each login only concatenates the code in
+_LOGIN_HTML_HEAD, _LOGIN_HTML_TAIL = LOGIN_CODE_HTML.split("{code}")
+
+def render_login_code(to: str, code: str) -> dict:
+    """Resend payload for a login code email"""
+    return {
+        "from": LOGIN_CODE_FROM,
+        "to": [to],
+        "subject": LOGIN_CODE_SUBJECT,
+        "html": _LOGIN_HTML_HEAD + code + _LOGIN_HTML_TAIL,
+    }
+
+class EmailQueueFull(Exception):
+    """The outbound queue is at EMAIL_QUEUE_SIZE"""
+
+class EmailDispatcher:
+    """Queues emails and delivers them to Resend from a few workers sharing one HTTP connection pool"""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        concurrency: int = EMAIL_CONCURRENCY,
+        queue_size: int = EMAIL_QUEUE_SIZE,
+        max_attempts: int = EMAIL_MAX_ATTEMPTS,
+        backoff: float = EMAIL_BACKOFF_SECONDS,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.api_key = api_key or os.getenv("RESEND_API_KEY")
+        self.concurrency = max(1, concurrency)
+        self.queue_size = queue_size
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self._client = client
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=RESEND_API_URL,
+                timeout=EMAIL_TIMEOUT_SECONDS,
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            )
+        return self._client
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def send(self, params: dict):
+        """Queue an email and return without waiting for delivery"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(params)
+        except asyncio.QueueFull:
+            raise EmailQueueFull(f"Email queue is full ({self.queue_size} messages)")
+
+    async def _work(self):
+        while True:
+            params = await self._queue.get()
+            try:
+                await self._deliver(params)
+            except Exception as e:
+                # A malformed message must not stop this worker draining the queue
+                self.failed += 1
+                logger.error(f"Failed to send email to {params.get('to')}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, params: dict):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                response = await self.client.post(
+                    "/emails",
+                    json=params,
+                    headers={"Authorization": f"Bearer {self.api_key}"},
+                )
+                if response.status_code < 400:
+                    self.sent += 1
+                    logger.info(f"Email sent to {params.get('to')}")
+                    return
+                # Client errors other than rate limiting will not succeed on retry
+                retryable = response.status_code == 429 or response.status_code >= 500
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+            except httpx.HTTPError as e:
+                retryable, error = True, str(e)
+
+            if not retryable or attempt == self.max_attempts:
+                self.failed += 1
+                logger.error(f"Failed to send email to {params.get('to')} after {attempt} attempts: {error}")
+                return
+            self.retries += 1
+            delay = self.backoff * (2 ** (attempt - 1))
+            logger.warning(f"Email to {params.get('to')} failed on attempt {attempt}, retrying: {error}")
+            await asyncio.sleep(delay + random.uniform(0, delay))
+
+    async def drain(self, timeout: float = 10):
+        """Wait for queued emails to be delivered"""
+        if self._queue is not None:
+            await asyncio.wait_for(self._queue.join(), timeout)
+
+    async def close(self, timeout: float = 10):
+        try:
+            await self.drain(timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self._queue.qsize()} queued emails were not sent before shutdown")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+        }
+
+_dispatcher: Optional[EmailDispatcher] = None
+
+def get_email_dispatcher() -> EmailDispatcher:
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = EmailDispatcher()
+    return _dispatcher
+
+async def close_email_dispatcher():
+    global _dispatcher
+    if _dispatcher is not None:
+        await _dispatcher.close()
+        _dispatcher = None
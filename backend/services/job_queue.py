@@ -0,0 +1,340 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from sqlalchemy import event, select, update, func, or_, and_
+from sqlalchemy.orm import Session
+
+from models.base import SessionLocal
+from models.models import Job, CheckIn
+from models.enums import CheckInStatus, JobStatus
+from services.dialer import LANE_MANUAL
+from services.tracing import TRACEPARENT, current_traceparent
+
+logger = logging.getLogger("carecall")
+
+# Job kinds
+CHECKIN_JOB = "checkin.run"
+RECORDING_JOB = "recording.process"
+PRERENDER_JOB = "media.prerender"
+
+# Queue settings
+JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "database").lower()
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_BACKOFF_BASE_SECONDS = float(os.getenv("JOB_BACKOFF_BASE_SECONDS", "5"))
+JOB_BACKOFF_MAX_SECONDS = float(os.getenv("JOB_BACKOFF_MAX_SECONDS", "600"))
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff in seconds after the given number of failed attempts"""
+    return min(JOB_BACKOFF_MAX_SECONDS, JOB_BACKOFF_BASE_SECONDS * (2 ** max(0, attempts - 1)))
+
+@dataclass
+class ClaimedJob:
+    id: str
+    kind: str
+    payload: Dict[str, Any] = field(default_factory=dict)
+    attempts: int = 1
+    max_attempts: int = JOB_MAX_ATTEMPTS
+
+    @property
+    def exhausted(self) -> bool:
+        return self.attempts > self.max_attempts
+
+def with_trace_context(payload: dict) -> dict:
+    """Carry the enqueuing span into the job so the worker continues the same trace"""
+    traceparent = current_traceparent()
+    if traceparent is None or TRACEPARENT in payload:
+        return payload
+    return {**payload, TRACEPARENT: traceparent}
+
+class DatabaseJobQueue:
+    """Job queue stored in the jobs table; workers claim rows with a time-limited lease"""
+
+    async def enqueue(self, kind: str, payload: dict, delay: float = 0, max_attempts: Optional[int] = None, db=None) -> str:
+        """Add a job; when db is given the job joins that session's transaction and is not committed here"""
+        job = Job(
+            kind=kind,
+            payload=with_trace_context(payload),
+            status=JobStatus.QUEUED,
+            max_attempts=max_attempts or JOB_MAX_ATTEMPTS,
+            run_at=datetime.utcnow() + timedelta(seconds=delay),
+        )
+        if db is not None:
+            db.add(job)
+            await db.flush()
+            return str(job.id)
+        async with SessionLocal() as session:
+            session.add(job)
+            await session.commit()
+            return str(job.id)
+
+    async def claim(self, worker_id: str, limit: int = 1, kinds: Optional[Sequence[str]] = None) -> List[ClaimedJob]:
+        """Lease up to `limit` runnable jobs, including jobs whose previous lease expired"""
+        now = datetime.utcnow()
+        runnable = or_(
+            and_(Job.status == JobStatus.QUEUED, Job.run_at <= now),
+            and_(Job.status == JobStatus.RUNNING, Job.lease_expires_at < now),
+        )
+        if kinds:
+            runnable = and_(runnable, Job.kind.in_(kinds))
+
+        claimed = []
+        async with SessionLocal() as db:
+            query = (
+                select(Job.id)
+                .where(runnable)
+                .order_by(Job.run_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            candidate_ids = (await db.execute(query)).scalars().all()
+            for job_id in candidate_ids:
+                # The conditional UPDATE is the actual claim, so concurrent workers cannot both win
+                result = await db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, runnable)
+                    .values(
+                        status=JobStatus.RUNNING,
+                        attempts=Job.attempts + 1,
+                        locked_by=worker_id,
+                        lease_expires_at=now + timedelta(seconds=JOB_LEASE_SECONDS),
+                    )
+                    .returning(Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+                )
+                row = result.first()
+                if row is not None:
+                    claimed.append(ClaimedJob(str(job_id), row.kind, row.payload or {}, row.attempts, row.max_attempts))
+            await db.commit()
+        return claimed
+
+    async def extend_lease(self, job: ClaimedJob, worker_id: str):
+        async with SessionLocal() as db:
+            await db.execute(
+                update(Job)
+                .where(Job.id == int(job.id), Job.locked_by == worker_id, Job.status == JobStatus.RUNNING)
+                .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS))
+            )
+            await db.commit()
+
+    async def complete(self, job: ClaimedJob):
+        async with SessionLocal() as db:
+            await db.execute(
+                update(Job)
+                .where(Job.id == int(job.id))
+                .values(status=JobStatus.DONE, lease_expires_at=None, last_error=None)
+            )
+            await db.commit()
+
+    async def fail(self, job: ClaimedJob, error: str) -> bool:
+        """Record a failed attempt; returns True when the job was scheduled for a retry"""
+        retry = job.attempts < job.max_attempts
+        values = {"lease_expires_at": None, "locked_by": None, "last_error": error}
+        if retry:
+            values.update(status=JobStatus.QUEUED, run_at=datetime.utcnow() + timedelta(seconds=backoff_delay(job.attempts)))
+        else:
+            values.update(status=JobStatus.FAILED)
+        async with SessionLocal() as db:
+            await db.execute(update(Job).where(Job.id == int(job.id)).values(**values))
+            await db.commit()
+        return retry
+
+    async def pending(self, job_id: str) -> bool:
+        """Whether the job is still waiting to run or running"""
+        async with SessionLocal() as db:
+            result = await db.execute(
+                select(Job.id).where(Job.id == int(job_id), Job.status.in_([JobStatus.QUEUED, JobStatus.RUNNING]))
+            )
+            return result.first() is not None
+
+    async def depth(self) -> int:
+        async with SessionLocal() as db:
+            result = await db.execute(select(func.count(Job.id)).where(Job.status == JobStatus.QUEUED))
+            return result.scalar_one()
+
+# Atomically requeue expired leases, then lease the next ready jobs. Ids whose job hash
+# is gone are dropped rather than leased, so HINCRBY never recreates a hash without a kind.
+_REDIS_CLAIM_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, id in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], id)
+    redis.call('ZADD', KEYS[1], ARGV[1], id)
+end
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[3]))
+local leased = {}
+for _, id in ipairs(ids) do
+    redis.call('ZREM', KEYS[1], id)
+    if redis.call('EXISTS', ARGV[4] .. id) == 1 then
+        redis.call('ZADD', KEYS[2], ARGV[2], id)
+        redis.call('HINCRBY', ARGV[4] .. id, 'attempts', 1)
+        table.insert(leased, id)
+    end
+end
+return leased
+"""
+
+class RedisJobQueue:
+    """Job queue kept in Redis: a ready sorted set scored by run time and a lease sorted set"""
+
+    def __init__(self, redis=None, prefix: str = "carecall:jobs"):
+        self._redis = redis
+        self.prefix = prefix
+        self.ready_key = f"{prefix}:ready"
+        self.leases_key = f"{prefix}:leases"
+        self.failed_key = f"{prefix}:failed"
+        self._claim_script = None
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from services.redis_client import get_redis
+
+            self._redis = get_redis()
+        return self._redis
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.prefix}:job:{job_id}"
+
+    async def enqueue(self, kind: str, payload: dict, delay: float = 0, max_attempts: Optional[int] = None, db=None) -> str:
+        """Add a job. Redis cannot join a SQL transaction, so when db is given the id is reserved
+        now and the job is pushed once that session commits, or dropped if it rolls back."""
+        job_id = str(await self.redis.incr(f"{self.prefix}:id"))
+        fields = {
+            "kind": kind,
+            "payload": json.dumps(with_trace_context(payload)),
+            "attempts": 0,
+            "max_attempts": max_attempts or JOB_MAX_ATTEMPTS,
+        }
+        if db is not None:
+            db.sync_session.info.setdefault(_PENDING_REDIS_JOBS, []).append((self, job_id, fields, delay))
+            return job_id
+        await self._push(job_id, fields, delay)
+        return job_id
+
+    async def _push(self, job_id: str, fields: dict, delay: float):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self._job_key(job_id), mapping=fields)
+            pipe.zadd(self.ready_key, {job_id: time.time() + delay})
+            await pipe.execute()
+
+    async def claim(self, worker_id: str, limit: int = 1, kinds: Optional[Sequence[str]] = None) -> List[ClaimedJob]:
+        if self._claim_script is None:
+            self._claim_script = self.redis.register_script(_REDIS_CLAIM_SCRIPT)
+        now = time.time()
+        job_ids = await self._claim_script(
+            keys=[self.ready_key, self.leases_key],
+            args=[now, now + JOB_LEASE_SECONDS, limit, f"{self.prefix}:job:"],
+        )
+        claimed = []
+        for job_id in job_ids:
+            data = await self.redis.hgetall(self._job_key(job_id))
+            if not data.get("kind"):
+                # Deleted between the claim and this read: drop it instead of failing the claim loop
+                await self.redis.zrem(self.leases_key, job_id)
+                await self.redis.delete(self._job_key(job_id))
+                continue
+            job = ClaimedJob(
+                id=job_id,
+                kind=data["kind"],
+                payload=json.loads(data.get("payload") or "{}"),
+                attempts=int(data.get("attempts", 1)),
+                max_attempts=int(data.get("max_attempts", JOB_MAX_ATTEMPTS)),
+            )
+            if kinds and job.kind not in kinds:
+                # Not ours: hand it straight back without counting the attempt
+                await self.redis.hincrby(self._job_key(job_id), "attempts", -1)
+                await self.redis.zadd(self.ready_key, {job_id: now})
+                await self.redis.zrem(self.leases_key, job_id)
+                continue
+            claimed.append(job)
+        return claimed
+
+    async def extend_lease(self, job: ClaimedJob, worker_id: str):
+        await self.redis.zadd(self.leases_key, {job.id: time.time() + JOB_LEASE_SECONDS}, xx=True)
+
+    async def complete(self, job: ClaimedJob):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.leases_key, job.id)
+            pipe.delete(self._job_key(job.id))
+            await pipe.execute()
+
+    async def fail(self, job: ClaimedJob, error: str) -> bool:
+        retry = job.attempts < job.max_attempts
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.leases_key, job.id)
+            pipe.hset(self._job_key(job.id), "last_error", error)
+            if retry:
+                pipe.zadd(self.ready_key, {job.id: time.time() + backoff_delay(job.attempts)})
+            else:
+                pipe.lpush(self.failed_key, job.id)
+            await pipe.execute()
+        return retry
+
+    async def pending(self, job_id: str) -> bool:
+        """Whether the job is still waiting to run or leased; False if its push never happened"""
+        if await self.redis.zscore(self.ready_key, job_id) is not None:
+            return True
+        return await self.redis.zscore(self.leases_key, job_id) is not None
+
+    async def depth(self) -> int:
+        return await self.redis.zcard(self.ready_key)
+
+_queue = None
+
+# Redis jobs enqueued inside a database transaction wait in session.info until it commits
+_PENDING_REDIS_JOBS = "carecall_pending_redis_jobs"
+_push_tasks: Set[asyncio.Task] = set()
+
+async def _push_pending(pending: list):
+    for queue, job_id, fields, delay in pending:
+        try:
+            await queue._push(job_id, fields, delay)
+        except Exception as e:
+            logger.error(f"Could not push job {job_id} ({fields['kind']}) after commit: {str(e)}")
+
+@event.listens_for(Session, "after_commit")
+def _push_after_commit(session):
+    pending = session.info.pop(_PENDING_REDIS_JOBS, None)
+    if pending:
+        # Commit runs on the event loop thread (AsyncSession), so the push can be scheduled there
+        task = asyncio.get_running_loop().create_task(_push_pending(pending))
+        _push_tasks.add(task)
+        task.add_done_callback(_push_tasks.discard)
+
+@event.listens_for(Session, "after_rollback")
+def _drop_after_rollback(session):
+    session.info.pop(_PENDING_REDIS_JOBS, None)
+
+def get_job_queue():
+    """Return the configured job queue (JOB_QUEUE_BACKEND=database|redis)"""
+    global _queue
+    if _queue is None:
+        if JOB_QUEUE_BACKEND == "redis":
+            _queue = RedisJobQueue()
+        else:
+            _queue = DatabaseJobQueue()
+        logger.info(f"Using {JOB_QUEUE_BACKEND} job queue")
+    return _queue
+
+async def enqueue_checkin(recipient_id: int, db=None, lane: str = LANE_MANUAL, delay: float = 0,
+                          scheduled_for: Optional[datetime] = None) -> int:
+    """Create the pending check-in record and queue the call pipeline for it in the given dial lane"""
+    if db is None:
+        async with SessionLocal() as session:
+            return await enqueue_checkin(recipient_id, session, lane, delay, scheduled_for)
+
+    check_in = CheckIn(recipient_id=recipient_id, status=CheckInStatus.NO_ANSWER)
+    db.add(check_in)
+    await db.flush()
+    # With the database backend the job commits atomically with the check-in
+    payload = {"check_in_id": check_in.id, "lane": lane}
+    if scheduled_for is not None:
+        payload["scheduled_for"] = scheduled_for.isoformat()
+    await get_job_queue().enqueue(CHECKIN_JOB, payload, delay=delay, db=db)
+    await db.commit()
+    return check_in.id
@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import heapq
+import logging
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("carecall")
+
+KV_STORE_BACKEND = os.getenv("KV_STORE_BACKEND", "memory").lower()  # memory|redis
+
+# Token bucket operations: take one token, give one back, or stop handing out tokens for a while
+BUCKET_TAKE = "take"
+BUCKET_REFUND = "refund"
+BUCKET_PAUSE = "pause"
+BUCKET_TTL_SECONDS = 3600
+
+def _bucket_step(tokens: float, updated: float, now: float, rate: float, burst: float,
+                 operation: str, seconds: float) -> Tuple[float, float]:
+    """Apply one bucket operation; returns (tokens, seconds to wait for a token)"""
+    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+    wait = 0.0
+    if operation == BUCKET_TAKE:
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+    elif operation == BUCKET_REFUND:
+        tokens = min(burst, tokens + 1)
+    else:
+        tokens = min(tokens, 0.0) - seconds * rate
+    return tokens, wait
+
+class MemoryStore:
+    """Expiring key/value store and sliding-window counters for a single process"""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._values: Dict[str, Any] = {}
+        self._windows: Dict[str, deque] = {}
+        self._expiry: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    # Every entry expires; a min-heap of (expires, key) lets each call drop what has
+    # expired, so memory stays bounded by the live entries
+    def _expire(self, key: str, expires: float):
+        self._expiry[key] = expires
+        heapq.heappush(self._heap, (expires, key))
+
+    def _purge(self, now: float):
+        while self._heap and self._heap[0][0] <= now:
+            expires, key = heapq.heappop(self._heap)
+            # Skip heap entries left behind when a key was rewritten with a later expiry
+            if self._expiry.get(key) == expires:
+                del self._expiry[key]
+                self._values.pop(key, None)
+                self._windows.pop(key, None)
+                self._buckets.pop(key, None)
+
+    async def get(self, key: str) -> Optional[Any]:
+        self._purge(self.clock())
+        return self._values.get(key)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        now = self.clock()
+        self._purge(now)
+        self._values[key] = value
+        self._expire(key, now + ttl)
+
+    async def delete(self, key: str):
+        self._values.pop(key, None)
+        self._windows.pop(key, None)
+        self._buckets.pop(key, None)
+        self._expiry.pop(key, None)
+
+    async def hit(self, key: str, window: float, limit: int) -> Tuple[bool, int]:
+        """Count an event unless `limit` events already happened in the last `window` seconds"""
+        now = self.clock()
+        self._purge(now)
+        events = self._windows.setdefault(key, deque())
+        while events and events[0] <= now - window:
+            events.popleft()
+        if len(events) >= limit:
+            return False, len(events)
+        events.append(now)
+        self._expire(key, now + window)
+        return True, len(events)
+
+    async def token_bucket(self, key: str, rate: float, burst: float,
+                           operation: str = BUCKET_TAKE, seconds: float = 0) -> float:
+        """Run a token bucket operation; for a take, returns 0 or the seconds until a token is free"""
+        now = self.clock()
+        self._purge(now)
+        tokens, updated = self._buckets.get(key, (burst, now))
+        tokens, wait = _bucket_step(tokens, updated, now, rate, burst, operation, seconds)
+        self._buckets[key] = (tokens, now)
+        self._expire(key, now + BUCKET_TTL_SECONDS)
+        return wait
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+# Sliding window over a sorted set of event timestamps; the check and the add are atomic
+_REDIS_HIT_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1] - ARGV[2])
+local count = redis.call('ZCARD', KEYS[1])
+if count >= tonumber(ARGV[3]) then
+    return {0, count}
+end
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[4])
+redis.call('PEXPIRE', KEYS[1], math.ceil(ARGV[2] * 1000))
+return {1, count + 1}
+"""
+
+# Same arithmetic as _bucket_step, atomically on a hash of (tokens, updated)
+_REDIS_BUCKET_SCRIPT = """
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if ARGV[4] == 'take' then
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+elseif ARGV[4] == 'refund' then
+    tokens = math.min(burst, tokens + 1)
+else
+    tokens = math.min(tokens, 0) - tonumber(ARGV[5]) * rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[6]))
+return tostring(wait)
+"""
+
+class RedisStore:
+    """Same interface as MemoryStore, shared by every worker and instance"""
+
+    def __init__(self, redis=None, prefix: str = "carecall:kv"):
+        self._redis = redis
+        self.prefix = prefix
+        self._hit_script = None
+        self._bucket_script = None
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from services.redis_client import get_redis
+
+            self._redis = get_redis()
+        return self._redis
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.redis.get(self._key(key))
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await self.redis.set(self._key(key), json.dumps(value), px=max(1, int(ttl * 1000)))
+
+    async def delete(self, key: str):
+        await self.redis.delete(self._key(key))
+
+    async def hit(self, key: str, window: float, limit: int) -> Tuple[bool, int]:
+        if self._hit_script is None:
+            self._hit_script = self.redis.register_script(_REDIS_HIT_SCRIPT)
+        allowed, count = await self._hit_script(
+            keys=[self._key(key)],
+            args=[time.time(), window, limit, uuid.uuid4().hex],
+        )
+        return bool(allowed), int(count)
+
+    async def token_bucket(self, key: str, rate: float, burst: float,
+                           operation: str = BUCKET_TAKE, seconds: float = 0) -> float:
+        if self._bucket_script is None:
+            self._bucket_script = self.redis.register_script(_REDIS_BUCKET_SCRIPT)
+        # Returned as a string: Lua numbers become integers on the way out
+        wait = await self._bucket_script(
+            keys=[self._key(key)],
+            args=[rate, burst, time.time(), operation, seconds, BUCKET_TTL_SECONDS],
+        )
+        return float(wait)
+
+_store = None
+
+def get_kv_store():
+    """Return the configured store (KV_STORE_BACKEND=memory|redis)"""
+    global _store
+    if _store is None:
+        if KV_STORE_BACKEND == "redis":
+            _store = RedisStore()
+        else:
+            _store = MemoryStore()
+        logger.info(f"Using {KV_STORE_BACKEND} key/value store")
+    return _store
@@ -0,0 +1,191 @@
+import os
+import sys
+import json
+import queue
+import random
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Mapping, Optional
+
+# Logging settings
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # json|text
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Fraction of successful, fast requests that get an access log line; errors and slow requests always do
+LOG_REQUEST_SAMPLE_RATE = float(os.getenv("LOG_REQUEST_SAMPLE_RATE", "0.1"))
+LOG_SLOW_REQUEST_MS = float(os.getenv("LOG_SLOW_REQUEST_MS", "1000"))
+LOG_REQUEST_HEADERS = os.getenv("LOG_REQUEST_HEADERS", "false").lower() == "true"
+# Minimum access log level per path prefix, e.g. "/health=WARNING,/api/twilio=DEBUG"
+LOG_ROUTE_LEVELS = os.getenv("LOG_ROUTE_LEVELS", "/health=WARNING,/metrics=WARNING")
+
+REDACTED_HEADERS = {"authorization", "cookie", "set-cookie", "x-twilio-signature", "x-api-key", "proxy-authorization"}
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+access_logger = logging.getLogger("carecall.access")
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with any `extra` fields merged in"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        elif record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread; drops them rather than block when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only resolve what cannot cross threads; formatting happens in the listener
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+_output: Optional[logging.Handler] = None
+_settings: Optional[tuple] = None
+
+# Loggers that servers configure with their own handlers; they are routed through the root instead
+SERVER_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access", "gunicorn.error", "gunicorn.access")
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, stream=None):
+    """Route all logging through a bounded queue to a stdout writer thread; safe to call again"""
+    global _listener, _queue_handler, _output, _settings
+    if _listener is not None and _settings == (level, fmt, stream):
+        return
+    shutdown_logging()
+
+    _output = logging.StreamHandler(stream or sys.stdout)
+    if fmt == "json":
+        _output.setFormatter(JsonFormatter())
+    else:
+        _output.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(log_queue, _output, respect_handler_level=True)
+    _listener.start()
+    _settings = (level, fmt, stream)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+
+    # uvicorn installs its own stream handlers, which would write on the event loop
+    for name in SERVER_LOGGERS:
+        server_logger = logging.getLogger(name)
+        for handler in list(server_logger.handlers):
+            server_logger.removeHandler(handler)
+        server_logger.propagate = True
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread; later records are written directly"""
+    global _listener, _settings
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    _settings = None
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    # Nothing would drain the queue any more, so write anything logged during shutdown in place
+    root.addHandler(_output)
+
+def dropped_log_records() -> int:
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+def parse_route_levels(spec: str) -> Dict[str, int]:
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        prefix, _, name = item.partition("=")
+        level = logging.getLevelName(name.strip().upper())
+        if isinstance(level, int):
+            levels[prefix.strip()] = level
+    return levels
+
+class AccessLog:
+    """Decides which requests get an access log line and builds it"""
+
+    def __init__(
+        self,
+        route_levels: Optional[Mapping[str, int]] = None,
+        sample_rate: float = LOG_REQUEST_SAMPLE_RATE,
+        slow_ms: float = LOG_SLOW_REQUEST_MS,
+        include_headers: bool = LOG_REQUEST_HEADERS,
+        logger: logging.Logger = access_logger,
+    ):
+        levels = parse_route_levels(LOG_ROUTE_LEVELS) if route_levels is None else dict(route_levels)
+        # Longest prefix first so "/api/twilio" wins over "/api"
+        self.route_levels = sorted(levels.items(), key=lambda item: len(item[0]), reverse=True)
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.include_headers = include_headers
+        self.logger = logger
+
+    def threshold(self, path: str) -> int:
+        for prefix, level in self.route_levels:
+            if path.startswith(prefix):
+                return level
+        return logging.INFO
+
+    def log(self, method: str, path: str, route: str, status: int, duration_ms: float,
+            headers: Optional[Iterable] = None, **fields):
+        if status >= 500:
+            level = logging.ERROR
+        elif status >= 400 or duration_ms >= self.slow_ms:
+            level = logging.WARNING
+        else:
+            level = logging.INFO
+        if level < self.threshold(path) or not self.logger.isEnabledFor(level):
+            return
+        if level == logging.INFO and random.random() >= self.sample_rate:
+            return
+
+        entry = {
+            "method": method,
+            "path": path,
+            "route": route,
+            "status": status,
+            "duration_ms": round(duration_ms, 2),
+            **fields,
+        }
+        if self.include_headers and headers is not None:
+            entry["headers"] = redact_headers(headers)
+        self.logger.log(level, f"{method} {path} {status} {duration_ms:.0f}ms", extra={"http": entry})
+
+def redact_headers(headers: Iterable) -> Dict[str, str]:
+    items = headers.items() if hasattr(headers, "items") else headers
+    return {
+        name: "[redacted]" if name.lower() in REDACTED_HEADERS else value
+        for name, value in items
+    }
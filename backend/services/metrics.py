@@ -0,0 +1,296 @@
+import sys
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("carecall")
+
+# Prometheus text exposition format, version 0.0.4
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Vendor-bound stages (LLM, TTS, dialing) routinely take seconds
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()  # Vendor pools update metrics from worker threads
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels) -> Optional[float]:
+        return self._values.get(self._key(labels))
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, plus sum and count
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._values.get(self._key(labels))
+        return series[2] if series else 0
+
+    def _render_sample(self, key, series) -> List[str]:
+        counts, total, count = series
+        lines, cumulative = [], 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class MetricsRegistry:
+    """In-process metrics rendered in the Prometheus text format on scrape"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def collector(self, fn: Callable[[], None]) -> Callable[[], None]:
+        """Register a function that refreshes gauges from existing stats just before each scrape"""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        for collect in self._collectors:
+            try:
+                collect()
+            except Exception as e:
+                logger.warning(f"Metrics collector {collect.__name__} failed: {str(e)}")
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+REQUEST_LATENCY = metrics.histogram(
+    "carecall_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+PIPELINE_STAGE_LATENCY = metrics.histogram(
+    "carecall_pipeline_stage_duration_seconds",
+    "Duration of each call pipeline stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+PIPELINE_STAGE_ERRORS = metrics.counter(
+    "carecall_pipeline_stage_errors_total",
+    "Call pipeline stages that raised",
+    ["stage"],
+)
+VENDOR_ERRORS = metrics.counter(
+    "carecall_vendor_errors_total",
+    "Failed vendor SDK calls",
+    ["vendor"],
+)
+QUEUE_DEPTH = metrics.gauge(
+    "carecall_queue_depth",
+    "Items waiting in each in-process or persistent queue",
+    ["queue"],
+)
+VENDOR_POOL_ACTIVE = metrics.gauge(
+    "carecall_vendor_pool_active",
+    "Vendor calls currently running",
+    ["vendor"],
+)
+DB_POOL = metrics.gauge(
+    "carecall_db_pool_connections",
+    "Database pool connections by state",
+    ["state"],
+)
+DB_POOL_WAIT = metrics.gauge(
+    "carecall_db_pool_checkout_wait_seconds",
+    "Recent database connection checkout wait",
+    ["quantile"],
+)
+DB_POOL_TIMEOUTS = metrics.gauge(
+    "carecall_db_pool_checkout_timeouts",
+    "Checkouts that timed out waiting for a connection since startup",
+)
+PRERENDER_LOOKUPS = metrics.counter(
+    "carecall_prerender_lookups_total",
+    "Dial-time lookups of pre-rendered media by result (hit, miss, stale)",
+    ["result"],
+)
+DIAL_QUEUE_LATENCY = metrics.histogram(
+    "carecall_dial_queue_wait_seconds",
+    "Time calls waited for a dial slot by lane (manual, scheduled, retry)",
+    ["lane"],
+    buckets=STAGE_BUCKETS,
+)
+DIAL_RATE_LIMITED = metrics.counter(
+    "carecall_dial_rate_limited_total",
+    "Dials Twilio rejected for exceeding the calls-per-second limit",
+)
+TTS_CACHE = metrics.gauge(
+    "carecall_tts_cache",
+    "TTS audio cache figures",
+    ["field"],
+)
+
+PIPELINE_STAGES = ("prerender", "script", "tts", "dial", "transcription", "analysis", "notification")
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Time and trace one call pipeline stage, counting it as an error if it raises"""
+    from services.tracing import span
+
+    started = time.perf_counter()
+    try:
+        with span(f"pipeline.{stage}", stage=stage):
+            yield
+    except Exception:
+        PIPELINE_STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        PIPELINE_STAGE_LATENCY.observe(time.perf_counter() - started, stage=stage)
+
+@metrics.collector
+def _collect_vendor_pools():
+    from services.vendors import vendor_pool_stats
+
+    for name, stats in vendor_pool_stats().items():
+        QUEUE_DEPTH.set(stats["queue_depth"], queue=f"vendor_{name}")
+        VENDOR_POOL_ACTIVE.set(stats["active"], vendor=name)
+
+@metrics.collector
+def _collect_db_pool():
+    from models.base import pool_stats
+
+    stats = pool_stats()
+    for state in ("checked_out", "checked_in", "overflow"):
+        if state in stats:
+            DB_POOL.set(stats[state], state=state)
+    for quantile, field in (("0.5", "wait_p50_ms"), ("0.95", "wait_p95_ms"), ("0.99", "wait_p99_ms")):
+        if stats.get(field) is not None:
+            DB_POOL_WAIT.set(stats[field] / 1000, quantile=quantile)
+    DB_POOL_TIMEOUTS.set(stats["timeouts"])
+
+@metrics.collector
+def _collect_in_process_queues():
+    from services.email_dispatcher import get_email_dispatcher
+    from services.tts_cache import tts_cache_stats
+
+    QUEUE_DEPTH.set(get_email_dispatcher().stats()["queued"], queue="email")
+    # Only report the pipeline's batcher when this process has loaded the pipeline
+    pipeline = sys.modules.get("services.call_pipeline")
+    if pipeline is not None:
+        QUEUE_DEPTH.set(pipeline.analysis_batcher.stats()["pending"], queue="analysis")
+        for lane, stats in pipeline.dialer.stats()["lanes"].items():
+            QUEUE_DEPTH.set(stats["waiting"], queue=f"dial_{lane}")
+    cache = tts_cache_stats()
+    if cache:
+        for field, value in cache.items():
+            if isinstance(value, (int, float)):
+                TTS_CACHE.set(value, field=field)
+
+async def collect_job_queue_depth():
+    """Job queue depth needs a database or Redis round trip, so it is read per scrape"""
+    from services.job_queue import get_job_queue
+
+    try:
+        QUEUE_DEPTH.set(await get_job_queue().depth(), queue="jobs")
+    except Exception as e:
+        logger.warning(f"Could not read job queue depth: {str(e)}")
@@ -0,0 +1,198 @@
+import os
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+
+from models.base import SessionLocal
+from models.enums import PreparedMediaStatus
+from models.models import PreparedMedia, Recipient
+from services.metrics import PRERENDER_LOOKUPS, stage_timer
+from services.scheduler import BucketIndex, floor_to_minute, minute_of_day
+from services.tts_cache import materialize
+
+logger = logging.getLogger("carecall")
+
+# Pre-render settings (enabled with PRERENDER_ENABLED, see services.scheduler)
+# Media must be ready this long before the call
+PRERENDER_LEAD_MINUTES = int(os.getenv("PRERENDER_LEAD_MINUTES", "30"))
+# Work is spread over this many minutes before the lead time
+PRERENDER_WINDOW_MINUTES = int(os.getenv("PRERENDER_WINDOW_MINUTES", "60"))
+PRERENDER_DIR = os.getenv("PRERENDER_DIR", "media/prepared")
+PRERENDER_RETENTION_HOURS = int(os.getenv("PRERENDER_RETENTION_HOURS", "24"))
+
+def recipient_fingerprint(recipient: Recipient) -> str:
+    """Changes whenever an edit to the recipient would change their script"""
+    material = f"{recipient.name}\0{recipient.condition}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+def plan_quota(deadlines: List[int]) -> int:
+    """Renders to start this minute so every deadline (minutes from now) is met at a steady rate.
+
+    The smallest constant rate that finishes everything due within k minutes in
+    the k + 1 minutes left is the maximum of ceil(due_by_k / (k + 1)) over all k.
+    """
+    quota = 0
+    for due, deadline in enumerate(sorted(max(0, d) for d in deadlines), start=1):
+        quota = max(quota, -(-due // (deadline + 1)))
+    return quota
+
+async def _default_enqueue(db, prepared_media_id: int):
+    # Import here to avoid circular imports
+    from services.job_queue import PRERENDER_JOB, get_job_queue
+
+    await get_job_queue().enqueue(PRERENDER_JOB, {"prepared_media_id": prepared_media_id}, db=db)
+
+class Prerenderer:
+    """Queues script and audio rendering for upcoming slots, levelled across the preceding window"""
+
+    def __init__(
+        self,
+        index: BucketIndex,
+        enqueue=None,
+        lead_minutes: int = PRERENDER_LEAD_MINUTES,
+        window_minutes: int = PRERENDER_WINDOW_MINUTES,
+    ):
+        self.index = index
+        self.enqueue = enqueue or _default_enqueue
+        self.lead_minutes = max(0, lead_minutes)
+        self.window_minutes = max(0, window_minutes)
+        self._last_purge: Optional[datetime] = None
+
+    def upcoming(self, now: datetime) -> List[Tuple[int, datetime, int]]:
+        """(recipient_id, slot, minutes until its media is due) for every slot in the horizon"""
+        start = floor_to_minute(now)
+        upcoming = []
+        for ahead in range(1, self.lead_minutes + self.window_minutes + 1):
+            slot = start + timedelta(minutes=ahead)
+            for recipient_id in self.index.bucket(minute_of_day(slot)):
+                upcoming.append((recipient_id, slot, ahead - self.lead_minutes))
+        return upcoming
+
+    async def tick(self, now: datetime) -> List[int]:
+        """Queue this minute's share of the renders still outstanding; returns the recipient ids queued"""
+        if self._last_purge is None or now - self._last_purge >= timedelta(hours=1):
+            await self.purge(now)
+            self._last_purge = now
+
+        upcoming = self.upcoming(now)
+        if not upcoming:
+            return []
+
+        async with SessionLocal() as db:
+            slots = [slot for _, slot, _ in upcoming]
+            result = await db.execute(
+                select(PreparedMedia.recipient_id, PreparedMedia.scheduled_for).where(
+                    PreparedMedia.scheduled_for.between(min(slots), max(slots))
+                )
+            )
+            queued = set(result.all())
+            outstanding = [item for item in upcoming if (item[0], item[1]) not in queued]
+            if not outstanding:
+                return []
+
+            outstanding.sort(key=lambda item: item[2])
+            batch = outstanding[:plan_quota([deadline for _, _, deadline in outstanding])]
+            rows = [PreparedMedia(recipient_id=rid, scheduled_for=slot) for rid, slot, _ in batch]
+            try:
+                db.add_all(rows)
+                await db.flush()
+                for row in rows:
+                    await self.enqueue(db, row.id)
+                await db.commit()
+            except IntegrityError:
+                # Another instance queued some of these; the next tick re-plans without them
+                await db.rollback()
+                return []
+
+        logger.info(f"Queued {len(rows)} pre-renders; {len(outstanding) - len(rows)} outstanding")
+        return [row.recipient_id for row in rows]
+
+    async def purge(self, now: datetime) -> int:
+        """Delete prepared media whose slot is long past, along with any unused audio"""
+        cutoff = now - timedelta(hours=PRERENDER_RETENTION_HOURS)
+        async with SessionLocal() as db:
+            result = await db.execute(
+                select(PreparedMedia.audio_path).where(
+                    PreparedMedia.scheduled_for < cutoff,
+                    PreparedMedia.status == PreparedMediaStatus.READY,
+                )
+            )
+            for audio_path in result.scalars():
+                _remove(audio_path)
+            result = await db.execute(delete(PreparedMedia).where(PreparedMedia.scheduled_for < cutoff))
+            await db.commit()
+            return result.rowcount
+
+def _remove(path: Optional[str]):
+    if path:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+async def prepare_media(prepared_media_id: int):
+    """Render the script and audio for one queued slot (runs in the job workers)"""
+    # Import here so the scheduler never loads the vendor SDKs
+    from services.call_pipeline import generate_script, text_to_speech
+
+    async with SessionLocal() as db:
+        prepared = await db.get(PreparedMedia, prepared_media_id)
+        if prepared is None or prepared.status != PreparedMediaStatus.PENDING:
+            return
+        recipient = await db.get(Recipient, prepared.recipient_id)
+        if recipient is None:
+            return
+
+        audio_path = os.path.join(PRERENDER_DIR, f"{recipient.id}_{prepared.scheduled_for:%Y%m%d%H%M}.mp3")
+        try:
+            with stage_timer("prerender"):
+                script = await generate_script(recipient)
+                os.makedirs(PRERENDER_DIR, exist_ok=True)
+                await text_to_speech(script, audio_path)
+        except Exception as e:
+            # Left pending so the job retries; the call renders live if it never succeeds
+            prepared.error = str(e)
+            await db.commit()
+            raise
+
+        prepared.status = PreparedMediaStatus.READY
+        prepared.fingerprint = recipient_fingerprint(recipient)
+        prepared.script = script
+        prepared.audio_path = audio_path
+        prepared.error = None
+        prepared.prepared_at = datetime.utcnow()
+        await db.commit()
+
+async def use_prepared_media(db, recipient: Recipient, check_in_id: int, output_path: str,
+                             scheduled_for: datetime) -> bool:
+    """Expose the audio prepared for this scheduled slot at output_path; False when the call must render live.
+
+    The prepared row is marked used on the caller's session and committed with it.
+    """
+    result = await db.execute(
+        select(PreparedMedia).where(
+            PreparedMedia.recipient_id == recipient.id,
+            PreparedMedia.scheduled_for == scheduled_for,
+            PreparedMedia.status == PreparedMediaStatus.READY,
+        )
+    )
+    prepared = result.scalar_one_or_none()
+    if prepared is None:
+        PRERENDER_LOOKUPS.inc(result="miss")
+        return False
+    if prepared.fingerprint != recipient_fingerprint(recipient) or not os.path.exists(prepared.audio_path):
+        # The recipient was edited after rendering, or the file is gone
+        PRERENDER_LOOKUPS.inc(result="stale")
+        return False
+
+    materialize(Path(prepared.audio_path), output_path)
+    _remove(prepared.audio_path)
+    prepared.status = PreparedMediaStatus.USED
+    prepared.check_in_id = check_in_id
+    PRERENDER_LOOKUPS.inc(result="hit")
+    return True
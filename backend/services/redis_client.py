@@ -0,0 +1,29 @@
+import os
+import logging
+from typing import Optional
+
+logger = logging.getLogger("carecall")
+
+_client = None
+
+def redis_url() -> Optional[str]:
+    return os.getenv("REDIS_URL")
+
+def get_redis():
+    """Return the shared asyncio Redis client, created on first use"""
+    global _client
+    if _client is None:
+        url = redis_url()
+        if not url:
+            raise RuntimeError("REDIS_URL environment variable is required for the Redis backend")
+        import redis.asyncio as redis
+
+        _client = redis.from_url(url, decode_responses=True)
+        logger.info("Redis client initialized")
+    return _client
+
+async def close_redis():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
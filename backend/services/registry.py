@@ -0,0 +1,108 @@
+import os
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger("carecall")
+
+TEXT_MODEL_NAME = os.getenv("TEXT_MODEL_NAME", "text-bison@001")
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-2.0-flash")
+
+class ClientRegistry:
+    """Builds each vendor model or client lazily, exactly once per process"""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        with self._guard:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+
+    def override(self, name: str, instance: Any):
+        """Install a ready-made instance, e.g. a fake vendor client in tests"""
+        with self._guard:
+            self._locks.setdefault(name, threading.Lock())
+            self._instances[name] = instance
+
+    def is_ready(self, name: str) -> bool:
+        return name in self._instances
+
+    def get(self, name: str) -> Any:
+        """Return the instance, building it on first use (blocking; call from a worker thread)"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        lock = self._locks.get(name)
+        if lock is None:
+            raise KeyError(f"No client registered under {name!r}")
+        with lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                logger.info(f"Initializing {name}")
+                instance = self._factories[name]()
+                self._instances[name] = instance
+        return instance
+
+    async def aget(self, name: str) -> Any:
+        """Async variant of get() that builds in a thread so the event loop never blocks"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        return await asyncio.to_thread(self.get, name)
+
+    async def warm(self, names: Optional[Iterable[str]] = None):
+        """Build the given (or all registered) clients concurrently, logging failures"""
+        names = list(names) if names is not None else list(self._factories)
+        results = await asyncio.gather(*(self.aget(name) for name in names), return_exceptions=True)
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Could not warm {name}: {str(result)}")
+        logger.info("Client warm-up finished")
+
+    def reset(self, name: Optional[str] = None):
+        with self._guard:
+            if name is None:
+                self._instances.clear()
+            else:
+                self._instances.pop(name, None)
+
+def _init_vertexai():
+    import vertexai
+
+    vertexai.init(project=os.getenv("GCP_PROJECT_ID"), location=os.getenv("GCP_REGION"))
+    return True
+
+def _text_model():
+    registry.get("vertexai")
+    from vertexai.preview.language_models import TextGenerationModel
+
+    return TextGenerationModel.from_pretrained(TEXT_MODEL_NAME)
+
+def _gemini_model():
+    registry.get("vertexai")
+    from vertexai.preview.generative_models import GenerativeModel
+
+    return GenerativeModel(GEMINI_MODEL_NAME)
+
+def _tts_client():
+    from google.cloud import texttospeech
+
+    return texttospeech.TextToSpeechClient()
+
+def _twilio_client():
+    from twilio.rest import Client
+
+    return Client(os.getenv("TWILIO_ACCOUNT_SID"), os.getenv("TWILIO_AUTH_TOKEN"))
+
+# Process-wide registry
+registry = ClientRegistry()
+registry.register("vertexai", _init_vertexai)
+registry.register("text_model", _text_model)
+registry.register("gemini_model", _gemini_model)
+registry.register("tts_client", _tts_client)
+registry.register("twilio_client", _twilio_client)
@@ -0,0 +1,259 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from models.base import SessionLocal
+from models.models import Recipient, ScheduledCall
+from services.dialer import LANE_SCHEDULED, smoothing_delays
+
+logger = logging.getLogger("carecall")
+
+MINUTES_PER_DAY = 24 * 60
+
+# Scheduler settings
+SCHEDULER_CONCURRENCY = int(os.getenv("SCHEDULER_CONCURRENCY", "10"))
+SCHEDULER_CATCH_UP_MINUTES = int(os.getenv("SCHEDULER_CATCH_UP_MINUTES", "5"))
+SCHEDULER_REINDEX_MINUTES = int(os.getenv("SCHEDULER_REINDEX_MINUTES", "60"))
+PRERENDER_ENABLED = os.getenv("PRERENDER_ENABLED", "false").lower() == "true"
+
+def parse_preferred_time(value: Optional[str]) -> Optional[int]:
+    """Convert an "HH:MM" UTC string into a minute of the day, or None if invalid"""
+    if not value:
+        return None
+    try:
+        hours, minutes = value.strip().split(":")
+        hours, minutes = int(hours), int(minutes)
+    except ValueError:
+        return None
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        return None
+    return hours * 60 + minutes
+
+def minute_of_day(moment: datetime) -> int:
+    return moment.hour * 60 + moment.minute
+
+def floor_to_minute(moment: datetime) -> datetime:
+    return moment.replace(second=0, microsecond=0)
+
+class BucketIndex:
+    """In-memory index of recipient ids keyed by their preferred minute of the day"""
+
+    def __init__(self):
+        self._buckets: Dict[int, Set[int]] = {}
+        self._minute_by_recipient: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._minute_by_recipient)
+
+    def upsert(self, recipient_id: int, preferred_time: Optional[str]):
+        """Add a recipient to the bucket for its preferred time, moving it if needed"""
+        minute = parse_preferred_time(preferred_time)
+        previous = self._minute_by_recipient.get(recipient_id)
+        if previous == minute:
+            return
+        if previous is not None:
+            self._discard(recipient_id, previous)
+        if minute is None:
+            if preferred_time:
+                logger.warning(f"Ignoring invalid preferred_time {preferred_time!r} for recipient {recipient_id}")
+            return
+        self._buckets.setdefault(minute, set()).add(recipient_id)
+        self._minute_by_recipient[recipient_id] = minute
+
+    def remove(self, recipient_id: int):
+        minute = self._minute_by_recipient.get(recipient_id)
+        if minute is not None:
+            self._discard(recipient_id, minute)
+
+    def bucket(self, minute: int) -> List[int]:
+        return sorted(self._buckets.get(minute % MINUTES_PER_DAY, ()))
+
+    def rebuild(self, rows: Iterable[tuple]):
+        """Replace the index contents with (recipient_id, preferred_time) rows"""
+        self._buckets = {}
+        self._minute_by_recipient = {}
+        for recipient_id, preferred_time in rows:
+            self.upsert(recipient_id, preferred_time)
+
+    def _discard(self, recipient_id: int, minute: int):
+        bucket = self._buckets.get(minute)
+        if bucket is not None:
+            bucket.discard(recipient_id)
+            if not bucket:
+                del self._buckets[minute]
+        self._minute_by_recipient.pop(recipient_id, None)
+
+async def load_index(index: BucketIndex):
+    """Build the bucket index from the recipients table (run at startup, not per tick)"""
+    async with SessionLocal() as db:
+        query = select(Recipient.id, Recipient.preferred_time).execution_options(yield_per=1000)
+        result = await db.stream(query)
+        rows = [tuple(row) async for row in result]
+    index.rebuild(rows)
+    logger.info(f"Scheduler index loaded with {len(index)} recipients")
+
+async def _default_dispatch(recipient_id: int, delay: float = 0, db=None, slot: Optional[datetime] = None) -> Optional[int]:
+    # Import here to avoid circular imports
+    from services.job_queue import enqueue_checkin
+
+    return await enqueue_checkin(recipient_id, db, lane=LANE_SCHEDULED, delay=delay, scheduled_for=slot)
+
+class CheckInScheduler:
+    """Wakes once per minute and dispatches the recipients due in that minute"""
+
+    def __init__(
+        self,
+        index: BucketIndex,
+        dispatch: Optional[Callable[..., Awaitable[Optional[int]]]] = None,
+        concurrency: int = SCHEDULER_CONCURRENCY,
+        catch_up_minutes: int = SCHEDULER_CATCH_UP_MINUTES,
+        reindex_minutes: int = SCHEDULER_REINDEX_MINUTES,
+        prerender=None,
+    ):
+        self.index = index
+        self.prerender = prerender
+        self.dispatch = dispatch or _default_dispatch
+        self.concurrency = max(1, concurrency)
+        self.catch_up_minutes = max(0, catch_up_minutes)
+        self.reindex_minutes = reindex_minutes
+        self._task: Optional[asyncio.Task] = None
+        self._last_slot: Optional[datetime] = None
+        self._last_reindex: Optional[datetime] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.running:
+            return
+        await load_index(self.index)
+        self._last_reindex = datetime.utcnow()
+        if self.prerender is None and PRERENDER_ENABLED:
+            # Import here to avoid circular imports
+            from services.prerender import Prerenderer
+
+            self.prerender = Prerenderer(self.index)
+        # Re-run the last few slots after a restart; claims make this safe
+        self._last_slot = floor_to_minute(datetime.utcnow()) - timedelta(minutes=self.catch_up_minutes + 1)
+        self._task = asyncio.create_task(self._run())
+        logger.info("Check-in scheduler started")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Check-in scheduler stopped")
+
+    async def _run(self):
+        while True:
+            try:
+                await self.tick(datetime.utcnow())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Scheduler tick failed: {str(e)}")
+            now = datetime.utcnow()
+            next_minute = floor_to_minute(now) + timedelta(minutes=1)
+            await asyncio.sleep((next_minute - now).total_seconds())
+
+    async def tick(self, now: datetime):
+        """Run every slot between the last processed one and now"""
+        current = floor_to_minute(now)
+        if self.reindex_minutes > 0 and self._last_reindex is not None \
+                and now - self._last_reindex >= timedelta(minutes=self.reindex_minutes):
+            await load_index(self.index)
+            self._last_reindex = now
+
+        slot = self._last_slot + timedelta(minutes=1) if self._last_slot else current
+        while slot <= current:
+            await self.run_slot(slot)
+            self._last_slot = slot
+            slot += timedelta(minutes=1)
+
+        # Dispatch first: rendering ahead must never delay a due call
+        if self.prerender is not None:
+            try:
+                await self.prerender.tick(now)
+            except Exception as e:
+                logger.error(f"Pre-render planning failed: {str(e)}")
+
+    async def run_slot(self, slot: datetime) -> List[int]:
+        """Claim and dispatch the recipients whose preferred time falls in this slot"""
+        candidates = self.index.bucket(minute_of_day(slot))
+        if not candidates:
+            return []
+
+        pending = await self._unclaimed(slot, candidates)
+        if not pending:
+            return []
+        logger.info(f"Dispatching {len(pending)} check-ins for slot {slot:%Y-%m-%d %H:%M}")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        # Stagger the calls at the dial rate instead of queueing them all on the minute
+        delays = smoothing_delays(len(pending))
+
+        async def run_one(recipient_id: int, delay: float) -> bool:
+            async with semaphore:
+                try:
+                    return await self._claim_and_dispatch(recipient_id, slot, delay)
+                except Exception as e:
+                    # The claim rolled back with the enqueue, so a catch-up run can retry the slot
+                    logger.error(f"Scheduled check-in for recipient {recipient_id} failed: {str(e)}")
+                    return False
+
+        results = await asyncio.gather(*(run_one(recipient_id, delay) for recipient_id, delay in zip(pending, delays)))
+        return [recipient_id for recipient_id, claimed in zip(pending, results) if claimed]
+
+    async def _unclaimed(self, slot: datetime, candidates: List[int]) -> List[int]:
+        """Recipients still due in this slot that no instance has claimed yet"""
+        minute = minute_of_day(slot)
+        async with SessionLocal() as db:
+            # Re-check the bucket against the table by primary key to drop stale entries
+            result = await db.execute(
+                select(Recipient.id, Recipient.preferred_time).where(Recipient.id.in_(candidates))
+            )
+            due = [rid for rid, preferred in result.all() if parse_preferred_time(preferred) == minute]
+            if not due:
+                return []
+
+            result = await db.execute(
+                select(ScheduledCall.recipient_id).where(
+                    ScheduledCall.scheduled_for == slot,
+                    ScheduledCall.recipient_id.in_(due)
+                )
+            )
+            already_claimed = set(result.scalars().all())
+            return [rid for rid in due if rid not in already_claimed]
+
+    async def _claim_and_dispatch(self, recipient_id: int, slot: datetime, delay: float) -> bool:
+        """Claim the slot and queue its call in one transaction; False if another instance has it"""
+        async with SessionLocal() as db:
+            claim = ScheduledCall(recipient_id=recipient_id, scheduled_for=slot)
+            db.add(claim)
+            try:
+                await db.flush()
+            except IntegrityError:
+                await db.rollback()
+                return False
+
+            # Commits the claim together with the check-in and its job
+            check_in_id = await self.dispatch(recipient_id, delay=delay, db=db, slot=slot)
+            if check_in_id is not None:
+                claim.check_in_id = check_in_id
+            await db.commit()
+            return True
+
+# Process-wide scheduler and its index
+bucket_index = BucketIndex()
+scheduler = CheckInScheduler(bucket_index)
@@ -0,0 +1,118 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger("carecall")
+
+SCRIPT_TEMPLATE_TTL_SECONDS = int(os.getenv("SCRIPT_TEMPLATE_TTL_SECONDS", str(24 * 60 * 60)))
+# How long to serve the built-in template before asking the model again after a failure
+SCRIPT_FALLBACK_TTL_SECONDS = int(os.getenv("SCRIPT_FALLBACK_TTL_SECONDS", "300"))
+
+NAME_PLACEHOLDER = "{name}"
+
+FALLBACK_TEMPLATE = (
+    "Hello {name}, this is your CareCall care assistant calling for your daily check-in. "
+    "How are you feeling today? "
+    "How has your {condition} been since we last spoke? "
+    "Is there anything you need help with, or anyone you would like us to contact? "
+    "Please share your answer after the beep. Take care, {name}."
+)
+
+def template_prompt(condition: str) -> str:
+    return f"""Generate a natural, caring conversation script for a wellness check-in call.
+    The recipient has {condition}. Refer to the recipient only as {NAME_PLACEHOLDER}, written exactly like that,
+    because the real name will be filled in later.
+    The script should:
+    1. Introduce the AI as a care assistant
+    2. Ask how they're feeling today
+    3. Ask about their condition
+    4. Ask if they need any help
+    Keep the tone warm and conversational."""
+
+def fill_template(template: str, name: str, condition: str) -> str:
+    # Plain replacement: model output may contain other braces
+    return template.replace(NAME_PLACEHOLDER, name or "there").replace("{condition}", condition or "health")
+
+class ScriptEngine:
+    """Per-condition script templates generated by the LLM, memoized with a TTL"""
+
+    def __init__(
+        self,
+        generate: Optional[Callable[[str], Awaitable[str]]],
+        ttl: float = SCRIPT_TEMPLATE_TTL_SECONDS,
+        fallback_ttl: float = SCRIPT_FALLBACK_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.generate = generate
+        self.ttl = ttl
+        self.fallback_ttl = fallback_ttl
+        self.clock = clock
+        self._templates: Dict[str, Tuple[str, float]] = {}  # condition -> (template, expires_at)
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+
+    async def render(self, name: str, condition: str) -> str:
+        template = await self.template_for(condition)
+        return fill_template(template, name, condition)
+
+    async def template_for(self, condition: str) -> str:
+        key = (condition or "").strip().lower()
+        cached = self._fresh(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Another task may have generated it while we waited
+            cached = self._fresh(key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+
+            self.misses += 1
+            template = await self._generate_template(condition)
+            if template is None:
+                self.fallbacks += 1
+                template, ttl = FALLBACK_TEMPLATE, self.fallback_ttl
+            else:
+                ttl = self.ttl
+            self._templates[key] = (template, self.clock() + ttl)
+            return template
+
+    def _fresh(self, key: str) -> Optional[str]:
+        entry = self._templates.get(key)
+        if entry is not None and entry[1] > self.clock():
+            return entry[0]
+        return None
+
+    async def _generate_template(self, condition: str) -> Optional[str]:
+        if self.generate is None:
+            return None
+        try:
+            template = (await self.generate(template_prompt(condition or "a health condition"))).strip()
+        except Exception as e:
+            logger.warning(f"Script template generation failed, using built-in template: {str(e)}")
+            return None
+        if NAME_PLACEHOLDER not in template:
+            logger.warning("Generated script template has no name placeholder, using built-in template")
+            return None
+        return template
+
+    def invalidate(self, condition: Optional[str] = None):
+        if condition is None:
+            self._templates.clear()
+        else:
+            self._templates.pop(condition.strip().lower(), None)
+
+    def stats(self) -> dict:
+        return {
+            "templates": len(self._templates),
+            "hits": self.hits,
+            "misses": self.misses,
+            "fallbacks": self.fallbacks,
+        }
@@ -0,0 +1,196 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models.base import SessionLocal
+from models.models import CheckIn, Recipient, RecipientStatusSummary
+from models.enums import CheckInStatus
+
+logger = logging.getLogger("carecall")
+
+# Statuses counted as concerns in the rolling windows
+CONCERN_STATUSES = (CheckInStatus.CONCERN, CheckInStatus.EMERGENCY)
+SHORT_WINDOW = timedelta(days=7)
+LONG_WINDOW = timedelta(days=30)
+
+# Expired windows and missing rows are recomputed in the background, at most this late
+SUMMARY_REFRESH_SECONDS = float(os.getenv("SUMMARY_REFRESH_SECONDS", "60"))
+SUMMARY_REFRESH_BATCH = int(os.getenv("SUMMARY_REFRESH_BATCH", "200"))
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Naive UTC, as the summary columns store it; check-in completion times are timezone-aware"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _stale_at(concern_times: List[datetime], now: datetime) -> Optional[datetime]:
+    """Earliest moment one of the counted concerns drops out of its window"""
+    expiries = [t + LONG_WINDOW for t in concern_times]
+    expiries += [t + SHORT_WINDOW for t in concern_times if t + SHORT_WINDOW > now]
+    return min(expiries) if expiries else None
+
+async def _lock_summary(db, recipient_id: int, now: datetime) -> Tuple[RecipientStatusSummary, bool]:
+    """Lock the recipient's summary row, creating an empty one first if needed; True if it was created.
+
+    A row lock cannot cover a missing row, so the row is inserted with ON CONFLICT DO NOTHING
+    and then selected FOR UPDATE: concurrent first writers serialize instead of one failing.
+    """
+    # Sessions do not autoflush; the recompute must see the caller's pending check-in
+    await db.flush()
+    insert = pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+    result = await db.execute(
+        insert(RecipientStatusSummary)
+        .values(recipient_id=recipient_id, concerns_7d=0, concerns_30d=0, updated_at=now)
+        .on_conflict_do_nothing(index_elements=["recipient_id"])
+    )
+    summary = await db.get(RecipientStatusSummary, recipient_id, with_for_update=True, populate_existing=True)
+    return summary, result.rowcount == 1
+
+async def refresh_summary(db, recipient_id: int, now: Optional[datetime] = None) -> RecipientStatusSummary:
+    """Recompute one recipient's summary from check_ins (bounded to the last 30 days)"""
+    now = now or datetime.utcnow()
+    summary, _ = await _lock_summary(db, recipient_id, now)
+
+    query = (
+        select(CheckIn.id, CheckIn.status, CheckIn.summary, CheckIn.completed_at)
+        .where(CheckIn.recipient_id == recipient_id, CheckIn.completed_at.isnot(None))
+        .order_by(CheckIn.completed_at.desc(), CheckIn.id.desc())
+        .limit(1)
+    )
+    last = (await db.execute(query)).first()
+
+    query = select(CheckIn.completed_at).where(
+        CheckIn.recipient_id == recipient_id,
+        CheckIn.status.in_(CONCERN_STATUSES),
+        CheckIn.completed_at > (now - LONG_WINDOW).replace(tzinfo=timezone.utc),
+    )
+    concern_times = [_utc(t) for t in (await db.execute(query)).scalars().all()]
+
+    summary.last_check_in_id = last.id if last else None
+    summary.last_status = last.status if last else None
+    summary.last_summary = last.summary if last else None
+    summary.last_call_at = _utc(last.completed_at) if last else None
+    summary.concerns_30d = len(concern_times)
+    summary.concerns_7d = sum(1 for t in concern_times if t > now - SHORT_WINDOW)
+    summary.stale_at = _stale_at(concern_times, now)
+    summary.updated_at = now
+    return summary
+
+async def record_check_in_result(db, check_in: CheckIn) -> RecipientStatusSummary:
+    """Fold a just-finalized check-in into its recipient's summary, in the caller's transaction"""
+    now = datetime.utcnow()
+    summary, created = await _lock_summary(db, check_in.recipient_id, now)
+    if created or summary.last_check_in_id == check_in.id or check_in.completed_at is None:
+        # First summary for this recipient, or the same check-in finalized again (a retried job)
+        return await refresh_summary(db, check_in.recipient_id, now)
+
+    completed_at = _utc(check_in.completed_at)
+    if summary.last_call_at is None or completed_at >= summary.last_call_at:
+        summary.last_check_in_id = check_in.id
+        summary.last_status = check_in.status
+        summary.last_summary = check_in.summary
+        summary.last_call_at = completed_at
+
+    if check_in.status in CONCERN_STATUSES:
+        summary.concerns_30d += 1
+        expiry = completed_at + SHORT_WINDOW
+        if completed_at > now - SHORT_WINDOW:
+            summary.concerns_7d += 1
+        else:
+            expiry = completed_at + LONG_WINDOW
+        summary.stale_at = min(summary.stale_at, expiry) if summary.stale_at else expiry
+    summary.updated_at = now
+    return summary
+
+async def get_summaries(db, user_id: int) -> List[Tuple[Recipient, RecipientStatusSummary]]:
+    """Recipients of a user with their summaries in one read-only query.
+
+    Rows are kept current by record_check_in_result and SummaryRefresher; a recipient
+    without a row yet gets an empty, unsaved summary.
+    """
+    query = (
+        select(Recipient, RecipientStatusSummary)
+        .outerjoin(RecipientStatusSummary, RecipientStatusSummary.recipient_id == Recipient.id)
+        .where(Recipient.user_id == user_id)
+        .order_by(Recipient.id)
+    )
+    now = datetime.utcnow()
+    return [
+        (recipient, summary or RecipientStatusSummary(
+            recipient_id=recipient.id, concerns_7d=0, concerns_30d=0, updated_at=now,
+        ))
+        for recipient, summary in (await db.execute(query)).all()
+    ]
+
+async def refresh_expired_summaries(now: Optional[datetime] = None, limit: int = SUMMARY_REFRESH_BATCH) -> int:
+    """Recompute up to `limit` summaries whose window expired or that do not exist yet"""
+    now = now or datetime.utcnow()
+    async with SessionLocal() as db:
+        query = (
+            select(Recipient.id)
+            .outerjoin(RecipientStatusSummary, RecipientStatusSummary.recipient_id == Recipient.id)
+            .where(or_(RecipientStatusSummary.recipient_id.is_(None), RecipientStatusSummary.stale_at <= now))
+            .order_by(Recipient.id)
+            .limit(limit)
+        )
+        recipient_ids = (await db.execute(query)).scalars().all()
+        for recipient_id in recipient_ids:
+            await refresh_summary(db, recipient_id, now)
+        await db.commit()
+    return len(recipient_ids)
+
+class SummaryRefresher:
+    """Background task that keeps the summaries' rolling windows current"""
+
+    def __init__(self, interval: float = SUMMARY_REFRESH_SECONDS, batch: int = SUMMARY_REFRESH_BATCH):
+        self.interval = interval
+        self.batch = max(1, batch)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def refresh(self, now: Optional[datetime] = None) -> int:
+        """Refresh every expired or missing summary in batches; returns how many were refreshed"""
+        total = 0
+        while True:
+            refreshed = await refresh_expired_summaries(now, self.batch)
+            total += refreshed
+            if refreshed < self.batch:
+                break
+        if total:
+            logger.debug(f"Refreshed {total} recipient status summaries")
+        return total
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Status summary refresh failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+summary_refresher = SummaryRefresher()
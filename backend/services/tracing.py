@@ -0,0 +1,316 @@
+import os
+import json
+import time
+import queue
+import random
+import logging
+import secrets
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("carecall")
+
+# Tracing settings
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()  # none|file|otlp
+TRACING_FILE = os.getenv("TRACING_FILE", "data/traces.jsonl")
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")
+TRACING_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "carecall-backend")
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+TRACING_BATCH_SIZE = int(os.getenv("TRACING_BATCH_SIZE", "200"))
+TRACING_FLUSH_SECONDS = float(os.getenv("TRACING_FLUSH_SECONDS", "2"))
+TRACING_QUEUE_SIZE = int(os.getenv("TRACING_QUEUE_SIZE", "10000"))
+
+# Query parameter and job payload key carrying the W3C trace context
+TRACEPARENT = "traceparent"
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    kind: str = "internal"  # internal|server|client
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    # Unsampled spans are never exported but still carry the trace, so children follow the decision
+    sampled: bool = True
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def end(self, error: Optional[BaseException] = None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        if self.sampled:
+            tracer.export(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3) if self.end_ns else None,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("carecall_span", default=None)
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace_id, parent span_id, sampled) from a W3C traceparent, or None when absent or malformed"""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def current_traceparent() -> Optional[str]:
+    span = _current_span.get()
+    return span.traceparent if span is not None else None
+
+def with_traceparent(url: str) -> str:
+    """Append the current trace context to a callback URL so the webhook joins this trace"""
+    traceparent = current_traceparent()
+    if traceparent is None:
+        return url
+    return f"{url}{'&' if '?' in url else '?'}{TRACEPARENT}={traceparent}"
+
+class FileExporter:
+    """Appends finished spans to a JSON lines file"""
+
+    def __init__(self, path: str = TRACING_FILE):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[Span]):
+        with open(self.path, "a") as out:
+            for span in spans:
+                out.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+    def shutdown(self):
+        pass
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+_OTLP_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+class OTLPExporter:
+    """Posts spans to an OTLP/HTTP collector (JSON encoding), e.g. a local Jaeger or OTel Collector"""
+
+    def __init__(self, endpoint: str = OTLP_ENDPOINT, service_name: str = TRACING_SERVICE_NAME, client=None):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.Client(timeout=5)
+        return self._client
+
+    def encode(self, spans: List[Span]) -> dict:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{
+                "scope": {"name": "carecall"},
+                "spans": [{
+                    "traceId": span.trace_id,
+                    "spanId": span.span_id,
+                    **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                    "name": span.name,
+                    "kind": _OTLP_KINDS.get(span.kind, 1),
+                    "startTimeUnixNano": str(span.start_ns),
+                    "endTimeUnixNano": str(span.end_ns),
+                    "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+                    "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+                } for span in spans],
+            }],
+        }]}
+
+    def export(self, spans: List[Span]):
+        response = self.client.post(self.url, json=self.encode(spans))
+        response.raise_for_status()
+
+    def shutdown(self):
+        if self._client is not None:
+            self._client.close()
+
+class Tracer:
+    """Creates spans and exports finished ones in batches from a background thread"""
+
+    def __init__(self, exporter=None, sample_rate: float = TRACING_SAMPLE_RATE):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self._queue: queue.Queue = queue.Queue(maxsize=TRACING_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def configure(self, exporter, sample_rate: Optional[float] = None):
+        self.shutdown()
+        self.exporter = exporter
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+
+    def start_span(self, name: str, parent: Optional[Span] = None, traceparent: Optional[str] = None,
+                   kind: str = "internal", **attributes) -> Optional[Span]:
+        """New span under `parent`, else the remote `traceparent`, else the current span"""
+        if not self.enabled:
+            return None
+        parent = parent or _current_span.get()
+        remote = parse_traceparent(traceparent) if parent is None else None
+        if parent is not None:
+            trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+        elif remote is not None:
+            trace_id, parent_id, sampled = remote
+        else:
+            # Root span: the sampling decision is made once per trace and inherited by every child
+            trace_id, parent_id = secrets.token_hex(16), None
+            sampled = random.random() < self.sample_rate
+        return Span(name, trace_id, secrets.token_hex(8), parent_id, kind, attributes=attributes, sampled=sampled)
+
+    def export(self, span: Span):
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + TRACING_FLUSH_SECONDS
+            while len(batch) < TRACING_BATCH_SIZE:
+                try:
+                    span = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if span is None:
+                    stopping = True
+                    break
+                batch.append(span)
+            if batch and self.exporter is not None:
+                try:
+                    self.exporter.export(batch)
+                except Exception as e:
+                    logger.warning(f"Failed to export {len(batch)} spans: {str(e)}")
+
+    def flush(self):
+        """Export everything queued so far and stop the exporter thread"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def shutdown(self):
+        self.flush()
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+def _exporter_from_env():
+    if TRACING_EXPORTER == "file":
+        return FileExporter()
+    if TRACING_EXPORTER == "otlp":
+        return OTLPExporter()
+    return None
+
+tracer = Tracer(_exporter_from_env())
+
+@contextmanager
+def span(name: str, traceparent: Optional[str] = None, kind: str = "internal", **attributes) -> Iterator[Optional[Span]]:
+    """Run the block inside a span that becomes the current span; a no-op when tracing is off"""
+    active = tracer.start_span(name, traceparent=traceparent, kind=kind, **attributes)
+    if active is None:
+        yield None
+        return
+    token = _current_span.set(active)
+    try:
+        yield active
+    except BaseException as e:
+        active.end(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        active.end()
+
+def instrument_engine(engine):
+    """Record a client span for every SQL statement run on the engine; safe to call again"""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if getattr(sync_engine, "_carecall_traced", False):
+        return
+    sync_engine._carecall_traced = True
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        # The async engine runs these hooks in the caller's context, so the current
+        # span is the parent; the query span is kept on the execution context only
+        parent = _current_span.get()
+        if context is not None and parent is not None and parent.sampled:
+            context._trace_span = tracer.start_span(
+                "db.query", kind="client",
+                **{"db.system": sync_engine.dialect.name, "db.statement": statement[:500]},
+            )
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _end(conn, cursor, statement, parameters, context, executemany):
+        query_span = getattr(context, "_trace_span", None)
+        if query_span is not None:
+            if cursor is not None and cursor.rowcount is not None and cursor.rowcount >= 0:
+                query_span.set("db.rowcount", cursor.rowcount)
+            query_span.end()
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        query_span = getattr(exception_context.execution_context, "_trace_span", None)
+        if query_span is not None:
+            query_span.end(exception_context.original_exception)
@@ -0,0 +1,212 @@
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models.enums import CheckInStatus
+
+# Phrase lists are matched on word boundaries after normalization (lowercase, straight quotes)
+EMERGENCY_PHRASES = [
+    "chest pain", "chest hurts", "having a heart attack", "having a stroke", "having a seizure",
+    "can't breathe", "cannot breathe", "can not breathe", "hard to breathe", "trouble breathing",
+    "short of breath", "can't get up", "i fell", "i've fallen", "i have fallen", "fell down",
+    "i'm bleeding", "bleeding a lot", "passed out", "fainted", "unconscious",
+    "call 911", "call an ambulance", "need an ambulance", "send an ambulance",
+    "it's an emergency", "this is an emergency", "medical emergency",
+    "please help me", "somebody help", "i need help now", "overdose", "took too many pills",
+    "kill myself", "end my life", "suicide", "want to die",
+]
+
+# Cues that something may be wrong; any of these sends the transcript to the model
+CONCERN_PHRASES = [
+    "pain", "hurts", "hurting", "dizzy", "dizziness", "nausea", "nauseous", "vomiting",
+    "fever", "sick", "ill", "unwell", "worse", "not well", "not good", "not great",
+    "not fine", "not okay", "not ok", "not doing well", "not feeling", "tired", "exhausted",
+    "weak", "confused", "forgot", "missed my", "ran out", "lonely", "scared", "afraid",
+    "anxious", "depressed", "sad", "can't sleep", "couldn't sleep", "swollen", "swelling",
+    "blood sugar", "fall", "fell", "help", "doctor", "hospital", "but",
+]
+
+OK_PHRASES = [
+    "i'm fine", "i am fine", "doing fine", "feeling fine", "i'm good", "i am good",
+    "doing good", "feeling good", "i'm okay", "i am okay", "i'm ok", "i am ok", "doing okay",
+    "doing well", "feeling well", "i'm well", "i am well", "doing great", "feeling great",
+    "i'm great", "all good", "everything is good", "everything's good", "everything is fine",
+    "no problems", "no complaints", "don't need anything", "do not need anything",
+    "nothing i need", "i'm alright", "i am alright", "all right", "pretty good", "very well",
+]
+
+# Emergency phrases that are harmless when followed by these words ("i fell asleep",
+# "passed out flyers"); the transcript then goes to the model like any other
+BENIGN_CONTINUATIONS = {
+    "i fell": {"asleep", "behind", "for", "in"},
+    "fell down": {"on"},  # "fell down on the job"
+    "passed out": {
+        "a", "an", "the", "some", "my", "our", "his", "her", "their", "them", "those", "these",
+        "flyers", "fliers", "leaflets", "pamphlets", "programs", "cards", "cookies", "candy",
+        "food", "gifts", "presents", "invitations", "papers", "hymnals", "bulletins",
+    },
+}
+
+# Small talk that may surround an OK phrase. A transcript is only OK without the model
+# when every word is part of an OK phrase, a negated concern, or this list.
+BENIGN_WORDS = {
+    "yes", "yeah", "yep", "oh", "hi", "hello", "hey", "dear", "honey", "sweetie", "well", "so",
+    "thank", "thanks", "you", "for", "calling", "asking", "checking", "in", "on", "me",
+    "just", "really", "actually", "very", "quite", "too", "and", "here", "today", "tonight",
+    "this", "morning", "afternoon", "evening", "now", "right", "at", "all", "talk", "tomorrow",
+    "later", "soon", "bye", "goodbye", "again", "much", "i", "i'm", "am", "still", "as", "always",
+    "usual", "any", "anything", "no", "not", "don't", "need", "a", "the", "my", "thing", "things",
+    # Everyday routine that often follows "I'm fine"
+    "slept", "night", "had", "breakfast", "lunch", "dinner", "took", "pills", "going", "walk",
+    "watching", "news", "tv",
+}
+
+NEGATIONS = {"no", "not", "never", "without", "don't", "didn't", "haven't", "hasn't", "isn't", "wasn't", "nobody"}
+NEGATION_WINDOW = 3  # Tokens before a phrase that can negate it
+
+_QUOTES = str.maketrans({"’": "'", "‘": "'", "“": '"', "”": '"'})
+_WORD = re.compile(r"[a-z0-9']+")
+_CLAUSE_BREAK = re.compile(r"[,.;:!?]")
+
+def normalize(text: str) -> str:
+    return " ".join((text or "").lower().translate(_QUOTES).split())
+
+class AhoCorasick:
+    """Multi-pattern matcher: one pass over the text finds every occurrence of every pattern"""
+
+    def __init__(self, patterns: Iterable[Tuple[str, str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, str]]] = [[]]
+        for pattern, label in patterns:
+            self._add(pattern, label)
+        self._build()
+
+    def _add(self, pattern: str, label: str):
+        state = 0
+        for char in pattern:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((pattern, label))
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, str, str]]:
+        """Yield (start, end, pattern, label) for every match, end exclusive"""
+        state = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern, label in out[state]:
+                yield index + 1 - len(pattern), index + 1, pattern, label
+
+@dataclass
+class TriageResult:
+    status: Optional[CheckInStatus]  # None means ambiguous: ask the model
+    matches: Dict[str, List[str]] = field(default_factory=dict)
+
+    @property
+    def decided(self) -> bool:
+        return self.status is not None
+
+    @property
+    def notes(self) -> str:
+        phrases = ", ".join(f'"{p}"' for label in ("emergency", "ok") for p in self.matches.get(label, []))
+        return f"Rule-based triage: {self.status.value if self.status else 'ambiguous'} (matched {phrases or 'nothing'})"
+
+def _is_word_boundary(text: str, start: int, end: int) -> bool:
+    before = text[start - 1] if start > 0 else " "
+    after = text[end] if end < len(text) else " "
+    return not (before.isalnum() or before == "'") and not (after.isalnum() or after == "'")
+
+def _is_negated(text: str, start: int) -> bool:
+    """True when a negation appears shortly before start within the same clause"""
+    clause = _CLAUSE_BREAK.split(text[max(0, start - 40):start])[-1]
+    preceding = _WORD.findall(clause)[-NEGATION_WINDOW:]
+    return any(word in NEGATIONS for word in preceding)
+
+class TriageClassifier:
+    """Decides plainly OK and plainly EMERGENCY transcripts locally; everything else is ambiguous"""
+
+    def __init__(self, emergency=EMERGENCY_PHRASES, concern=CONCERN_PHRASES, ok=OK_PHRASES):
+        patterns = [(p, "emergency") for p in emergency]
+        patterns += [(p, "concern") for p in concern]
+        patterns += [(p, "ok") for p in ok]
+        self._automaton = AhoCorasick((normalize(p), label) for p, label in patterns)
+
+    def classify(self, transcript: str) -> TriageResult:
+        text = normalize(transcript)
+        matches: Dict[str, List[str]] = {}
+        covered: List[Tuple[int, int]] = []  # Spans of OK phrases and negated concerns
+        negated_emergency = False
+        for start, end, pattern, label in self._automaton.iter_matches(text):
+            if not _is_word_boundary(text, start, end):
+                continue
+            if label == "emergency" and _is_benign_continuation(text, pattern, end):
+                label = "concern"
+            if _is_negated(text, start):
+                if label == "emergency":
+                    # "no chest pain" is not an emergency, but it is not plainly fine either
+                    negated_emergency = True
+                    continue
+                if label == "concern":
+                    # "I don't need any help"
+                    covered.append((start, end))
+                    continue
+                label = "concern"
+            if label == "ok":
+                covered.append((start, end))
+            matches.setdefault(label, []).append(pattern)
+
+        if matches.get("emergency"):
+            return TriageResult(CheckInStatus.EMERGENCY, matches)
+        if negated_emergency or matches.get("concern") or not matches.get("ok"):
+            return TriageResult(None, matches)
+        if not _fully_explained(text, covered):
+            # Something besides "I'm fine" was said; the phrase lists cannot vouch for it
+            return TriageResult(None, matches)
+        return TriageResult(CheckInStatus.OK, matches)
+
+def _is_benign_continuation(text: str, pattern: str, end: int) -> bool:
+    following = BENIGN_CONTINUATIONS.get(pattern)
+    if not following:
+        return False
+    next_word = _WORD.match(text, end + 1) if text[end:end + 1] == " " else None
+    return next_word is not None and next_word.group() in following
+
+def _fully_explained(text: str, covered: List[Tuple[int, int]]) -> bool:
+    for word in _WORD.finditer(text):
+        if word.group() in BENIGN_WORDS:
+            continue
+        if not any(start <= word.start() and word.end() <= end for start, end in covered):
+            return False
+    return True
+
+_classifier: Optional[TriageClassifier] = None
+
+def triage_transcript(transcript: str) -> TriageResult:
+    """Classify with the shared, precompiled classifier"""
+    global _classifier
+    if _classifier is None:
+        _classifier = TriageClassifier()
+    return _classifier.classify(transcript)
@@ -0,0 +1,153 @@
+import os
+import json
+import shutil
+import hashlib
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger("carecall")
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "media/tts_cache")
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+def cache_key(text: str, voice: dict, audio_config: dict) -> str:
+    """Content address for a synthesized clip: hash of the text, voice and audio config"""
+    material = json.dumps({"text": text, "voice": voice, "audio_config": audio_config}, sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+class TTSCache:
+    """Content-addressed audio store with size-bounded LRU eviction"""
+
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_BYTES, extension: str = "mp3"):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.extension = extension
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> size, least recent first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._load()
+
+    def _load(self):
+        """Index clips already on disk, oldest modification first"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = sorted(self.directory.glob(f"*/*.{self.extension}"), key=lambda p: p.stat().st_mtime)
+        for path in files:
+            size = path.stat().st_size
+            self._entries[path.stem] = size
+            self._total_bytes += size
+        self._evict()
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.{self.extension}"
+
+    def get(self, key: str) -> Optional[Path]:
+        path = self.path_for(key)
+        with self._lock:
+            if key in self._entries:
+                if not path.exists():
+                    # Evicted or deleted by another process sharing the directory
+                    self._total_bytes -= self._entries.pop(key)
+                    self.misses += 1
+                    return None
+                self._entries.move_to_end(key)
+            elif path.exists():
+                # Written by another process sharing the directory
+                size = path.stat().st_size
+                self._entries[key] = size
+                self._total_bytes += size
+            else:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return path
+
+    def put(self, key: str, audio: bytes) -> Path:
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as out:
+            out.write(audio)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries[key]
+            self._entries[key] = len(audio)
+            self._entries.move_to_end(key)
+            self._total_bytes += len(audio)
+            self._evict()
+        return path
+
+    def _evict(self):
+        # Always keep the most recent entry, even if it alone exceeds the budget
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                self.path_for(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    async def get_or_synthesize(self, key: str, synthesize: Callable[[], Awaitable[bytes]]) -> Path:
+        """Return the cached clip for key, synthesizing it at most once even under concurrency"""
+        path = self.get(key)
+        if path is not None:
+            return path
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            audio = await synthesize()
+            path = self.put(key, audio)
+            future.set_result(path)
+            return path
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+def materialize(source: Path, output_path: str):
+    """Expose a cached clip at output_path, hard-linking when possible"""
+    if os.path.exists(output_path):
+        os.remove(output_path)
+    try:
+        os.link(source, output_path)
+    except OSError:
+        shutil.copyfile(source, output_path)
+
+_cache: Optional[TTSCache] = None
+
+def get_tts_cache() -> TTSCache:
+    global _cache
+    if _cache is None:
+        _cache = TTSCache()
+    return _cache
+
+def tts_cache_stats() -> Optional[dict]:
+    """Stats for the process cache, or None when this process has not used it"""
+    return _cache.stats() if _cache is not None else None
@@ -0,0 +1,164 @@
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict
+
+from services.registry import ClientRegistry, registry
+from services.metrics import VENDOR_ERRORS
+
+logger = logging.getLogger("carecall")
+
+# Default thread pool size per vendor, overridable with VENDOR_POOL_SIZE_<NAME>
+DEFAULT_POOL_SIZES = {
+    "llm": 8,
+    "tts": 8,
+    "telephony": 8,
+    "sms": 4,
+}
+
+class VendorPool:
+    """Bounded thread pool that runs one vendor's blocking SDK calls off the event loop"""
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"vendor-{name}")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.errors = 0
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) in this vendor's pool and await the result"""
+        call = {"queued": True}
+        with self._lock:
+            self.queued += 1
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, partial(self._call, call, fn, *args, **kwargs))
+        finally:
+            # Cancelled before a thread picked it up (disconnect, timeout): it never starts
+            self._dequeue(call)
+
+    def _dequeue(self, call: dict):
+        with self._lock:
+            if call["queued"]:
+                call["queued"] = False
+                self.queued -= 1
+
+    def _call(self, call: dict, fn: Callable, *args, **kwargs) -> Any:
+        self._dequeue(call)
+        with self._lock:
+            self.active += 1
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            VENDOR_ERRORS.inc(vendor=self.name)
+            raise
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pool_size": self.max_workers,
+                "active": self.active,
+                "queue_depth": self.queued,
+                "completed": self.completed,
+                "errors": self.errors,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+_pools: Dict[str, VendorPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(name: str) -> VendorPool:
+    """Return the process-wide pool for a vendor, creating it on first use"""
+    pool = _pools.get(name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                size = int(os.getenv(f"VENDOR_POOL_SIZE_{name.upper()}", DEFAULT_POOL_SIZES.get(name, 4)))
+                pool = VendorPool(name, size)
+                _pools[name] = pool
+    return pool
+
+def vendor_pool_stats() -> Dict[str, dict]:
+    return {name: pool.stats() for name, pool in sorted(_pools.items())}
+
+def shutdown_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown()
+        _pools.clear()
+
+class VendorAdapter:
+    """Base for adapters: resolves the vendor's pool and clients at call time"""
+    vendor = ""
+
+    def __init__(self, pool: VendorPool = None, clients: ClientRegistry = None):
+        self._pool = pool
+        self.clients = clients or registry
+
+    @property
+    def pool(self) -> VendorPool:
+        return self._pool or get_pool(self.vendor)
+
+class LLMAdapter(VendorAdapter):
+    """Async access to Vertex AI text and Gemini models"""
+    vendor = "llm"
+
+    async def predict(self, prompt: str) -> str:
+        def call():
+            return self.clients.get("text_model").predict(prompt).text
+
+        return await self.pool.run(call)
+
+    async def generate_content(self, contents, **kwargs) -> str:
+        def call():
+            return self.clients.get("gemini_model").generate_content(contents, **kwargs).text
+
+        return await self.pool.run(call)
+
+class TTSAdapter(VendorAdapter):
+    """Async access to Google Cloud Text-to-Speech"""
+    vendor = "tts"
+
+    async def synthesize(self, synthesis_input, voice, audio_config) -> bytes:
+        def call():
+            return self.clients.get("tts_client").synthesize_speech(
+                input=synthesis_input,
+                voice=voice,
+                audio_config=audio_config
+            )
+
+        response = await self.pool.run(call)
+        return response.audio_content
+
+class TelephonyAdapter(VendorAdapter):
+    """Async access to Twilio voice calls"""
+    vendor = "telephony"
+
+    async def create_call(self, **kwargs):
+        return await self.pool.run(lambda: self.clients.get("twilio_client").calls.create(**kwargs))
+
+class SMSAdapter(VendorAdapter):
+    """Async access to Twilio SMS"""
+    vendor = "sms"
+
+    async def send(self, to: str, body: str, from_: str):
+        return await self.pool.run(
+            lambda: self.clients.get("twilio_client").messages.create(body=body, from_=from_, to=to)
+        )
@@ -0,0 +1,82 @@
+import logging
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.base import SessionLocal
+from models.models import WebhookEvent
+from services.job_queue import RECORDING_JOB, get_job_queue
+
+logger = logging.getLogger("carecall")
+
+async def ingest_recording_event(db: AsyncSession, form: dict) -> Tuple[Optional[WebhookEvent], bool]:
+    """Durably record a recording callback and queue its processing.
+
+    Returns (event, created). Deliveries already seen for the same CallSid and
+    RecordingSid return the stored event with created=False, and queue it again
+    only if it is unprocessed and its job no longer exists.
+    """
+    call_sid = form.get("CallSid")
+    recording_url = form.get("RecordingUrl")
+    if not (call_sid and recording_url):
+        return None, False
+    recording_sid = form.get("RecordingSid") or ""
+
+    event = WebhookEvent(
+        call_sid=call_sid,
+        recording_sid=recording_sid,
+        recording_url=recording_url,
+        payload=dict(form),
+    )
+    db.add(event)
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        result = await db.execute(
+            select(WebhookEvent).where(
+                WebhookEvent.call_sid == call_sid,
+                WebhookEvent.recording_sid == recording_sid
+            )
+        )
+        existing = result.scalar_one()
+        queue = get_job_queue()
+        if existing.processed_at is None and (existing.job_id is None or not await queue.pending(existing.job_id)):
+            # Stored but its job is gone: the push after commit failed (e.g. Redis was down),
+            # or every attempt failed. Queue it again so this retry gets it processed.
+            existing.job_id = await queue.enqueue(RECORDING_JOB, {"event_id": existing.id})
+            await db.commit()
+            logger.info(f"Requeued recording webhook for call {call_sid}")
+            return existing, False
+        logger.info(f"Duplicate recording webhook for call {call_sid} ignored")
+        return existing, False
+
+    event.job_id = await get_job_queue().enqueue(RECORDING_JOB, {"event_id": event.id}, db=db)
+    await db.commit()
+    return event, True
+
+async def process_recording_event(event_id: int):
+    """Worker side: run the recording pipeline once per stored event"""
+    # Import here to avoid circular imports
+    from services.call_pipeline import handle_recording_webhook
+
+    async with SessionLocal() as db:
+        result = await db.execute(select(WebhookEvent).where(WebhookEvent.id == event_id))
+        event = result.scalar_one_or_none()
+        if event is None or event.processed_at is not None:
+            return
+        recording_url, call_sid = event.recording_url, event.call_sid
+        recording_sid = event.recording_sid or None
+
+    await handle_recording_webhook(recording_url, call_sid, recording_sid)
+
+    async with SessionLocal() as db:
+        await db.execute(
+            update(WebhookEvent)
+            .where(WebhookEvent.id == event_id)
+            .values(processed_at=datetime.utcnow())
+        )
+        await db.commit()
@@ -0,0 +1,147 @@
+import os
+import socket
+import asyncio
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+
+from services.job_queue import CHECKIN_JOB, PRERENDER_JOB, RECORDING_JOB, ClaimedJob, JOB_LEASE_SECONDS, get_job_queue
+from services.tracing import TRACEPARENT, span
+
+logger = logging.getLogger("carecall")
+
+# Jobs mostly wait on vendors; enough slots also lets recordings share analysis batches
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "16"))
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "1.0"))
+
+JobHandler = Callable[[dict], Awaitable[None]]
+
+async def _run_checkin_job(payload: dict):
+    # Import here so the API process never loads the vendor SDKs
+    from services.call_pipeline import run_checkin
+    from services.dialer import LANE_SCHEDULED
+
+    scheduled_for = payload.get("scheduled_for")
+    await run_checkin(
+        payload["check_in_id"],
+        lane=payload.get("lane", LANE_SCHEDULED),
+        scheduled_for=datetime.fromisoformat(scheduled_for) if scheduled_for else None,
+    )
+
+async def _process_recording_job(payload: dict):
+    from services.webhooks import process_recording_event
+
+    await process_recording_event(payload["event_id"])
+
+async def _prerender_job(payload: dict):
+    from services.prerender import prepare_media
+
+    await prepare_media(payload["prepared_media_id"])
+
+def default_handlers() -> Dict[str, JobHandler]:
+    return {
+        CHECKIN_JOB: _run_checkin_job,
+        RECORDING_JOB: _process_recording_job,
+        PRERENDER_JOB: _prerender_job,
+    }
+
+class JobWorker:
+    """Pulls leased jobs from the queue and runs them with bounded concurrency"""
+
+    def __init__(
+        self,
+        queue=None,
+        handlers: Optional[Dict[str, JobHandler]] = None,
+        concurrency: int = WORKER_CONCURRENCY,
+        poll_interval: float = WORKER_POLL_INTERVAL,
+        worker_id: Optional[str] = None,
+    ):
+        self.queue = queue or get_job_queue()
+        self.handlers = handlers if handlers is not None else default_handlers()
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._tasks = set()
+        self._stopping = asyncio.Event()
+
+    async def run(self):
+        logger.info(f"Job worker {self.worker_id} started with concurrency {self.concurrency}")
+        while not self._stopping.is_set():
+            await self._slots.acquire()
+            try:
+                jobs = await self.queue.claim(self.worker_id, limit=1, kinds=list(self.handlers))
+            except Exception as e:
+                self._slots.release()
+                logger.error(f"Failed to claim jobs: {str(e)}")
+                await self._sleep()
+                continue
+
+            if not jobs:
+                self._slots.release()
+                await self._sleep()
+                continue
+
+            task = asyncio.create_task(self._execute(jobs[0]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        logger.info(f"Job worker {self.worker_id} stopped")
+
+    def stop(self):
+        self._stopping.set()
+
+    async def run_once(self) -> bool:
+        """Claim and run a single job inline; returns False when nothing was runnable"""
+        jobs = await self.queue.claim(self.worker_id, limit=1, kinds=list(self.handlers))
+        if not jobs:
+            return False
+        await self._slots.acquire()
+        await self._execute(jobs[0])
+        return True
+
+    async def _sleep(self):
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _heartbeat(self, job: ClaimedJob):
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            try:
+                await self.queue.extend_lease(job, self.worker_id)
+            except Exception as e:
+                logger.warning(f"Failed to extend lease for job {job.id}: {str(e)}")
+
+    async def _execute(self, job: ClaimedJob):
+        heartbeat = None
+        try:
+            if job.exhausted:
+                # The lease expired on every previous attempt (e.g. the worker crashed)
+                await self.queue.fail(job, "Lease expired too many times")
+                logger.error(f"Job {job.id} ({job.kind}) abandoned after {job.max_attempts} attempts")
+                return
+
+            heartbeat = asyncio.create_task(self._heartbeat(job))
+            try:
+                with span(f"job.{job.kind}", traceparent=job.payload.get(TRACEPARENT), job_id=job.id, attempt=job.attempts):
+                    await self.handlers[job.kind](job.payload)
+            except Exception as e:
+                retry = await self.queue.fail(job, str(e))
+                if retry:
+                    logger.warning(f"Job {job.id} ({job.kind}) failed on attempt {job.attempts}, retrying: {str(e)}")
+                else:
+                    logger.error(f"Job {job.id} ({job.kind}) failed permanently: {str(e)}")
+                return
+
+            await self.queue.complete(job)
+            logger.debug(f"Job {job.id} ({job.kind}) completed")
+        except Exception as e:
+            logger.error(f"Error while finishing job {job.id}: {str(e)}")
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+            self._slots.release()
@@ -1,22 +1,23 @@
 import os
-from resend import Resend
+import httpx
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Resend with your API key
-resend = Resend(api_key=os.getenv("RESEND_API_KEY"))
+# Resend's HTTP API, as used by services/email_dispatcher.py
+RESEND_API_URL = os.getenv("RESEND_API_URL", "https://api.resend.com")
 
 try:
     # Send a test email
-    result = resend.emails.send({
+    response = httpx.post(f"{RESEND_API_URL}/emails", headers={"Authorization": f"Bearer {os.getenv('RESEND_API_KEY')}"}, json={
         "from": "CareCall <noreply@carecall.club>",
         "to": "test@example.com",  # Replace with your email
         "subject": "Test Email from CareCall",
         "html": "<h1>Test Email</h1><p>If you receive this, Resend is configured correctly!</p>"
     })
+    response.raise_for_status()
     print("Email sent successfully!")
-    print("Email ID:", result["id"])
+    print("Email ID:", response.json()["id"])
 except Exception as e:
     print("Error sending email:", str(e)) 
\ No newline at end of file
@@ -0,0 +1,14 @@
+import os
+import shutil
+import tempfile
+
+def pytest_configure(config):
+    # The engine is built when models.base is imported, so point it at a throwaway
+    # database before any test module loads instead of ./data/carecall.db
+    config._carecall_db_dir = tempfile.mkdtemp(prefix="carecall-test-")
+    os.environ["DATABASE_URL"] = os.getenv(
+        "TEST_DATABASE_URL", f"sqlite:///{config._carecall_db_dir}/test.db"
+    )
+
+def pytest_unconfigure(config):
+    shutil.rmtree(getattr(config, "_carecall_db_dir", ""), ignore_errors=True)
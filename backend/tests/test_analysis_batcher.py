@@ -0,0 +1,62 @@
+import re
+import json
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from models.base import Base, SessionLocal, engine
+from models.enums import CheckInStatus
+from models.models import CheckIn
+from services.analysis_batcher import AnalysisBatcher, AnalysisError, AnalysisItem, parse_batch_response
+
+def test_parse_batch_response_skips_invalid_entries():
+    text = '```json\n[{"id": 1, "status": "ok", "notes": "fine"}, {"id": 2, "status": "SAD"}]\n```'
+    assert parse_batch_response(text) == {1: (CheckInStatus.OK, "fine")}
+
+@pytest.mark.asyncio
+async def test_transcripts_in_one_window_share_a_request_and_bulk_update():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as db:
+        check_ins = [CheckIn(status=CheckInStatus.NO_ANSWER) for _ in range(3)]
+        db.add_all(check_ins)
+        await db.commit()
+        ids = [check_in.id for check_in in check_ins]
+
+    prompts = []
+
+    async def classify(prompt):
+        prompts.append(prompt)
+        # Answer every id found in the prompt except the last one
+        found = [int(i) for i in re.findall(r'"id": (\d+)', prompt)]
+        return json.dumps([{"id": i, "status": "CONCERN", "notes": f"note {i}"} for i in found[:-1]])
+
+    batcher = AnalysisBatcher(classify, window=0.05, max_size=10)
+    results = await asyncio.gather(
+        *(batcher.submit(AnalysisItem(i, f"transcript {i}", "Ann", "asthma")) for i in ids),
+        return_exceptions=True,
+    )
+
+    assert len(prompts) == 1
+    assert [r.status for r in results[:2]] == [CheckInStatus.CONCERN] * 2
+    assert isinstance(results[2], AnalysisError)
+    assert batcher.stats()["max_batch_size"] == 3
+
+    async with SessionLocal() as db:
+        rows = (await db.execute(select(CheckIn).where(CheckIn.id.in_(ids)).order_by(CheckIn.id))).scalars().all()
+    assert [row.status for row in rows] == [CheckInStatus.CONCERN, CheckInStatus.CONCERN, CheckInStatus.NO_ANSWER]
+    assert rows[0].summary == f"note {ids[0]}" and rows[0].transcript == f"transcript {ids[0]}"
+
+@pytest.mark.asyncio
+async def test_full_batch_flushes_without_waiting_for_window():
+    async def classify(prompt):
+        found = [int(i) for i in re.findall(r'"id": (\d+)', prompt)]
+        return json.dumps([{"id": i, "status": "OK", "notes": ""} for i in found])
+
+    batcher = AnalysisBatcher(classify, window=60, max_size=2, write_back=False)
+    results = await asyncio.wait_for(asyncio.gather(
+        batcher.submit(AnalysisItem(1, "fine", "Ann", "asthma")),
+        batcher.submit(AnalysisItem(2, "fine", "Bob", "asthma")),
+    ), timeout=1)
+    assert [r.check_in_id for r in results] == [1, 2]
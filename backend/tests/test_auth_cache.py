@@ -0,0 +1,105 @@
+import time
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, func, select
+
+from api.email_auth import JWT_ALGORITHM, JWT_SECRET, create_access_token, get_current_user
+from models.base import Base, SessionLocal, engine
+from models.models import User
+from services.auth_cache import AuthCache, TTLCache, get_auth_cache
+
+def test_ttl_cache_expires_and_evicts_least_recently_used():
+    now = [0.0]
+    cache = TTLCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # "b" is least recently used
+    assert cache.get("b") is None
+    now[0] = 11
+    assert cache.get("a") is None
+    assert len(cache) == 1
+
+def test_cached_verification_does_not_outlive_the_token():
+    cache = AuthCache(JWT_SECRET, JWT_ALGORITHM, token_ttl=300)
+    token = jwt.encode({"sub": "a@example.com", "exp": int(time.time()) + 1}, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    assert cache.verify_token(token) == "a@example.com"
+    time.sleep(1.1)
+    with pytest.raises(jwt.ExpiredSignatureError):
+        cache.verify_token(token)
+
+async def _current_user(token):
+    async with SessionLocal() as db:
+        return await get_current_user(SimpleNamespace(credentials=token), db)
+
+@pytest.mark.asyncio
+async def test_authenticated_requests_skip_the_database_until_the_user_changes():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    email = f"{uuid.uuid4().hex}@example.com"
+    async with SessionLocal() as db:
+        db.add(User(email=email, name="Before"))
+        await db.commit()
+    token = create_access_token({"sub": email})
+    get_auth_cache().clear()
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        assert (await _current_user(token)).name == "Before"
+        assert len(statements) == 1
+        assert (await _current_user(token)).name == "Before"
+        assert len(statements) == 1
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+
+    async with SessionLocal() as db:
+        user = await db.get(User, (await _current_user(token)).id)
+        user.name = "After"
+        await db.commit()
+    assert (await _current_user(token)).name == "After"
+
+    with pytest.raises(HTTPException) as exc:
+        await _current_user("not-a-token")
+    assert exc.value.status_code == 401
+
+@pytest.mark.asyncio
+async def test_cached_user_belongs_to_the_request_session_and_invalidates_on_commit():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    email = f"{uuid.uuid4().hex}@example.com"
+    async with SessionLocal() as db:
+        db.add(User(email=email, name="Cached"))
+        await db.commit()
+    token = create_access_token({"sub": email})
+    get_auth_cache().clear()
+    await _current_user(token)
+
+    async with SessionLocal() as db:
+        user = await get_current_user(SimpleNamespace(credentials=token), db)
+        assert user in db
+        user.name = "Renamed"
+        db.add(user)
+        await db.flush()
+        # Not invalidated until the change commits
+        assert get_auth_cache().users.get(email) is not None
+        await db.rollback()
+    assert get_auth_cache().users.get(email) is not None
+
+    async with SessionLocal() as db:
+        user = await get_current_user(SimpleNamespace(credentials=token), db)
+        user.name = "Renamed"
+        await db.commit()
+        count = await db.execute(select(func.count(User.id)).where(User.email == email))
+        assert count.scalar_one() == 1
+    assert get_auth_cache().users.get(email) is None
+    assert (await _current_user(token)).name == "Renamed"
@@ -0,0 +1,67 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+from models.base import Base, SessionLocal, engine
+from models.enums import CallStatus, CheckInStatus
+from models.models import Call, CheckIn, Recipient
+from services import call_pipeline
+from services.registry import registry
+
+class FakeTwilio:
+    def __init__(self):
+        self.dialed = []
+        self.calls = SimpleNamespace(create=self._create)
+        self.messages = SimpleNamespace(create=lambda **kwargs: None)
+
+    def _create(self, **kwargs):
+        sid = f"CA{uuid.uuid4().hex}"
+        self.dialed.append(sid)
+        return SimpleNamespace(sid=sid)
+
+class FakeGemini:
+    def generate_content(self, contents, **kwargs):
+        return SimpleNamespace(text="I'm fine, thank you.")
+
+@pytest.fixture
+def fake_vendors(monkeypatch):
+    twilio = FakeTwilio()
+    registry.override("twilio_client", twilio)
+    registry.override("gemini_model", FakeGemini())
+
+    async def no_audio(text, output_path):
+        return None
+
+    monkeypatch.setattr(call_pipeline, "text_to_speech", no_audio)
+    monkeypatch.setattr(call_pipeline.script_engine, "generate", None)
+    yield twilio
+    registry.reset("twilio_client")
+    registry.reset("gemini_model")
+
+@pytest.mark.asyncio
+async def test_call_is_tracked_by_sid_and_not_redialed(fake_vendors):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as db:
+        recipient = Recipient(name="Ann", phone_number="+15550000001", condition="asthma")
+        db.add(recipient)
+        await db.commit()
+
+    check_in = await call_pipeline.trigger_checkin(recipient.id)
+    # A retried job finds the dialed call and does not place another one
+    await call_pipeline.run_checkin(check_in.id)
+    assert len(fake_vendors.dialed) == 1
+    call_sid = fake_vendors.dialed[0]
+
+    await call_pipeline.handle_recording_webhook("https://example.com/rec.mp3", call_sid, "RE1")
+
+    async with SessionLocal() as db:
+        call = (await db.execute(select(Call).where(Call.call_sid == call_sid))).scalar_one()
+        stored = await db.get(CheckIn, check_in.id)
+    assert call.status == CallStatus.COMPLETED
+    assert call.recording_url == "https://example.com/rec.mp3"
+    assert call.dialed_at is not None and call.completed_at is not None
+    assert stored.status == CheckInStatus.OK
+    assert stored.completed_at is not None
@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from api import checkins
+from api.checkins import export_rows, get_checkins
+from models.base import Base, SessionLocal, engine
+from models.enums import CheckInStatus
+from models.models import CheckIn, Recipient, User
+
+async def _seed(count: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as db:
+        user = User(email=f"{uuid.uuid4().hex}@example.com", name="Carer")
+        db.add(user)
+        await db.flush()
+        recipient = Recipient(user_id=user.id, name="Ann", phone_number="+15550000001")
+        db.add(recipient)
+        await db.flush()
+        now = datetime.utcnow().replace(microsecond=0)
+        # Two check-ins share each timestamp so the id tie-break is exercised
+        for i in range(count):
+            db.add(CheckIn(
+                recipient_id=recipient.id,
+                status=CheckInStatus.OK,
+                transcript=f"transcript {i}",
+                created_at=now - timedelta(minutes=i // 2),
+            ))
+        await db.commit()
+        return SimpleNamespace(id=user.id), recipient.id
+
+async def _page(user, recipient_id, cursor=None, limit=4, include_transcript=True):
+    async with SessionLocal() as db:
+        return await get_checkins(
+            recipient_id, days=7, limit=limit, cursor=cursor,
+            include_transcript=include_transcript, db=db, current_user=user
+        )
+
+@pytest.mark.asyncio
+async def test_pages_cover_history_once_in_order():
+    user, recipient_id = await _seed(11)
+
+    seen, cursor = [], None
+    while True:
+        page = await _page(user, recipient_id, cursor)
+        assert len(page.items) <= 4
+        seen.extend(page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert len(seen) == 11
+    assert len({item.id for item in seen}) == 11
+    keys = [(item.created_at, item.id) for item in seen]
+    assert keys == sorted(keys, reverse=True)
+
+@pytest.mark.asyncio
+async def test_transcript_can_be_left_out():
+    user, recipient_id = await _seed(2)
+
+    page = await _page(user, recipient_id, include_transcript=False)
+    assert [item.transcript for item in page.items] == [None, None]
+    page = await _page(user, recipient_id)
+    assert all(item.transcript for item in page.items)
+
+@pytest.mark.asyncio
+async def test_bad_cursor_and_foreign_recipient_are_rejected():
+    user, recipient_id = await _seed(1)
+
+    with pytest.raises(HTTPException) as exc:
+        await _page(user, recipient_id, cursor="not-a-cursor")
+    assert exc.value.status_code == 400
+    with pytest.raises(HTTPException) as exc:
+        await _page(SimpleNamespace(id=-1), recipient_id)
+    assert exc.value.status_code == 404
+
+@pytest.mark.asyncio
+async def test_export_streams_every_row_in_chunks(monkeypatch):
+    user, recipient_id = await _seed(30)
+    monkeypatch.setattr(checkins, "EXPORT_CHUNK_BYTES", 256)
+    monkeypatch.setattr(checkins, "EXPORT_BATCH_ROWS", 7)
+
+    chunks = [chunk async for chunk in export_rows(user.id, recipient_id, "csv")]
+    assert len(chunks) > 1
+    rows = list(csv.DictReader(io.StringIO("".join(chunks))))
+    assert len(rows) == 30
+    assert rows[0]["recipient_name"] == "Ann"
+    assert rows[0]["status"] == "OK"
+    assert {row["transcript"] for row in rows} == {f"transcript {i}" for i in range(30)}
+
+    chunks = [chunk async for chunk in export_rows(user.id, None, "ndjson")]
+    records = [json.loads(line) for line in "".join(chunks).splitlines()]
+    assert [record["id"] for record in records] == sorted(int(row["id"]) for row in rows)
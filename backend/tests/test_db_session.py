@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from api.email_auth import get_db
+from models import base
+from models.base import InstrumentedPool, engine, get_session
+
+def test_dependencies_share_one_lazy_session():
+    app = FastAPI()
+    seen = []
+
+    async def needs_db(db=Depends(get_db)):
+        return db
+
+    @app.get("/")
+    async def route(db=Depends(get_session), other=Depends(needs_db)):
+        seen.append((db, other))
+        return {}
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        assert TestClient(app).get("/").status_code == 200
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+
+    db, other = seen[0]
+    assert db is other
+    # Nothing is sent to the database for a request that runs no query
+    assert statements == []
+
+@pytest.mark.asyncio
+async def test_instrumented_pool_records_checkout_wait(tmp_path, monkeypatch):
+    stats = base.CheckoutStats()
+    monkeypatch.setattr(base, "checkout_stats", stats)
+    pooled = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path}/pool.db",
+        poolclass=InstrumentedPool, pool_size=1, max_overflow=0,
+    )
+
+    async def hold():
+        async with pooled.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            await asyncio.sleep(0.05)
+
+    await asyncio.gather(hold(), hold())
+    await pooled.dispose()
+
+    snapshot = stats.snapshot()
+    assert snapshot["checkouts"] == 2
+    # The second checkout had to wait for the only connection
+    assert snapshot["wait_max_ms"] >= 40
+
+def test_autotune_splits_the_connection_budget():
+    pool_size, max_overflow = base.autotune_pool(max_connections=100, instances=4, workers=2, reserved=4)
+    assert (pool_size, max_overflow) == (9, 3)
+    assert (pool_size + max_overflow) * 8 <= 96
+    # Never below one connection, even when oversubscribed
+    assert base.autotune_pool(max_connections=10, instances=50, workers=2, reserved=5) == (1, 0)
+
+@pytest.mark.asyncio
+async def test_pool_can_be_resized_in_place(tmp_path):
+    pooled = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path}/resize.db",
+        poolclass=InstrumentedPool, pool_size=5, max_overflow=5,
+    )
+    old_pool = pooled.sync_engine.pool
+    pooled.sync_engine.pool = old_pool.resized(1, 0)
+    old_pool.dispose()
+    async with pooled.connect() as conn:
+        assert (await conn.execute(text("SELECT 1"))).scalar_one() == 1
+    assert pooled.pool.size() == 1 and pooled.pool._max_overflow == 0
+    await pooled.dispose()
+
+@pytest.mark.asyncio
+async def test_pool_stats_report_occupancy(tmp_path):
+    pooled = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path}/stats.db",
+        poolclass=InstrumentedPool, pool_size=2, max_overflow=1,
+    )
+    async with pooled.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        stats = base.pool_stats(pooled.pool)
+    await pooled.dispose()
+
+    assert stats["pool_class"] == "InstrumentedPool"
+    assert stats["size"] == 2
+    assert stats["checked_out"] == 1
+    assert stats["overflow"] == 0
+    assert "wait_p95_ms" in stats
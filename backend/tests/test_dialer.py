@@ -0,0 +1,146 @@
+import asyncio
+import os
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from models.base import Base, SessionLocal, engine
+from models.enums import CallStatus, CheckInStatus
+from models.models import Call, CheckIn, Recipient
+from services import call_pipeline
+from services.dialer import Dialer, SharedTokenBucket, TokenBucket, smoothing_delays
+from services.kv_store import MemoryStore
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.mark.asyncio
+async def test_token_bucket_paces_to_the_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=2, clock=clock)
+    assert bucket.try_take() == 0 and bucket.try_take() == 0
+    assert bucket.try_take() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.try_take() == 0
+    # After a rejection nothing goes out until the pause has passed
+    await bucket.pause(1)
+    assert bucket.try_take() == pytest.approx(1.5)
+    clock.now += 1.5
+    assert bucket.try_take() == 0
+
+@pytest.mark.asyncio
+async def test_shared_bucket_paces_every_process_to_one_rate():
+    clock = FakeClock()
+    store = MemoryStore(clock=clock)
+    # Two workers' dialers drawing from the same key share the account's rate
+    first = SharedTokenBucket(rate=2, burst=2, store=store)
+    second = SharedTokenBucket(rate=2, burst=2, store=store)
+    assert await store.token_bucket(first.key, 2, 2) == 0
+    assert await store.token_bucket(second.key, 2, 2) == 0
+    assert await store.token_bucket(first.key, 2, 2) == pytest.approx(0.5)
+    await second.refund()
+    assert await store.token_bucket(first.key, 2, 2) == 0
+    await first.pause(1)
+    assert await store.token_bucket(second.key, 2, 2) == pytest.approx(1.5)
+    clock.now += 1.5
+    await second.take()
+
+def test_smoothing_spreads_a_slot_at_the_dial_rate():
+    assert smoothing_delays(3, rate=1, window=50) == [0.0, 1.0, 2.0]
+    # More calls than fit at the rate are squeezed into the window
+    delays = smoothing_delays(100, rate=1, window=50)
+    assert delays[1] == 0.5 and delays[-1] < 50
+    assert smoothing_delays(1, rate=1, window=50) == [0.0]
+    assert smoothing_delays(3, rate=0, window=50) == [0.0, 0.0, 0.0]
+
+@pytest.mark.asyncio
+async def test_lanes_are_served_in_priority_order():
+    dialed = []
+
+    async def create_call(**kwargs):
+        dialed.append(kwargs["to"])
+        return SimpleNamespace(sid=kwargs["to"])
+
+    dialer = Dialer(create_call, TokenBucket(rate=20, burst=1))
+    first = asyncio.create_task(dialer.dial("scheduled", to="first"))
+    await asyncio.sleep(0)
+    # Queued while the first call holds the only token
+    waiting = [
+        asyncio.create_task(dialer.dial(lane, to=lane))
+        for lane in ("retry", "scheduled", "manual")
+    ]
+    await asyncio.gather(first, *waiting)
+    assert dialed == ["first", "manual", "scheduled", "retry"]
+
+    stats = dialer.stats()["lanes"]
+    assert stats["scheduled"]["dialed"] == 2 and stats["manual"]["waiting"] == 0
+    assert stats["retry"]["wait_p95_ms"] > stats["manual"]["wait_p95_ms"]
+    await dialer.close()
+
+class RateLimited(Exception):
+    status = 429
+
+@pytest.mark.asyncio
+async def test_rate_limited_dials_are_retried_through_the_retry_lane():
+    attempts = []
+
+    async def create_call(**kwargs):
+        attempts.append(kwargs["to"])
+        if len(attempts) == 1:
+            raise RateLimited("Too Many Requests")
+        if kwargs["to"] == "bad":
+            raise ValueError("invalid number")
+        return SimpleNamespace(sid="CA1")
+
+    dialer = Dialer(create_call, TokenBucket(rate=100, burst=1), backoff=0.01)
+    assert (await dialer.dial("manual", to="+15550000000")).sid == "CA1"
+    assert dialer.rate_limited == 1
+    assert dialer.stats()["lanes"]["retry"]["dialed"] == 1
+
+    # Other errors are not retried
+    with pytest.raises(ValueError):
+        await dialer.dial("manual", to="bad")
+    assert attempts.count("bad") == 1
+    await dialer.close()
+
+@pytest.mark.asyncio
+async def test_redialing_a_failed_check_in_uses_the_retry_lane(tmp_path, monkeypatch):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("media")
+    lanes = []
+
+    async def generate_script(recipient):
+        return "Hello"
+
+    async def text_to_speech(text, output_path):
+        pass
+
+    async def dial(lane, **kwargs):
+        lanes.append(lane)
+        return SimpleNamespace(sid=f"CA{uuid.uuid4().hex}")
+
+    monkeypatch.setattr(call_pipeline, "generate_script", generate_script)
+    monkeypatch.setattr(call_pipeline, "text_to_speech", text_to_speech)
+    monkeypatch.setattr(call_pipeline, "dialer", SimpleNamespace(dial=dial))
+
+    async with SessionLocal() as db:
+        recipient = Recipient(name="Dial", phone_number="+15550000000", condition="asthma")
+        db.add(recipient)
+        await db.flush()
+        fresh = CheckIn(recipient_id=recipient.id, status=CheckInStatus.NO_ANSWER)
+        failed = CheckIn(recipient_id=recipient.id, status=CheckInStatus.NO_ANSWER)
+        db.add_all([fresh, failed])
+        await db.flush()
+        db.add(Call(check_in_id=failed.id, status=CallStatus.FAILED, error="busy"))
+        await db.commit()
+
+    await call_pipeline.run_checkin(fresh.id, lane="scheduled")
+    await call_pipeline.run_checkin(failed.id, lane="scheduled")
+    assert lanes == ["scheduled", "retry"]
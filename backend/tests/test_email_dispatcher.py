@@ -0,0 +1,83 @@
+import asyncio
+
+import httpx
+import pytest
+
+from services.email_dispatcher import EmailDispatcher, EmailQueueFull, render_login_code
+
+def test_login_template_is_rendered_with_the_code():
+    params = render_login_code("a@example.com", "4821")
+    assert params["to"] == ["a@example.com"]
+    assert '<div class="code">4821</div>' in params["html"]
+    assert "{code}" not in params["html"]
+    assert "font-family: -apple-system" in params["html"]
+
+@pytest.mark.asyncio
+async def test_send_returns_before_delivery_and_retries_server_errors():
+    attempts = []
+    release = asyncio.Event()
+
+    async def handler(request):
+        await release.wait()
+        attempts.append(request)
+        if len(attempts) == 1:
+            return httpx.Response(503, text="busy")
+        return httpx.Response(200, json={"id": "em_1"})
+
+    client = httpx.AsyncClient(base_url="https://resend.test", transport=httpx.MockTransport(handler))
+    dispatcher = EmailDispatcher(api_key="key", concurrency=2, backoff=0.01, client=client)
+
+    await dispatcher.send(render_login_code("a@example.com", "1234"))
+    assert attempts == []  # Queued only
+    release.set()
+    await dispatcher.drain()
+
+    assert len(attempts) == 2
+    assert attempts[-1].headers["Authorization"] == "Bearer key"
+    assert dispatcher.stats() == {"queued": 0, "sent": 1, "failed": 0, "retries": 1}
+    await dispatcher.close()
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded_and_client_errors_are_not_retried():
+    active, peak = 0, 0
+
+    async def handler(request):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return httpx.Response(422, text="invalid")
+
+    client = httpx.AsyncClient(base_url="https://resend.test", transport=httpx.MockTransport(handler))
+    dispatcher = EmailDispatcher(api_key="key", concurrency=3, queue_size=10, client=client)
+    for i in range(10):
+        await dispatcher.send(render_login_code(f"{i}@example.com", "0000"))
+    with pytest.raises(EmailQueueFull):
+        await dispatcher.send(render_login_code("late@example.com", "0000"))
+    await dispatcher.drain()
+
+    assert peak == 3
+    assert dispatcher.stats()["failed"] == 10
+    assert dispatcher.stats()["retries"] == 0
+    await dispatcher.close()
+
+@pytest.mark.asyncio
+async def test_worker_survives_an_unexpected_error():
+    delivered = []
+
+    async def handler(request):
+        delivered.append(request)
+        return httpx.Response(200, json={"id": "em_1"})
+
+    client = httpx.AsyncClient(base_url="https://resend.test", transport=httpx.MockTransport(handler))
+    dispatcher = EmailDispatcher(api_key="key", concurrency=1, client=client)
+
+    # Not JSON serializable, so the request cannot even be built
+    await dispatcher.send({"to": ["bad@example.com"], "html": object()})
+    await dispatcher.send(render_login_code("later@example.com", "0000"))
+    await dispatcher.drain()
+
+    assert len(delivered) == 1
+    assert dispatcher.stats()["sent"] == 1 and dispatcher.stats()["failed"] == 1
+    await dispatcher.close()
@@ -0,0 +1,147 @@
+import asyncio
+import uuid
+
+import pytest
+
+from models.base import Base, SessionLocal, engine
+from models.models import Recipient
+from services.job_queue import DatabaseJobQueue, RedisJobQueue, backoff_delay
+from services.worker import JobWorker
+
+@pytest.mark.asyncio
+async def test_database_queue_lease_retry_and_complete():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    queue = DatabaseJobQueue()
+    kind = f"test.lease.{uuid.uuid4().hex}"
+
+    job_id = await queue.enqueue(kind, {"value": 1}, max_attempts=2)
+    [job] = await queue.claim("worker-a", kinds=[kind])
+    assert job.id == job_id and job.payload == {"value": 1} and job.attempts == 1
+
+    # A leased job is invisible to other workers
+    assert await queue.claim("worker-b", kinds=[kind]) == []
+
+    # A failure requeues with backoff, so it is not immediately runnable
+    assert await queue.fail(job, "boom") is True
+    assert await queue.claim("worker-b", kinds=[kind]) == []
+
+    job_id = await queue.enqueue(kind, {"value": 2})
+    [job] = await queue.claim("worker-a", kinds=[kind])
+    await queue.complete(job)
+    assert await queue.claim("worker-a", kinds=[kind]) == []
+
+@pytest.mark.asyncio
+async def test_worker_runs_handler_for_claimed_job():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    queue = DatabaseJobQueue()
+    seen = []
+    kind = f"test.worker.{uuid.uuid4().hex}"
+
+    async def handler(payload):
+        seen.append(payload["n"])
+
+    worker = JobWorker(queue=queue, handlers={kind: handler})
+    await queue.enqueue(kind, {"n": 7})
+    assert await worker.run_once() is True
+    assert await worker.run_once() is False
+    assert seen == [7]
+
+def test_backoff_is_exponential_and_capped():
+    assert backoff_delay(2) == 2 * backoff_delay(1)
+    assert backoff_delay(100) == backoff_delay(200)
+
+class FakeRedis:
+    def __init__(self):
+        self.ids = 0
+        self.jobs = {}
+        self.ready = {}
+
+    async def incr(self, key):
+        self.ids += 1
+        return self.ids
+
+    async def zscore(self, key, member):
+        return self.ready.get(member) if key.endswith(":ready") else None
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def hset(self, key, mapping):
+        self.commands.append(lambda: self.redis.jobs.__setitem__(key, mapping))
+
+    def zadd(self, key, mapping):
+        self.commands.append(lambda: self.redis.ready.update(mapping))
+
+    async def execute(self):
+        for command in self.commands:
+            command()
+
+@pytest.mark.asyncio
+async def test_redis_jobs_enqueued_in_a_transaction_wait_for_commit():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    redis = FakeRedis()
+    queue = RedisJobQueue(redis=redis)
+
+    async with SessionLocal() as db:
+        db.add(Recipient(name="Rolled back", phone_number="+15550000000"))
+        await db.flush()
+        await queue.enqueue("test.redis", {"value": 1}, db=db)
+        await db.rollback()
+    await asyncio.sleep(0)
+    assert redis.ready == {}
+
+    async with SessionLocal() as db:
+        db.add(Recipient(name="Committed", phone_number="+15550000000"))
+        await db.flush()
+        job_id = await queue.enqueue("test.redis", {"value": 2}, db=db)
+        # Not visible to workers before the rows it refers to are
+        assert redis.ready == {}
+        await db.commit()
+    await asyncio.sleep(0.01)
+    assert list(redis.ready) == [job_id]
+
+class LeasingRedis(FakeRedis):
+    """Stands in for the claim script, which leased a job and one whose hash is gone"""
+
+    def __init__(self):
+        super().__init__()
+        self.jobs = {
+            "carecall:jobs:job:1": {"attempts": "1"},
+            "carecall:jobs:job:2": {"kind": "test.redis", "payload": "{}", "attempts": "1", "max_attempts": "5"},
+        }
+        self.leases = {"1", "2"}
+
+    def register_script(self, script):
+        async def claim(keys, args):
+            return ["1", "2"]
+        return claim
+
+    async def hgetall(self, key):
+        return self.jobs.get(key, {})
+
+    async def zrem(self, key, member):
+        self.leases.discard(member)
+
+    async def delete(self, key):
+        self.jobs.pop(key, None)
+
+@pytest.mark.asyncio
+async def test_redis_claim_drops_jobs_without_a_kind():
+    redis = LeasingRedis()
+    [job] = await RedisJobQueue(redis=redis).claim("worker-1")
+    assert job.id == "2" and job.kind == "test.redis"
+    assert redis.leases == {"2"} and "carecall:jobs:job:1" not in redis.jobs
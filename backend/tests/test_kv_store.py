@@ -0,0 +1,79 @@
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from api import email_auth
+from models.base import Base, SessionLocal, engine
+from schemas.schemas import EmailLoginRequest, VerifyCodeRequest
+from services.kv_store import MemoryStore
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.mark.asyncio
+async def test_memory_store_expires_entries_and_stays_bounded():
+    clock = Clock()
+    store = MemoryStore(clock)
+    for i in range(100):
+        await store.set(f"code:{i}", {"code": i}, ttl=60)
+    await store.set("code:0", {"code": "new"}, ttl=120)
+    assert await store.get("code:1") == {"code": 1}
+
+    clock.now += 61
+    assert await store.get("code:1") is None
+    # The rewritten key keeps its later expiry; everything else is gone
+    assert await store.get("code:0") == {"code": "new"}
+    assert len(store) == 1
+
+@pytest.mark.asyncio
+async def test_sliding_window_limits_and_recovers():
+    clock = Clock()
+    store = MemoryStore(clock)
+    for _ in range(3):
+        assert (await store.hit("login:a", window=60, limit=3))[0]
+        clock.now += 10
+    assert await store.hit("login:a", window=60, limit=3) == (False, 3)
+
+    # The first event leaves the window 60s after it happened
+    clock.now += 31
+    assert await store.hit("login:a", window=60, limit=3) == (True, 3)
+    clock.now += 1000
+    await store.get("anything")
+    assert len(store) == 0
+
+@pytest.mark.asyncio
+async def test_login_codes_and_rate_limit_use_the_store(monkeypatch):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    store = MemoryStore()
+    sent = []
+
+    class Dispatcher:
+        async def send(self, params):
+            sent.append(params)
+
+    monkeypatch.setattr(email_auth, "get_kv_store", lambda: store)
+    monkeypatch.setattr(email_auth, "get_email_dispatcher", Dispatcher)
+    email = f"{uuid.uuid4().hex}@example.com"
+
+    for _ in range(email_auth.LOGIN_RATE_LIMIT):
+        await email_auth.login_email(EmailLoginRequest(email=email), db=None)
+    with pytest.raises(HTTPException) as exc:
+        await email_auth.login_email(EmailLoginRequest(email=email), db=None)
+    assert exc.value.status_code == 429
+    assert len(sent) == email_auth.LOGIN_RATE_LIMIT
+
+    code = (await store.get(f"verification_code:{email}"))["code"]
+    async with SessionLocal() as db:
+        token = await email_auth._verify_code(VerifyCodeRequest(email=email, code=code), db)
+    assert token["user"]["email"] == email
+    # Codes are single use
+    with pytest.raises(HTTPException) as exc:
+        async with SessionLocal() as db:
+            await email_auth._verify_code(VerifyCodeRequest(email=email, code=code), db)
+    assert exc.value.status_code == 400
@@ -0,0 +1,34 @@
+import pytest
+
+from benchmarks.load_benchmark import check_regressions, parse_vendor_profiles, percentile, run
+
+def test_vendor_profiles_and_percentiles():
+    profiles = parse_vendor_profiles(["tts_client=250", "twilio_client=400:0.05"], latency_ms=10, error_rate=0)
+    assert profiles["tts_client"].latency_ms == 250 and profiles["tts_client"].error_rate == 0
+    assert profiles["twilio_client"].error_rate == 0.05
+    assert profiles["resend"].latency_ms == 10
+    with pytest.raises(ValueError):
+        parse_vendor_profiles(["fax=1"], 0, 0)
+
+    samples = [float(i) for i in range(1, 101)]
+    assert (percentile(samples, 0.5), percentile(samples, 0.95), percentile(samples, 0.99)) == (51.0, 96.0, 100.0)
+    assert percentile([], 0.5) is None
+
+@pytest.mark.asyncio
+async def test_smoke_run_reports_every_endpoint(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    report = await run(users=2, recipients_per_user=1, reads_per_user=1, concurrency=4, drain_timeout=30)
+
+    assert {
+        "POST /api/auth/login/email",
+        "GET /api/recipients/recipients/dashboard",
+        "POST /api/recipients/recipients/{recipient_id}/call-now",
+        "POST /api/checkins/twilio/recording-complete",
+    } <= set(report["endpoints"])
+    for stats in report["endpoints"].values():
+        assert stats["errors"] == 0 and stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"]
+    assert report["pipeline"]["recordings_processed"] == report["pipeline"]["calls_requested"] == 2
+    assert check_regressions(report, max_error_rate=0) == []
+
+    baseline = {"endpoints": {name: {"p95_ms": 0.001} for name in report["endpoints"]}}
+    assert check_regressions(report, baseline=baseline)
@@ -0,0 +1,99 @@
+import io
+import json
+import logging
+import queue
+
+from services.logging_config import (
+    AccessLog, JsonFormatter, NonBlockingQueueHandler, configure_logging, redact_headers, shutdown_logging,
+)
+
+class Recorder(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+def _access_log(**kwargs):
+    logger = logging.getLogger("carecall.access.test")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    recorder = Recorder()
+    logger.handlers = [recorder]
+    return AccessLog(logger=logger, **kwargs), recorder.records
+
+def test_route_levels_and_sampling_decide_what_is_logged():
+    access, records = _access_log(route_levels={"/health": logging.WARNING}, sample_rate=0.0, slow_ms=500)
+    access.log("GET", "/health", "/health", 200, 3)
+    access.log("GET", "/api/x", "/api/x", 200, 3)  # Sampled out
+    access.log("GET", "/api/x", "/api/x", 200, 800)  # Slow, always kept
+    access.log("GET", "/api/x", "/api/x", 404, 3)
+    access.log("GET", "/health", "/health", 503, 3)
+
+    assert [(r.levelname, r.http["path"], r.http["status"]) for r in records] == [
+        ("WARNING", "/api/x", 200),
+        ("WARNING", "/api/x", 404),
+        ("ERROR", "/health", 503),
+    ]
+
+def test_headers_are_redacted():
+    access, records = _access_log(route_levels={}, sample_rate=1.0, include_headers=True)
+    access.log("POST", "/api/x", "/api/x", 200, 1, [("Authorization", "Bearer abc"), ("Accept", "*/*")])
+    assert records[0].http["headers"] == {"Authorization": "[redacted]", "Accept": "*/*"}
+    assert redact_headers({"Cookie": "a=b"}) == {"Cookie": "[redacted]"}
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    record = logging.makeLogRecord({"msg": "hello %s", "args": ("there",)})
+    handler.handle(record)
+    handler.handle(record)
+    assert handler.dropped == 1
+    assert handler.queue.get_nowait().msg == "hello there"
+
+def test_records_are_written_as_json_lines_off_thread():
+    stream = io.StringIO()
+    configure_logging(level="INFO", fmt="json", stream=stream)
+    try:
+        logger = logging.getLogger("carecall")
+        logger.debug("hidden")
+        logger.info("placed call", extra={"check_in_id": 7})
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("failed")
+    finally:
+        shutdown_logging()
+        configure_logging()
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["message"] for line in lines] == ["placed call", "failed"]
+    assert lines[0]["check_in_id"] == 7
+    assert lines[0]["logger"] == "carecall"
+    assert "ValueError: boom" in lines[1]["exc"]
+
+def test_server_loggers_go_through_the_queue_and_shutdown_writes_directly():
+    uvicorn_access = logging.getLogger("uvicorn.access")
+    uvicorn_access.addHandler(logging.StreamHandler(io.StringIO()))
+    uvicorn_access.propagate = False
+    stream = io.StringIO()
+    configure_logging(level="INFO", fmt="json", stream=stream)
+    try:
+        # Calling again with the same settings changes nothing
+        configure_logging(level="INFO", fmt="json", stream=stream)
+        assert len(logging.getLogger().handlers) == 1
+        assert uvicorn_access.handlers == [] and uvicorn_access.propagate
+
+        uvicorn_access.info("GET / 200")
+        shutdown_logging()
+        logging.getLogger("carecall").warning("after shutdown")
+    finally:
+        shutdown_logging()
+        configure_logging()
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["message"] for line in lines] == ["GET / 200", "after shutdown"]
+
+def test_json_formatter_handles_unserializable_extras():
+    record = logging.makeLogRecord({"msg": "x", "levelname": "INFO", "name": "carecall", "when": object()})
+    assert json.loads(JsonFormatter().format(record))["message"] == "x"
@@ -0,0 +1,60 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from models.base import Base, engine
+from services.metrics import MetricsRegistry, PIPELINE_STAGE_ERRORS, PIPELINE_STAGE_LATENCY, VENDOR_ERRORS, stage_timer
+from services.vendors import VendorPool
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("demo_seconds", "Demo latency", ["route"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value, route="/a")
+    text = registry.render()
+
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{route="/a",le="1.0"} 3' in text
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 4' in text
+    assert 'demo_seconds_count{route="/a"} 4' in text
+    with pytest.raises(ValueError):
+        latency.observe(1, path="/a")
+
+def test_stage_timer_counts_failures():
+    errors = PIPELINE_STAGE_ERRORS.value(stage="dial")
+    observed = PIPELINE_STAGE_LATENCY.count(stage="dial")
+    with pytest.raises(RuntimeError):
+        with stage_timer("dial"):
+            raise RuntimeError("busy")
+    assert PIPELINE_STAGE_ERRORS.value(stage="dial") == errors + 1
+    assert PIPELINE_STAGE_LATENCY.count(stage="dial") == observed + 1
+
+@pytest.mark.asyncio
+async def test_vendor_failures_are_counted():
+    pool = VendorPool("metrics-test", 1)
+
+    def fail():
+        raise RuntimeError("vendor down")
+
+    with pytest.raises(RuntimeError):
+        await pool.run(fail)
+    pool.shutdown()
+    assert VENDOR_ERRORS.value(vendor="metrics-test") == 1
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_routes_by_template():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    client = TestClient(main.app)
+    client.get("/api/recipients/recipients/41")
+    client.get("/api/recipients/recipients/42")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'route="/api/recipients/recipients/{recipient_id}"' in body
+    assert "/recipients/41" not in body
+    assert 'carecall_queue_depth{queue="jobs"}' in body
+    assert 'carecall_queue_depth{queue="email"}' in body
@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+def alembic(*args, database_url):
+    env = {**os.environ, "DATABASE_URL": database_url}
+    return subprocess.run(
+        [sys.executable, "-m", "alembic", *args], cwd=BACKEND, env=env, capture_output=True, text=True,
+    )
+
+def test_migrations_build_the_schema_from_an_empty_database(tmp_path):
+    url = f"sqlite:///{tmp_path / 'migrations.db'}"
+    upgrade = alembic("upgrade", "head", database_url=url)
+    assert upgrade.returncode == 0, upgrade.stderr
+    # The migrated schema matches the models
+    check = alembic("check", database_url=url)
+    assert check.returncode == 0, check.stdout + check.stderr
+    downgrade = alembic("downgrade", "base", database_url=url)
+    assert downgrade.returncode == 0, downgrade.stderr
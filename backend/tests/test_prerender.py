@@ -0,0 +1,130 @@
+import os
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+from models.base import Base, SessionLocal, engine
+from models.enums import CheckInStatus, PreparedMediaStatus
+from models.models import CheckIn, PreparedMedia, Recipient
+from services import call_pipeline
+from services.prerender import Prerenderer, plan_quota, prepare_media, use_prepared_media
+from services.registry import registry
+from services.scheduler import BucketIndex, floor_to_minute
+
+def test_plan_quota_levels_work_before_each_deadline():
+    # A peak far away is spread over the minutes left before it
+    assert plan_quota([10] * 22) == 2
+    # Anything already due is done now
+    assert plan_quota([0, 0, 0]) == 3
+    assert plan_quota([-5]) == 1
+    # A near deadline raises the rate only as much as it needs
+    assert plan_quota([1] + [10] * 22) == 3
+    assert plan_quota([]) == 0
+
+async def _recipients(count: int, preferred_time: str):
+    async with SessionLocal() as db:
+        recipients = [
+            Recipient(name=f"Pre {i}", phone_number="+15550000000", condition="asthma", preferred_time=preferred_time)
+            for i in range(count)
+        ]
+        db.add_all(recipients)
+        await db.commit()
+    return [recipient.id for recipient in recipients]
+
+@pytest.mark.asyncio
+async def test_renders_are_spread_evenly_before_the_lead_time():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    now = floor_to_minute(datetime.utcnow())
+    peak = await _recipients(22, f"{now + timedelta(minutes=15):%H:%M}")
+    urgent = await _recipients(1, f"{now + timedelta(minutes=6):%H:%M}")
+    index = BucketIndex()
+    index.rebuild([(rid, f"{now + timedelta(minutes=15):%H:%M}") for rid in peak]
+                  + [(urgent[0], f"{now + timedelta(minutes=6):%H:%M}")])
+
+    queued = []
+
+    async def enqueue(db, prepared_media_id):
+        queued.append(prepared_media_id)
+
+    prerenderer = Prerenderer(index, enqueue=enqueue, lead_minutes=5, window_minutes=10)
+    first = await prerenderer.tick(now)
+    assert len(first) == 3 and urgent[0] in first
+
+    per_minute = Counter({0: len(first)})
+    for minute in range(1, 11):
+        per_minute[minute] = len(await prerenderer.tick(now + timedelta(minutes=minute)))
+    # Everything is queued by the lead time without any minute taking more than its share
+    assert sum(per_minute.values()) == len(queued) == 23
+    assert max(per_minute.values()) <= 3
+    assert await prerenderer.tick(now + timedelta(minutes=10)) == []
+
+@pytest.mark.asyncio
+async def test_dial_uses_prepared_media(tmp_path, monkeypatch):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("media")
+    scripts = []
+
+    async def generate_script(recipient):
+        scripts.append(recipient.id)
+        return f"Hello {recipient.name}"
+
+    async def text_to_speech(text, output_path):
+        with open(output_path, "wb") as out:
+            out.write(text.encode())
+
+    monkeypatch.setattr(call_pipeline, "generate_script", generate_script)
+    monkeypatch.setattr(call_pipeline, "text_to_speech", text_to_speech)
+    twilio = SimpleNamespace(calls=SimpleNamespace(create=lambda **kwargs: SimpleNamespace(sid=f"CA{uuid.uuid4().hex}")))
+    registry.override("twilio_client", twilio)
+
+    [recipient_id] = await _recipients(1, "09:00")
+    slot = floor_to_minute(datetime.utcnow()) + timedelta(minutes=10)
+    async with SessionLocal() as db:
+        prepared = PreparedMedia(recipient_id=recipient_id, scheduled_for=slot)
+        db.add(prepared)
+        await db.commit()
+    try:
+        await prepare_media(prepared.id)
+        # A call-now just before the slot renders live and leaves the slot's media alone
+        manual = await call_pipeline.trigger_checkin(recipient_id)
+        assert scripts == [recipient_id, recipient_id]
+        async with SessionLocal() as db:
+            assert (await db.get(PreparedMedia, prepared.id)).status == PreparedMediaStatus.READY
+
+        async with SessionLocal() as db:
+            check_in = CheckIn(recipient_id=recipient_id, status=CheckInStatus.NO_ANSWER)
+            db.add(check_in)
+            await db.commit()
+        await call_pipeline.run_checkin(check_in.id, lane="scheduled", scheduled_for=slot)
+    finally:
+        registry.reset("twilio_client")
+
+    # The scheduled call used the script rendered ahead of time instead of rendering again
+    assert scripts == [recipient_id, recipient_id]
+    assert manual.id != check_in.id
+    with open(f"media/script_{check_in.id}.mp3", "rb") as audio:
+        assert audio.read() == b"Hello Pre 0"
+    async with SessionLocal() as db:
+        stored = await db.get(PreparedMedia, prepared.id)
+        assert stored.status == PreparedMediaStatus.USED and stored.check_in_id == check_in.id
+        assert not os.path.exists(stored.audio_path)
+
+        # Media rendered for an older version of the recipient is not used
+        db.add(PreparedMedia(recipient_id=recipient_id, scheduled_for=slot + timedelta(days=1)))
+        await db.commit()
+        [pending] = (await db.execute(select(PreparedMedia.id).where(
+            PreparedMedia.recipient_id == recipient_id, PreparedMedia.status == PreparedMediaStatus.PENDING
+        ))).scalars().all()
+    await prepare_media(pending)
+    async with SessionLocal() as db:
+        recipient = await db.get(Recipient, recipient_id)
+        recipient.condition = "diabetes"
+        await db.commit()
+        assert await use_prepared_media(db, recipient, check_in.id, "media/unused.mp3", slot + timedelta(days=1)) is False
@@ -0,0 +1,73 @@
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+
+from api.recipients import get_dashboard, get_recipient
+from models.base import Base, SessionLocal, engine
+from models.enums import CheckInStatus
+from models.models import CheckIn, Recipient, User
+from schemas.schemas import RecipientWithCheckIns
+from services.status_summary import SummaryRefresher
+
+async def _seed():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as db:
+        user = User(email=f"{uuid.uuid4().hex}@example.com", name="Carer")
+        db.add(user)
+        await db.flush()
+        busy, quiet = (
+            Recipient(user_id=user.id, name=name, phone_number="+15550000001", condition="none",
+                      preferred_time="09:00", emergency_contact_name="Bo",
+                      emergency_contact_phone="+15550000002", emergency_contact_email="bo@example.com")
+            for name in ("Ann", "Cy")
+        )
+        db.add_all([busy, quiet])
+        await db.flush()
+        now = datetime.utcnow().replace(microsecond=0)
+        for i in range(30):
+            status = CheckInStatus.CONCERN if i == 0 else CheckInStatus.OK
+            at = now - timedelta(days=i)
+            db.add(CheckIn(recipient_id=busy.id, status=status, created_at=at, completed_at=at))
+        await db.commit()
+        return SimpleNamespace(id=user.id), busy.id, quiet.id
+
+@pytest.mark.asyncio
+async def test_recipient_embeds_only_latest_check_ins():
+    user, busy_id, _ = await _seed()
+    async with SessionLocal() as db:
+        recipient = await get_recipient(busy_id, checkins_limit=5, db=db, current_user=user)
+        body = RecipientWithCheckIns.model_validate(recipient)
+
+    assert len(body.check_ins) == 5
+    assert body.check_ins[0].status == CheckInStatus.CONCERN
+    dates = [c.created_at for c in body.check_ins]
+    assert dates == sorted(dates, reverse=True)
+
+@pytest.mark.asyncio
+async def test_dashboard_reads_summaries_without_aggregating():
+    user, busy_id, quiet_id = await _seed()
+    # Summaries for check-ins stored without them are built in the background
+    await SummaryRefresher().refresh()
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        async with SessionLocal() as db:
+            entries = await get_dashboard(db=db, current_user=user)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+
+    assert len(statements) == 1
+    by_id = {entry.id: entry for entry in entries}
+    assert set(by_id) == {busy_id, quiet_id}
+    assert by_id[busy_id].status.last_status == CheckInStatus.CONCERN
+    assert by_id[busy_id].status.concerns_7d == 1
+    assert by_id[quiet_id].status.last_status is None
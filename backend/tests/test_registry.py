@@ -0,0 +1,40 @@
+import threading
+import time
+
+import pytest
+
+from services.registry import ClientRegistry
+
+def test_factory_runs_once_across_threads():
+    registry = ClientRegistry()
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    registry.register("client", factory)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("client"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+@pytest.mark.asyncio
+async def test_warm_builds_lazily_registered_clients_and_tolerates_failures():
+    registry = ClientRegistry()
+    registry.register("ok", lambda: "client")
+    registry.register("broken", lambda: 1 / 0)
+    assert not registry.is_ready("ok")
+
+    await registry.warm()
+    assert registry.is_ready("ok")
+    assert not registry.is_ready("broken")
+
+    registry.override("broken", "fake")
+    assert await registry.aget("broken") == "fake"
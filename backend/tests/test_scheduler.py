@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import pytest
+
+from models.base import Base, SessionLocal, engine
+from models.models import Recipient
+from services.scheduler import BucketIndex, CheckInScheduler, parse_preferred_time
+
+def test_parse_preferred_time():
+    assert parse_preferred_time("00:00") == 0
+    assert parse_preferred_time("09:30") == 570
+    assert parse_preferred_time("23:59") == 1439
+    assert parse_preferred_time("24:00") is None
+    assert parse_preferred_time("9am") is None
+    assert parse_preferred_time(None) is None
+
+def test_bucket_index_moves_and_removes():
+    index = BucketIndex()
+    index.upsert(1, "09:30")
+    index.upsert(2, "09:30")
+    index.upsert(3, "10:00")
+    assert index.bucket(570) == [1, 2]
+
+    index.upsert(2, "10:00")
+    assert index.bucket(570) == [1]
+    assert index.bucket(600) == [2, 3]
+
+    index.remove(3)
+    index.upsert(1, "bogus")
+    assert index.bucket(570) == []
+    assert index.bucket(600) == [2]
+    assert len(index) == 1
+
+@pytest.mark.asyncio
+async def test_run_slot_dials_each_recipient_once():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as db:
+        recipient = Recipient(name="Test", phone_number="+15550000000", preferred_time="07:15")
+        db.add(recipient)
+        await db.commit()
+        recipient_id = recipient.id
+
+    index = BucketIndex()
+    index.upsert(recipient_id, "07:15")
+    dialed = []
+
+    async def dispatch(rid, **kwargs):
+        dialed.append(rid)
+        return None
+
+    slot = datetime(2024, 1, 1, 7, 15)
+    first = CheckInScheduler(index, dispatch=dispatch)
+    # A second instance (or a restarted one) must not dial the same slot again
+    second = CheckInScheduler(index, dispatch=dispatch)
+    assert await first.run_slot(slot) == [recipient_id]
+    assert await second.run_slot(slot) == []
+    assert dialed == [recipient_id]
+
+@pytest.mark.asyncio
+async def test_failed_dispatch_releases_the_claim():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as db:
+        recipient = Recipient(name="Test", phone_number="+15550000000", preferred_time="08:30")
+        db.add(recipient)
+        await db.commit()
+        recipient_id = recipient.id
+
+    index = BucketIndex()
+    index.upsert(recipient_id, "08:30")
+
+    async def broken(rid, **kwargs):
+        raise ConnectionError("queue unavailable")
+
+    async def dispatch(rid, **kwargs):
+        return None
+
+    slot = datetime(2024, 1, 1, 8, 30)
+    assert await CheckInScheduler(index, dispatch=broken).run_slot(slot) == []
+    # The slot was not left claimed, so a catch-up run still places the call
+    assert await CheckInScheduler(index, dispatch=dispatch).run_slot(slot) == [recipient_id]
@@ -0,0 +1,48 @@
+import pytest
+
+from services.script_engine import FALLBACK_TEMPLATE, ScriptEngine
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.mark.asyncio
+async def test_template_is_generated_once_per_condition_until_ttl():
+    prompts = []
+
+    async def generate(prompt):
+        prompts.append(prompt)
+        return "Hi {name}, how is your heart today?"
+
+    clock = FakeClock()
+    engine = ScriptEngine(generate, ttl=60, clock=clock)
+
+    assert await engine.render("Ann", "Heart disease") == "Hi Ann, how is your heart today?"
+    assert await engine.render("Bob", "heart disease ") == "Hi Bob, how is your heart today?"
+    assert len(prompts) == 1
+
+    clock.now = 61
+    await engine.render("Ann", "Heart disease")
+    assert len(prompts) == 2
+
+@pytest.mark.asyncio
+async def test_falls_back_when_model_unavailable():
+    async def generate(prompt):
+        raise RuntimeError("model unavailable")
+
+    engine = ScriptEngine(generate)
+    script = await engine.render("Ann", "diabetes")
+    assert script == FALLBACK_TEMPLATE.replace("{name}", "Ann").replace("{condition}", "diabetes")
+    assert engine.stats()["fallbacks"] == 1
+
+@pytest.mark.asyncio
+async def test_rejects_template_without_name_placeholder():
+    async def generate(prompt):
+        return "Hello there, how are you?"
+
+    engine = ScriptEngine(generate)
+    assert "Ann" in await engine.render("Ann", "asthma")
+    assert engine.stats()["fallbacks"] == 1
@@ -0,0 +1,100 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.base import Base, SessionLocal, engine
+from models.enums import CheckInStatus
+from models.models import CheckIn, Recipient, RecipientStatusSummary
+from services.status_summary import SummaryRefresher, get_summaries, record_check_in_result, refresh_summary
+
+async def _recipient(db):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    recipient = Recipient(name=f"r-{uuid.uuid4().hex[:8]}", phone_number="+15550000001")
+    db.add(recipient)
+    await db.flush()
+    return recipient
+
+async def _finalize(db, recipient, status, completed_at):
+    check_in = CheckIn(recipient_id=recipient.id, status=status, summary=status.value, completed_at=completed_at)
+    db.add(check_in)
+    await db.flush()
+    await record_check_in_result(db, check_in)
+    await db.commit()
+    return check_in
+
+def _figures(summary):
+    return (summary.last_check_in_id, summary.last_status, summary.concerns_7d, summary.concerns_30d, summary.stale_at)
+
+@pytest.mark.asyncio
+async def test_incremental_updates_match_a_full_recompute():
+    now = datetime.utcnow()
+    async with SessionLocal() as db:
+        recipient = await _recipient(db)
+        await _finalize(db, recipient, CheckInStatus.CONCERN, now - timedelta(days=10))
+        await _finalize(db, recipient, CheckInStatus.OK, now - timedelta(days=3))
+        await _finalize(db, recipient, CheckInStatus.EMERGENCY, now - timedelta(days=1))
+        last = await _finalize(db, recipient, CheckInStatus.OK, now)
+        # Finalizing the same check-in again must not double count
+        await record_check_in_result(db, last)
+        await db.commit()
+
+        incremental = _figures(await db.get(RecipientStatusSummary, recipient.id))
+        recomputed = _figures(await refresh_summary(db, recipient.id))
+
+    assert incremental == recomputed
+    assert incremental[:4] == (last.id, CheckInStatus.OK, 1, 2)
+
+@pytest.mark.asyncio
+async def test_expired_windows_are_refreshed_in_the_background():
+    now = datetime.utcnow()
+    async with SessionLocal() as db:
+        recipient = await _recipient(db)
+        await _finalize(db, recipient, CheckInStatus.CONCERN, now - timedelta(days=3))
+        idle = await _recipient(db)
+        await db.commit()
+
+    def entry(entries, recipient_id):
+        return next(summary for r, summary in entries if r.id == recipient_id)
+
+    # Reads never write: a recipient without a row gets an empty summary
+    async with SessionLocal() as db:
+        entries = await get_summaries(db, None)
+        assert not db.new and not db.dirty
+    assert (entry(entries, recipient.id).concerns_7d, entry(entries, idle.id).concerns_30d) == (1, 0)
+
+    # Five days later the concern has left the 7 day window but not the 30 day one
+    assert await SummaryRefresher(batch=1).refresh(now + timedelta(days=5)) >= 2
+    async with SessionLocal() as db:
+        entries = await get_summaries(db, None)
+        assert await db.get(RecipientStatusSummary, idle.id) is not None
+    summary = entry(entries, recipient.id)
+    assert (summary.concerns_7d, summary.concerns_30d) == (0, 1)
+    assert summary.stale_at == summary.last_call_at + timedelta(days=30)
+
+@pytest.mark.asyncio
+async def test_concurrent_first_results_do_not_conflict():
+    now = datetime.utcnow()
+    async with SessionLocal() as db:
+        recipient = await _recipient(db)
+        check_ins = [CheckIn(recipient_id=recipient.id, status=CheckInStatus.NO_ANSWER) for _ in range(2)]
+        db.add_all(check_ins)
+        await db.commit()
+
+    async def finalize(check_in_id, status, completed_at):
+        async with SessionLocal() as db:
+            check_in = await db.get(CheckIn, check_in_id)
+            check_in.status, check_in.completed_at = status, completed_at
+            await record_check_in_result(db, check_in)
+            await db.commit()
+
+    # Both see no summary row yet; neither may fail on the primary key
+    await asyncio.gather(
+        finalize(check_ins[0].id, CheckInStatus.OK, now),
+        finalize(check_ins[1].id, CheckInStatus.CONCERN, now - timedelta(hours=1)),
+    )
+    async with SessionLocal() as db:
+        summary = await db.get(RecipientStatusSummary, recipient.id)
+        assert (summary.last_check_in_id, summary.concerns_30d) == (check_ins[0].id, 1)
@@ -0,0 +1,134 @@
+import json
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import main
+from models.base import Base, SessionLocal, engine
+from services.job_queue import DatabaseJobQueue
+from services.metrics import stage_timer
+from services.tracing import (
+    FileExporter, OTLPExporter, TRACEPARENT, Span, current_span, instrument_engine, parse_traceparent, span, tracer,
+    with_traceparent,
+)
+from services.worker import JobWorker
+
+REMOTE_TRACE = "4bf92f3577b34da6a3ce929d0e0e4736"
+REMOTE_PARENT = "00f067aa0ba902b7"
+
+@pytest.fixture
+def spans(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    instrument_engine(engine)
+    tracer.configure(FileExporter(str(path)), sample_rate=1.0)
+
+    def read():
+        tracer.flush()
+        if not path.exists():
+            return []
+        return [json.loads(line) for line in path.read_text().splitlines()]
+
+    yield read
+    tracer.configure(None)
+
+def test_parse_traceparent_rejects_malformed_values():
+    assert parse_traceparent(f"00-{REMOTE_TRACE}-{REMOTE_PARENT}-01") == (REMOTE_TRACE, REMOTE_PARENT, True)
+    assert parse_traceparent(f"00-{REMOTE_TRACE}-{REMOTE_PARENT}-00") == (REMOTE_TRACE, REMOTE_PARENT, False)
+    assert parse_traceparent("00-abc-def-01") is None
+    assert parse_traceparent(f"00-{'z' * 32}-{REMOTE_PARENT}-01") is None
+    assert parse_traceparent(None) is None
+
+def test_nested_spans_follow_the_root_sampling_decision(spans):
+    tracer.sample_rate = 0.5
+    roots = []
+    for _ in range(40):
+        with span("job.test") as root:
+            with stage_timer("script"):
+                with span("inner"):
+                    pass
+        roots.append(root)
+    exported = {}
+    for finished in spans():
+        exported.setdefault(finished["trace_id"], []).append(finished["name"])
+
+    # Each trace is exported whole or not at all
+    for root in roots:
+        names = exported.get(root.trace_id, [])
+        assert sorted(names) == (["inner", "job.test", "pipeline.script"] if root.sampled else [])
+    assert {root.sampled for root in roots} == {True, False}
+
+def test_unsampled_remote_trace_is_not_exported(spans):
+    with span("GET /hook", traceparent=f"00-{REMOTE_TRACE}-{REMOTE_PARENT}-00") as root:
+        with span("child") as child:
+            assert child.traceparent.endswith("-00")
+    assert not root.sampled and spans() == []
+
+def test_spans_are_noops_when_tracing_is_off():
+    with span("idle") as active:
+        assert active is None
+        assert with_traceparent("https://example.com/hook") == "https://example.com/hook"
+
+@pytest.mark.asyncio
+async def test_stage_and_query_spans_nest_under_the_current_span(spans):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    with span("job.test") as root:
+        with stage_timer("script"):
+            async with SessionLocal() as session:
+                await session.execute(text("SELECT 1"))
+            url = with_traceparent("https://example.com/api/twilio/voice-webhook")
+        # Query spans never replace the caller's current span
+        assert current_span() is root
+    exported = {s["name"]: s for s in spans()}
+
+    stage, query = exported["pipeline.script"], exported["db.query"]
+    assert stage["parent_id"] == root.span_id
+    assert query["parent_id"] == stage["span_id"]
+    assert query["trace_id"] == root.trace_id
+    assert query["attributes"]["db.statement"] == "SELECT 1"
+    assert url.endswith(f"?{TRACEPARENT}=00-{root.trace_id}-{stage['span_id']}-01")
+
+def test_request_span_continues_the_callback_trace(spans):
+    client = TestClient(main.app)
+    client.get(f"/api/recipients/recipients/41?{TRACEPARENT}=00-{REMOTE_TRACE}-{REMOTE_PARENT}-01")
+    [request_span] = [s for s in spans() if s["kind"] == "server"]
+
+    assert request_span["name"] == "GET /api/recipients/recipients/{recipient_id}"
+    assert request_span["trace_id"] == REMOTE_TRACE
+    assert request_span["parent_id"] == REMOTE_PARENT
+    assert request_span["attributes"]["http.status_code"] in (401, 403)
+
+@pytest.mark.asyncio
+async def test_jobs_carry_the_enqueuing_trace_to_the_worker(spans):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    queue = DatabaseJobQueue()
+    kind = f"test.trace.{uuid.uuid4().hex}"
+    seen = []
+
+    async def handler(payload):
+        seen.append(current_span())
+
+    with span("POST /checkins") as root:
+        await queue.enqueue(kind, {"value": 1})
+    worker = JobWorker(queue=queue, handlers={kind: handler})
+    assert await worker.run_once() is True
+
+    [job_span] = seen
+    assert job_span.name == f"job.{kind}"
+    assert job_span.trace_id == root.trace_id
+    assert job_span.parent_id == root.span_id
+
+def test_otlp_export_encodes_spans_as_json():
+    finished = Span("GET /health", REMOTE_TRACE, REMOTE_PARENT, kind="server", start_ns=1, end_ns=2,
+                    attributes={"http.status_code": 200}, error="RuntimeError: boom")
+    body = OTLPExporter("http://collector:4318", service_name="carecall-test").encode([finished])
+    [resource] = body["resourceSpans"]
+    [encoded] = resource["scopeSpans"][0]["spans"]
+
+    assert resource["resource"]["attributes"][0]["value"] == {"stringValue": "carecall-test"}
+    assert encoded["traceId"] == REMOTE_TRACE and "parentSpanId" not in encoded
+    assert encoded["kind"] == 2 and encoded["status"]["code"] == 2
+    assert encoded["attributes"] == [{"key": "http.status_code", "value": {"intValue": "200"}}]
@@ -0,0 +1,48 @@
+import json
+from pathlib import Path
+
+from models.enums import CheckInStatus
+from services.triage import AhoCorasick, TriageClassifier
+
+FIXTURES = json.loads((Path(__file__).parent / "fixtures" / "triage_transcripts.json").read_text())
+
+def test_automaton_finds_overlapping_patterns():
+    automaton = AhoCorasick([("he", "a"), ("she", "b"), ("hers", "c"), ("his", "d")])
+    found = sorted((start, pattern) for start, _, pattern, _ in automaton.iter_matches("ushers"))
+    assert found == [(1, "she"), (2, "he"), (2, "hers")]
+
+def test_negation_and_word_boundaries():
+    classifier = TriageClassifier()
+    assert classifier.classify("I have chest pain").status == CheckInStatus.EMERGENCY
+    assert classifier.classify("No chest pain today").status is None
+    assert classifier.classify("I'm not fine").status is None
+    assert classifier.classify("No, I'm fine").status == CheckInStatus.OK
+    # "ill" must not match inside "still"
+    assert classifier.classify("Still doing fine").status == CheckInStatus.OK
+
+def test_ok_needs_every_word_explained():
+    classifier = TriageClassifier()
+    # Symptoms the concern list does not name must still reach the model
+    assert classifier.classify("I'm fine, but my chest feels tight and my left arm is numb").status is None
+    assert classifier.classify("I'm fine, my ankle looks purple").status is None
+    assert classifier.classify("Oh hello dear, I'm fine, thank you for calling").status == CheckInStatus.OK
+
+def test_emergency_idioms_are_not_emergencies():
+    classifier = TriageClassifier()
+    assert classifier.classify("I fell asleep early").status is None
+    assert classifier.classify("I passed out flyers at church").status is None
+    assert classifier.classify("I passed out this morning").status == CheckInStatus.EMERGENCY
+    assert classifier.classify("I fell down the stairs").status == CheckInStatus.EMERGENCY
+
+def test_fixture_decisions_are_never_wrong():
+    classifier = TriageClassifier()
+    decided = 0
+    for case in FIXTURES:
+        result = classifier.classify(case["transcript"])
+        if result.status is None:
+            continue
+        decided += 1
+        assert result.status.value == case["label"], case["transcript"]
+    # The fast path should settle most plain OK and EMERGENCY answers
+    plain = sum(1 for case in FIXTURES if case["label"] in ("OK", "EMERGENCY"))
+    assert decided >= 0.75 * plain
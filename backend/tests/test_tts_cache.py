@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from services.tts_cache import TTSCache, cache_key
+
+def test_cache_key_covers_text_voice_and_config():
+    voice = {"name": "en-US-Wavenet-D"}
+    config = {"audio_encoding": "MP3"}
+    key = cache_key("Hello", voice, config)
+    assert key == cache_key("Hello", dict(voice), dict(config))
+    assert key != cache_key("Hello!", voice, config)
+    assert key != cache_key("Hello", {"name": "en-US-Wavenet-A"}, config)
+    assert key != cache_key("Hello", voice, {"audio_encoding": "OGG_OPUS"})
+
+def test_lru_eviction_by_size(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=10)
+    cache.put("aa01", b"12345")
+    cache.put("bb02", b"12345")
+    assert cache.get("aa01") is not None  # aa01 is now most recent
+    cache.put("cc03", b"12345")
+
+    assert cache.get("bb02") is None
+    assert cache.get("aa01").read_bytes() == b"12345"
+    assert cache.stats()["bytes"] == 10
+
+    # A new process sees the clips left on disk
+    assert TTSCache(str(tmp_path), max_bytes=10).stats()["entries"] == 2
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_synthesize_once(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=1024)
+    calls = []
+
+    async def synthesize():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return b"audio"
+
+    paths = await asyncio.gather(*(cache.get_or_synthesize("dd04", synthesize) for _ in range(5)))
+    assert len(calls) == 1
+    assert len(set(paths)) == 1
+    await cache.get_or_synthesize("dd04", synthesize)
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_clip_deleted_elsewhere_is_synthesized_again(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=1024)
+    calls = []
+
+    async def synthesize():
+        calls.append(1)
+        return b"audio"
+
+    path = await cache.get_or_synthesize("ee05", synthesize)
+    # Another worker sharing the directory evicted the clip
+    path.unlink()
+    assert await cache.get_or_synthesize("ee05", synthesize) == path
+    assert path.read_bytes() == b"audio"
+    assert len(calls) == 2
+    assert cache.stats()["bytes"] == len(b"audio")
@@ -0,0 +1,63 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+from services.vendors import VendorPool
+
+@pytest.mark.asyncio
+async def test_blocking_calls_do_not_block_the_event_loop():
+    pool = VendorPool("test", max_workers=2)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    results = await asyncio.gather(
+        pool.run(time.sleep, 0.1),
+        pool.run(time.sleep, 0.1),
+        pool.run(lambda: "done"),
+        ticker(),
+    )
+    assert results[2] == "done"
+    # The ticker kept running while the pool threads slept
+    assert len(ticks) == 5 and ticks[-1] - ticks[0] < 0.1
+
+    stats = pool.stats()
+    assert stats["pool_size"] == 2
+    assert stats["completed"] == 3
+    assert stats["queue_depth"] == 0 and stats["active"] == 0
+    pool.shutdown()
+
+@pytest.mark.asyncio
+async def test_errors_are_counted_and_raised():
+    pool = VendorPool("test-errors", max_workers=1)
+
+    def fail():
+        raise RuntimeError("vendor down")
+
+    with pytest.raises(RuntimeError):
+        await pool.run(fail)
+    assert pool.stats()["errors"] == 1
+    pool.shutdown()
+
+@pytest.mark.asyncio
+async def test_calls_cancelled_while_queued_leave_the_queue():
+    pool = VendorPool("test-cancel", max_workers=1)
+    release = threading.Event()
+    busy = asyncio.create_task(pool.run(release.wait, 5))
+    while pool.stats()["active"] == 0:
+        await asyncio.sleep(0.001)
+
+    # Waits behind the busy thread, then the caller gives up
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(pool.run(lambda: "never"), timeout=0.01)
+    assert pool.stats()["queue_depth"] == 0
+
+    release.set()
+    await busy
+    assert pool.stats()["queue_depth"] == 0 and pool.stats()["completed"] == 1
+    pool.shutdown()
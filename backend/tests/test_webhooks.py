@@ -0,0 +1,83 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import func, select
+
+from models.base import Base, SessionLocal, engine
+from models.models import Job
+from services import webhooks
+from services.job_queue import RECORDING_JOB, RedisJobQueue
+from services.webhooks import ingest_recording_event
+from tests.test_job_queue import FakeRedis
+
+@pytest.mark.asyncio
+async def test_duplicate_deliveries_are_recorded_and_queued_once():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    form = {
+        "CallSid": f"CA{uuid.uuid4().hex}",
+        "RecordingSid": f"RE{uuid.uuid4().hex}",
+        "RecordingUrl": "https://api.twilio.com/recording.mp3",
+    }
+
+    async with SessionLocal() as db:
+        first, created = await ingest_recording_event(db, form)
+    assert created
+    async with SessionLocal() as db:
+        again, created = await ingest_recording_event(db, form)
+    assert not created
+    assert again.id == first.id
+
+    async with SessionLocal() as db:
+        jobs = await db.execute(
+            select(func.count(Job.id)).where(Job.kind == RECORDING_JOB, Job.id == int(first.job_id))
+        )
+        assert jobs.scalar_one() == 1
+
+class FlakyRedis(FakeRedis):
+    """Loses the first push, as when Redis is unreachable right after the commit"""
+
+    def __init__(self):
+        super().__init__()
+        self.failures = 1
+
+    def pipeline(self, transaction=True):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("Redis unavailable")
+        return super().pipeline(transaction)
+
+@pytest.mark.asyncio
+async def test_a_retry_requeues_an_event_whose_push_failed(monkeypatch):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    redis = FlakyRedis()
+    monkeypatch.setattr(webhooks, "get_job_queue", lambda: RedisJobQueue(redis=redis))
+    form = {
+        "CallSid": f"CA{uuid.uuid4().hex}",
+        "RecordingSid": f"RE{uuid.uuid4().hex}",
+        "RecordingUrl": "https://api.twilio.com/recording.mp3",
+    }
+
+    async with SessionLocal() as db:
+        first, created = await ingest_recording_event(db, form)
+    await asyncio.sleep(0.01)
+    assert created and first.job_id is not None
+    assert redis.ready == {}
+
+    async with SessionLocal() as db:
+        again, created = await ingest_recording_event(db, form)
+    assert not created
+    assert list(redis.ready) == [again.job_id] and again.job_id != first.job_id
+
+    # Once the job is queued further retries are plain duplicates
+    async with SessionLocal() as db:
+        third, _ = await ingest_recording_event(db, form)
+    assert third.job_id == again.job_id and len(redis.ready) == 1
+
+@pytest.mark.asyncio
+async def test_callbacks_without_recording_are_ignored():
+    async with SessionLocal() as db:
+        event, created = await ingest_recording_event(db, {"CallSid": "CA123"})
+    assert event is None and not created
@@ -0,0 +1,55 @@
+"""
+Background job worker for the CareCall backend.
+
+Run one or more of these next to the API: python worker.py
+"""
+import signal
+import asyncio
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv(verbose=True)
+
+from services.logging_config import configure_logging, shutdown_logging
+
+configure_logging()
+
+from models.base import engine, Base, wait_for_db, verify_pool_budget
+from services.worker import JobWorker
+from services.vendors import shutdown_pools
+from services.registry import registry
+from services.status_summary import summary_refresher
+from services.tracing import instrument_engine, tracer
+
+async def main():
+    instrument_engine(engine)
+    await wait_for_db(engine)
+    await verify_pool_budget(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    os.makedirs("media", exist_ok=True)
+
+    # Build vendor models and clients while the worker starts polling
+    if os.getenv("WARM_CLIENTS", "true").lower() == "true":
+        asyncio.create_task(registry.warm())
+
+    # Keep the dashboard summaries' rolling windows current
+    await summary_refresher.start()
+
+    worker = JobWorker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.run()
+    finally:
+        await summary_refresher.stop()
+        shutdown_pools()
+        await engine.dispose()
+        tracer.shutdown()
+        shutdown_logging()
+
+if __name__ == "__main__":
+    asyncio.run(main())